@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from FASTA_IO import FASTA_IO
+
+
+class AsyncFASTA_IO:
+    
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    
+    def __init__(self,path_to_file,max_workers=8,**options):
+        """
+        AsyncFASTA_IO()
+        
+        inputs:
+            path_to_file : path to indexed fasta reference file.
+            max_workers : number of threads doing the blocking reads.
+            options : passed on to FASTA_IO, e.g. use_mmap or cache_size.
+        
+        The reads run on a thread pool using positional reads of a single
+        FASTA_IO object, so the event loop is never blocked and there is no
+        shared file position. Concurrent requests for the same region share
+        one read. The index is loaded on the thread pool as well, by the
+        first call that needs it. An object should be used from one event
+        loop.
+    
+        """
+        self.fasta=FASTA_IO(path_to_file,**options)
+        self.executor=self.ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight={}
+        self.index_future=None
+        self.index_loaded=False
+    
+    def close(self):
+        """Shut down the thread pool and close the file handles."""
+        self.executor.shutdown(wait=True)
+        self.fasta.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self,*exc_info):
+        self.close()
+    
+    async def get_sequence_IDs(self):
+        """
+        get all availble sequence IDs in the file
+
+        await get_sequence_IDs()
+
+        Returns
+        -------
+        LIST 
+            all avaialble sequence IDs found in the file .
+
+        """
+        return await self.__load_index__()
+    
+    async def __load_index__(self):
+        
+        #######################################################################
+        # Load the index on the thread pool, parsing a large .fai or building
+        # the binary index must not block the loop. Concurrent first callers
+        # share one load.
+        #######################################################################
+        if self.index_future is None:
+            loop=self.asyncio.get_running_loop()
+            self.index_future=loop.run_in_executor(self.executor,self.fasta.get_sequence_IDs)
+        SequenceIDs=await self.asyncio.shield(self.index_future)
+        self.index_loaded=True
+        return SequenceIDs
+    
+    def __fetch_region__(self,SequenceID,StartBase,StopBase,output_format):
+        
+        #######################################################################
+        # Future for one request, the same request already being read is
+        # shared instead of being read again. The whole read, including the
+        # checks, reverse complement and decoding, runs on the thread pool so
+        # the loop only schedules it.
+        #######################################################################
+        Key=(SequenceID,StartBase,StopBase,output_format)
+        future=self.in_flight.get(Key)
+        if future is None:
+            loop=self.asyncio.get_running_loop()
+            future=loop.run_in_executor(self.executor,self.fasta.read_in_section,SequenceID,
+                                        StartBase,StopBase,output_format)
+            self.in_flight[Key]=future
+            future.add_done_callback(lambda done: self.in_flight.pop(Key,None))
+        return self.asyncio.shield(future) # a cancelled caller must not cancel the read for the others
+    
+    async def read_in_section(self,SequenceID,StartBase,StopBase,output_format='str'):
+        """
+        await read_in_section(SequenceID,StartBase,StopBase)
+        
+        inputs:
+            SequenceID : the chromosome name e.g. 1 or X
+            StartBase : start location of sequence to read (bed format) 
+            StopBase : end location of sequence to read (bed format)
+            output_format : 'str' (default), 'bytes' or 'memoryview'
+        outputs:
+            returns the section from the start to the stop base in requested
+            chromosome, the reverse complement when StartBase>StopBase
+        """
+        
+        if output_format not in ('str','bytes','memoryview'):
+            raise Exception("unknown output format")
+        
+        if not self.index_loaded:
+            await self.__load_index__()
+        return await self.__fetch_region__(SequenceID,StartBase,StopBase,output_format)
+    
+    async def read_regions(self,Regions,output_format='str'):
+        """
+        await read_regions(Regions)
+        
+        inputs:
+            Regions : iterable of (SequenceID, StartBase, StopBase) tuples
+            output_format : 'str' (default), 'bytes' or 'memoryview'
+        outputs:
+            returns a list with the section of every region, in the order given
+        """
+        
+        return list(await self.asyncio.gather(*[self.read_in_section(SequenceID,StartBase,StopBase,output_format)
+                                                for SequenceID,StartBase,StopBase in Regions]))
@@ -23,9 +23,23 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import os, weakref
+
+from bgzf import is_gzip, is_bgzf, make_gzi, read_gzi, BGZF_Reader
+from binary_index import make_binary_index, BinaryIndex
+from metrics import Metrics
+
+try:
+    import fcntl
+except ImportError: # no advisory file locks, e.g. on Windows
+    fcntl=None
+
+
 class FASTA_IO:
     
-    import os, io, copy 
+    import os, io, copy, mmap, array, bisect, collections, contextlib, struct, threading, zlib
+    
+    OutputFormats=('str','bytes','memoryview','numpy','numpy_codes')
     
     RevCompDict={'A' : 'T',
                  'T' : 'A',
@@ -60,38 +74,189 @@ class FASTA_IO:
                  'h' : 'd',
                  'n' : 'n'}
 
-    def __init__(self,path_to_file): # initializes the object creates connection to the file and set intnial values
+    def __init__(self,path_to_file,use_mmap=False,cache_size=0,cache_block_size=65536,bgzf_cache_blocks=64,binary_index=False,metrics=None): # initializes the object creates connection to the file and set intnial values
         """
         FASTA_IO()
         
         inputs:
             path_to_file : path to indexed fasta reference file.
+            use_mmap : if True the fasta file is memory mapped and reads are
+                       sliced directly from the mapped bytes instead of
+                       positional reads on the file handle.
+            cache_size : memory budget in bytes of the LRU block cache, 0
+                         (default) disables the cache.
+            cache_block_size : number of bases per cached block.
+            bgzf_cache_blocks : number of decompressed BGZF blocks (64 KB
+                                each) kept for bgzip compressed files.
+            binary_index : look sequences up in a memory mapped binary copy
+                           of the .fai (path_to_file+'.fai.bin', see
+                           binary_index.py) instead of parsing the .fai. The
+                           copy is (re)built when missing or when the .fai
+                           changed, if it can not be written the .fai is used.
+            metrics : a Metrics object (see metrics.py) collecting call
+                      counts, latencies and I/O counters, True creates one.
+                      Off (None) by default, the I/O paths then only test
+                      for None. Read them with get_metrics().
+        
+        The index is loaded on first use, opening only checks that the files
+        exist.
+        
+        A bgzip (BGZF) compressed fasta file is read at random through its
+        .gzi block index (built in memory when the file is missing), the .fai
+        holds uncompressed offsets as written by make_fai or samtools faidx.
+        Compressed files are read-only and are never memory mapped.
+        
+        A journal left by an interrupted commit (see commit) is replayed when
+        the file is opened, unless another process holds the commit lock and
+        is still writing or replaying it.
+        
+        Reads never move a shared file position (os.pread or the memory map)
+        so one object can be shared between threads. Objects can be pickled
+        for multiprocessing workers and reopen their file handles lazily,
+        also after a fork. A forked child gets a new lock and an empty cache,
+        the parent's lock may have been held by a thread the child does not
+        have.
     
         """
         try: #try to open the file
             self.fasta_file_handle=''
             self.fai_file_handle=''
+            self.fasta_mmap=None
+            self.bgzf_reader=None
+            self.fai_binary=None
+            self.use_binary_index=binary_index
+            self.use_mmap=use_mmap
+            self.bgzf_cache_blocks=bgzf_cache_blocks
+            self.cache_size=cache_size
+            self.cache_block_size=cache_block_size
+            self.lock=self.threading.RLock()
+            _Readers[id(self)]=self # new lock after a fork, see _after_fork
+            self.clear_cache()
+            self.pending=None
+            self.metrics=Metrics() if metrics is True else metrics
             self.path_to_fasta_file=path_to_file
             self.path_to_fai_file=path_to_file+'.fai'
+            self.path_to_journal_file=path_to_file+'.journal'
             if self.os.path.exists(self.path_to_fasta_file) and  self.os.path.exists(self.path_to_fai_file):
-                self.fasta_file_handle = self.io.open(self.path_to_fasta_file,'r+')
-                self.fai_file_handle = self.io.open(self.path_to_fai_file,'r')
+                self.compressed=is_gzip(self.path_to_fasta_file)
+                self.fasta_file_handle = self.io.open(self.path_to_fasta_file,'rb' if self.compressed else 'r+b')
             else:
                 raise Exception
         except: #if file can not be opened create a file
             raise Exception("File or index could not be opened or does not exist")
         
-        try: 
-            self.__read_in_fai__()
-        except:
-            raise Exception("Could not process index")
+        if self.compressed:
+            if not is_bgzf(self.path_to_fasta_file):
+                raise Exception("gzip compressed Fasta file has to be compressed with bgzip")
+            try:
+                if self.os.path.exists(self.path_to_fasta_file+'.gzi'):
+                    self.gzi_blocks=read_gzi(self.path_to_fasta_file+'.gzi')
+                else:
+                    self.gzi_blocks=make_gzi(self.path_to_fasta_file,write=False)
+            except:
+                raise Exception("Could not process index")
+            
+        self.__open_handles__(reopen=False)
+        
+        if self.os.path.exists(self.path_to_journal_file): # a commit was interrupted or is running elsewhere
+            with self.lock:
+                if self.__lock_file__(blocking=False):
+                    try:
+                        if self.os.path.exists(self.path_to_journal_file): # not finished by its writer meanwhile
+                            self.__replay_journal__()
+                    finally:
+                        self.__unlock_file__()
+        
+    def __open_handles__(self,reopen=True):
+        
+        #######################################################################
+        # (Re)open the fasta file handle and memory map for this process.
+        # Handles inherited over a fork or missing after unpickling are
+        # replaced, the process id tells whether that is needed.
+        #######################################################################
+        with self.lock:
+            if reopen and getattr(self,'pid',None)==self.os.getpid(): # another thread reopened them meanwhile
+                return
+            if reopen:
+                try:
+                    self.fasta_file_handle = self.io.open(self.path_to_fasta_file,'rb' if self.compressed else 'r+b')
+                except:
+                    raise Exception("File or index could not be opened or does not exist")
+            self.fasta_mmap=None
+            self.bgzf_reader=None
+            if self.compressed:
+                self.bgzf_reader=BGZF_Reader(self.fasta_file_handle,self.gzi_blocks,self.bgzf_cache_blocks)
+            elif self.use_mmap:
+                try:
+                    self.fasta_mmap=self.mmap.mmap(self.fasta_file_handle.fileno(),0,access=self.mmap.ACCESS_READ)
+                except:
+                    raise Exception("File could not be memory mapped")
+            self.pid=self.os.getpid()
+    
+    def __getstate__(self):
+        
+        ###### pickle the index and settings, not the handles, lock, cache or metrics
+        state=self.__dict__.copy()
+        for name in ('fasta_file_handle','fai_file_handle','fasta_mmap','bgzf_reader','fai_binary','lock','cache','metrics'):
+            state.pop(name,None)
+        return state
+    
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self.fasta_file_handle=''
+        self.fai_file_handle=''
+        self.fasta_mmap=None
+        self.bgzf_reader=None
+        self.fai_binary=None
+        self.lock=self.threading.RLock()
+        _Readers[id(self)]=self
+        self.clear_cache()
+        self.metrics=None
+        self.pid=None # handles are opened on first use
+    
+    def __after_fork__(self):
+        
+        #######################################################################
+        # Called in a forked child before anything else runs. The inherited
+        # lock (and that of the metrics) may be held by a parent thread that
+        # does not exist in the child and would never be released, and the
+        # cache may be half updated. The handles are replaced on first use
+        # as the pid changed.
+        #######################################################################
+        self.lock=self.threading.RLock()
+        self.clear_cache()
+        if self.metrics is not None:
+            self.metrics.lock=self.metrics.threading.Lock()
         
     def close(self):
         """Close the file handles."""
+        if self.fasta_mmap is not None:
+            try:
+                self.fasta_mmap.close()
+            except BufferError: # memoryviews handed out by read_in_section still reference the map
+                pass
+            self.fasta_mmap=None
         if self.fasta_file_handle!= '':
             self.fasta_file_handle.close() 
         if self.fai_file_handle!= '':
             self.fai_file_handle.close() 
+        if self.fai_binary is not None:
+            self.fai_binary.close()
+            self.fai_binary=None
+
+    def release_handles(self):
+        """
+        release_handles()
+
+        Close the file handles but keep the index, cache, pending edits and
+        settings. The handles are reopened on the next read or write, the
+        index is not read again.
+        """
+        with self.lock:
+            self.close()
+            self.fasta_file_handle=''
+            self.bgzf_reader=None
+            self.pid=None # reopen on first use, as after unpickling
 
     def __del__(self): #When object is deleted closes the connection to the file
         self.close()
@@ -107,13 +272,67 @@ class FASTA_IO:
         #######################################################################
         # Load in and process data from fai file
         #######################################################################
-        fai_data = [line.strip().split('\t') for line in self.fai_file_handle.readlines()]
-        self.SequenceIDs = [line[0].split(" ")[0] for line in fai_data] 
-        self.Length = [int(line[1]) for line in fai_data] 
-        self.Start = [int(line[2]) for line in fai_data] 
-        self.BasesPerLine = [int(line[3]) for line in fai_data] 
-        self.BytesPerLine = [int(line[4]) for line in fai_data] 
-        self.fai_file_handle.seek(0,0)
+        with self.io.open(self.path_to_fai_file,'r') as fai_file_handle:
+            text = fai_file_handle.read().replace('\r','').strip('\n')
+        fields = text.replace('\n','\t').split('\t') if text else []
+        if len(fields) == 5*(text.count('\n')+1) or not text: # one split for the whole file, then strided columns
+            Columns = [fields[column::5] for column in range(5)]
+        else: # blank lines or extra columns
+            Columns = list(zip(*[line.split('\t') for line in text.splitlines() if line.strip()]))
+        del fields
+        SequenceIDs = Columns[0]
+        if ' ' in '\n'.join(SequenceIDs):
+            SequenceIDs = [name.split(" ")[0] for name in SequenceIDs]
+        self.Length = self.array.array('q',map(int,Columns[1]))
+        self.Start = self.array.array('q',map(int,Columns[2]))
+        self.BasesPerLine = self.array.array('q',map(int,Columns[3]))
+        self.BytesPerLine = self.array.array('q',map(int,Columns[4]))
+        
+        ###### name -> row lookup, the first entry wins for duplicated names like list.index
+        self.SequenceIndex = dict(zip(reversed(SequenceIDs),range(len(SequenceIDs)-1,-1,-1)))
+        self.SequenceIDs = SequenceIDs
+    
+    def __getattr__(self,name):
+        
+        ###### the index is read on first use of one of its attributes
+        if name in ('SequenceIDs','Length','Start','BasesPerLine','BytesPerLine','SequenceIndex') and 'lock' in self.__dict__:
+            with self.lock:
+                if 'SequenceIDs' not in self.__dict__:
+                    if self.metrics is not None:
+                        StartTime=self.metrics.clock()
+                    try:
+                        self.__read_in_fai__()
+                    except:
+                        raise Exception("Could not process index")
+                    if self.metrics is not None:
+                        self.metrics.record('load_index',StartTime,len(self.__dict__['SequenceIDs']))
+            return self.__dict__[name]
+        raise AttributeError(name)
+    
+    def __binary_index__(self):
+        
+        #######################################################################
+        # The memory mapped binary index, rebuilt when it is missing or older
+        # than the .fai. None when it can not be written, the .fai is then
+        # used instead.
+        #######################################################################
+        if self.fai_binary is None and self.use_binary_index:
+            with self.lock:
+                if self.fai_binary is None and self.use_binary_index:
+                    path_to_index=self.path_to_fai_file+'.bin'
+                    Index=None
+                    try:
+                        if self.os.path.exists(path_to_index):
+                            Index=BinaryIndex(path_to_index)
+                            if not Index.is_current(self.path_to_fai_file):
+                                Index.close()
+                                Index=None
+                        if Index is None:
+                            Index=BinaryIndex(make_binary_index(self.path_to_fai_file,path_to_index))
+                    except:
+                        self.use_binary_index=False
+                    self.fai_binary=Index
+        return self.fai_binary
         
     def get_sequence_IDs(self):
         """
@@ -127,8 +346,216 @@ class FASTA_IO:
             all avaialble sequence IDs found in the file .
 
         """
+        if self.__binary_index__() is not None:
+            return self.fai_binary.get_sequence_IDs()
         return self.SequenceIDs
-    def read_in_section(self,SequenceID,StartBase,StopBase):
+    
+    def __get_record__(self,SequenceID):
+        
+        #######################################################################
+        # Look up the index entry of a sequence:
+        # (Length, Start, BasesPerLine, BytesPerLine)
+        #######################################################################
+        if self.__binary_index__() is not None:
+            Record=self.fai_binary.get_record(SequenceID) if isinstance(SequenceID,str) else None
+            if Record is None:
+                raise Exception("incorrect chromosome id given")
+            return Record
+        
+        Index=self.SequenceIndex # reads the .fai on first use
+        try: 
+            SequenceIndex=Index[SequenceID]
+            return (self.Length[SequenceIndex],self.Start[SequenceIndex],
+                    self.BasesPerLine[SequenceIndex],self.BytesPerLine[SequenceIndex])
+        except: #if sequence can not be found 
+            raise Exception("incorrect chromosome id given")
+    
+    def __read_bases__(self,Record,StartBase,StopBase,zero_copy=False,cached=True):
+        
+        #######################################################################
+        # Forward strand bases from StartBase to StopBase of an already
+        # validated region as a bytes-like object, with the edits of a batch
+        # in progress applied.
+        #######################################################################
+        if StartBase==StopBase:
+            return b''
+        if self.cache_size>0 and cached:
+            data_out=self.__read_cached__(Record,StartBase,StopBase)
+        else:
+            data_out=self.__read_file__(Record,StartBase,StopBase,zero_copy)
+        if self.pending:
+            data_out=self.__overlay_pending__(Record,StartBase,StopBase,data_out)
+        return data_out
+    
+    def __read_cached__(self,Record,StartBase,StopBase):
+        
+        #######################################################################
+        # Assemble the region from cached blocks of cache_block_size bases,
+        # blocks are keyed by (sequence start offset, block number) and
+        # missing blocks are read from the file and cached. A missing block
+        # is read outside the lock, it is only cached when no write bumped
+        # cache_generation meanwhile, otherwise it may hold the old bases.
+        #######################################################################
+        BlockSize=self.cache_block_size
+        FirstBlock=StartBase//BlockSize
+        LastBlock=(StopBase-1)//BlockSize
+        Blocks=[]
+        for Block in range(FirstBlock,LastBlock+1):
+            Key=(Record[1],Block)
+            with self.lock:
+                data=self.cache.get(Key)
+                if data is not None:
+                    self.cache_hits+=1
+                    self.cache.move_to_end(Key)
+                Generation=self.cache_generation
+            if data is None: # read outside the lock so other threads are not blocked on I/O
+                data=bytes(self.__read_file__(Record,Block*BlockSize,min((Block+1)*BlockSize,Record[0])))
+                with self.lock:
+                    self.cache_misses+=1
+                    if Key not in self.cache and Generation==self.cache_generation:
+                        self.cache[Key]=data
+                        self.cache_bytes+=len(data)
+                    while self.cache_bytes>self.cache_size and len(self.cache)>1:
+                        self.cache_bytes-=len(self.cache.popitem(last=False)[1])
+                        self.cache_evictions+=1
+            Blocks.append(data)
+        
+        if len(Blocks)==1:
+            return Blocks[0][StartBase-FirstBlock*BlockSize:StopBase-FirstBlock*BlockSize]
+        Blocks[0]=Blocks[0][StartBase-FirstBlock*BlockSize:]
+        Blocks[-1]=Blocks[-1][:StopBase-LastBlock*BlockSize]
+        return Blocks[0][:0].join(Blocks)
+    
+    def __invalidate_cache__(self,Record,StartBase,StopBase):
+        
+        ###### drop cached blocks overlapping a region that was written to
+        with self.lock:
+            self.cache_generation+=1
+            for Block in range(StartBase//self.cache_block_size,(StopBase-1)//self.cache_block_size+1):
+                data=self.cache.pop((Record[1],Block),None)
+                if data is not None:
+                    self.cache_bytes-=len(data)
+    
+    def clear_cache(self):
+        """Empty the block cache and reset its counters."""
+        with self.lock:
+            self.cache_generation=self.__dict__.get('cache_generation',0)+1 # reads in flight must not fill the new cache
+            self.cache=self.collections.OrderedDict()
+            self.cache_bytes=0
+            self.cache_hits=0
+            self.cache_misses=0
+            self.cache_evictions=0
+    
+    def get_cache_stats(self):
+        """
+        get_cache_stats()
+
+        Returns
+        -------
+        DICT
+            hits, misses, evictions, number of cached blocks and the bytes they
+            hold against the memory budget.
+
+        """
+        return {'hits':self.cache_hits,
+                'misses':self.cache_misses,
+                'evictions':self.cache_evictions,
+                'blocks':len(self.cache),
+                'bytes':self.cache_bytes,
+                'budget':self.cache_size}
+    
+    def get_metrics(self):
+        """
+        get_metrics()
+        
+        outputs:
+            returns Metrics.snapshot() with the block cache stats under
+            'cache', or None when the object was created without metrics
+        """
+        if self.metrics is None:
+            return None
+        snapshot=self.metrics.snapshot()
+        snapshot['cache']=self.get_cache_stats()
+        return snapshot
+    
+    def __read_file__(self,Record,StartBase,StopBase,zero_copy=False):
+        
+        #######################################################################
+        # Read the region straight from the file with a positional read (or a
+        # slice of the memory map), nothing depends on a shared file position.
+        # Line terminators are dropped using the line geometry from the index
+        # rather than by scanning the data, a region inside a single line is
+        # returned as read.
+        #######################################################################
+        Length,SequenceStart,BasesPerLine,BytesPerLine=Record
+        ByteTail=BytesPerLine-BasesPerLine
+        line_at_start=StartBase//BasesPerLine
+        line_at_stop=(StopBase-1)//BasesPerLine
+        offset=SequenceStart+(line_at_start*BytesPerLine)+(StartBase%BasesPerLine)
+        length_to_read=(StopBase-StartBase)+((line_at_stop-line_at_start)*ByteTail)
+        
+        if self.pid!=self.os.getpid():
+            self.__open_handles__()
+        
+        if self.metrics is not None:
+            self.metrics.add_io(reads=1,bytes_read=length_to_read,
+                                seeks=int(self.fasta_mmap is None and self.bgzf_reader is None and not hasattr(self.os,'pread')))
+        
+        try: # get data start to stop
+            if self.bgzf_reader is not None:
+                data_out=self.bgzf_reader.pread(length_to_read,offset)
+            elif self.fasta_mmap is not None:
+                if zero_copy and (line_at_start==line_at_stop or ByteTail==0):
+                    return memoryview(self.fasta_mmap)[offset:offset+length_to_read]
+                data_out=self.fasta_mmap[offset:offset+length_to_read]
+            elif hasattr(self.os,'pread'):
+                data_out=self.os.pread(self.fasta_file_handle.fileno(),length_to_read,offset)
+            else:
+                with self.lock:
+                    self.fasta_file_handle.seek(offset,0)
+                    data_out=self.fasta_file_handle.read(length_to_read)
+        except: #if could not get data
+            raise Exception("Requested data outside the file range")
+        
+        if line_at_start==line_at_stop or ByteTail==0:
+            return data_out
+        data_out=bytearray(data_out)
+        first_tail=BasesPerLine-(StartBase%BasesPerLine)
+        for removed in range(ByteTail): # each pass removes one terminator byte from every line
+            del data_out[first_tail::BytesPerLine-removed]
+        return data_out
+    
+    def __format_output__(self,data_out,RevComp,output_format):
+        
+        #######################################################################
+        # Reverse complement if requested and convert to the output format
+        #######################################################################
+        if RevComp:
+            if self.metrics is not None:
+                StartTime=self.metrics.clock()
+                data_out=reverse_complement(data_out)
+                self.metrics.record('reverse_complement',StartTime,len(data_out))
+            else:
+                data_out=reverse_complement(data_out)
+            
+        if output_format in ('numpy','numpy_codes'):
+            numpy=_import_numpy()
+            if isinstance(data_out,str):
+                data_out=data_out.encode('ascii')
+            if output_format=='numpy_codes':
+                data_out=bytes(data_out).translate(BaseCodeTable)
+            return numpy.frombuffer(data_out,dtype=numpy.uint8)
+        if output_format=='str':
+            if isinstance(data_out,str):
+                return data_out
+            return bytes(data_out).decode('ascii')
+        if isinstance(data_out,str):
+            data_out=data_out.encode('ascii')
+        if output_format=='bytes':
+            return bytes(data_out)
+        return memoryview(data_out)
+        
+    def read_in_section(self,SequenceID,StartBase,StopBase,output_format='str'):
         """
         read_in_section(SequenceID,StartBase,StopBase)
         
@@ -136,54 +563,238 @@ class FASTA_IO:
             SequenceID : the chromosome name e.g. 1 or X
             StartBase : start location of sequence to read (bed format) 
             StopBase : end location of sequence to read (bed format)
+            output_format : 'str' (default), 'bytes', 'memoryview', 'numpy'
+                            (uint8 array of the ASCII codes) or 'numpy_codes'
+                            (uint8 array with A=0 C=1 G=2 T=3 and 4 for any
+                            other base, either case). In mmap mode a
+                            'memoryview' or 'numpy' array of a region inside a
+                            single line references the mapped file without
+                            copying. Arrays built on bytes are read-only.
         outputs:
             returns the section from the start to the stop base in requested chromosome
         """
         
+        if output_format not in self.OutputFormats:
+            raise Exception("unknown output format")
+        if self.metrics is not None:
+            StartTime=self.metrics.clock()
+        
         if StartBase>StopBase:
             RevComp=True
-            temp=self.copy.deepcopy(StartBase)
-            StartBase=self.copy.deepcopy(StopBase)
-            StopBase=self.copy.deepcopy(temp)
+            StartBase,StopBase=StopBase,StartBase
         else:
             RevComp=False
         
-        try: #get the correct file handle for the chromsome
-            SequenceIndex=self.SequenceIDs.index(SequenceID)
-            File_handle=self.fasta_file_handle
-            SequenceStart=self.Start[SequenceIndex]
-            Length=self.Length[SequenceIndex]
-            BasesPerLine=self.BasesPerLine[SequenceIndex]
-            BytesPerLine=self.BytesPerLine[SequenceIndex]
-            ByteTail=BytesPerLine-BasesPerLine
-        except: #if file handle can not be found 
-            raise Exception("incorrect chromosome id given")
+        Record=self.__get_record__(SequenceID)
             
         if StartBase<0:
             raise Exception("start position is less than 0")
             
-        if StopBase>Length:
+        if StopBase>Record[0]:
             raise Exception("stop position exceeds chromosome length")
-            
-            
-            
-            
-        try: # get data start to stop
-            number_of_new_line_at_start=(StartBase)//BasesPerLine
-            number_of_new_line_at_stop=(StopBase-1)//BasesPerLine
-            additional_bytes=(number_of_new_line_at_stop-number_of_new_line_at_start)*ByteTail
-            length_to_read=StopBase-StartBase
-            File_handle.seek(StartBase+SequenceStart+(number_of_new_line_at_start*ByteTail),0)
-            data_out=File_handle.read(length_to_read+additional_bytes).replace('\n','').replace('\r','').replace(' ','')
-            
-            if RevComp:
-                data_out="".join([self.RevCompDict.get(value,"N") for value in data_out[::-1]])
-            
-        except: #if could not get data
-            raise Exception("Requested data outside the file range")
-            
+        
+        data_out=self.__read_bases__(Record,StartBase,StopBase,zero_copy=(output_format in ('memoryview','numpy') and not RevComp))
+        data_out=self.__format_output__(data_out,RevComp,output_format)
+        if self.metrics is not None:
+            self.metrics.record('read_in_section',StartTime,StopBase-StartBase)
         return data_out
     
+    def read_regions(self,Regions,output_format='str',merge_gap=0,MaxSpan=1<<22):
+        """
+        read_regions(Regions)
+        
+        inputs:
+            Regions : iterable of (SequenceID, StartBase, StopBase) tuples using
+                      the same conventions as read_in_section, StartBase>StopBase
+                      returns the reverse complement
+            output_format : 'str' (default), 'bytes', 'memoryview', 'numpy' or
+                            'numpy_codes', see read_in_section
+            merge_gap : regions on the same sequence closer than this many bases
+                        are fetched with one read
+            MaxSpan : largest number of bases combined into one read, a
+                      region longer than this is read on its own
+        outputs:
+            returns a list with the section of every region, in the order given
+        
+        Regions are grouped by sequence and sorted by position, overlapping and
+        adjacent regions are merged so each merged span is read from the file
+        once, the regions are then sliced back out of the spans. A span ends
+        before the region that would make it longer than MaxSpan, that region
+        starts the next span, so every region lies inside one span.
+        """
+        
+        if output_format not in self.OutputFormats:
+            raise Exception("unknown output format")
+        if self.metrics is not None:
+            StartTime=self.metrics.clock()
+        
+        ###### group the regions by sequence and validate them
+        Records={}
+        Grouped={}
+        Regions=list(Regions)
+        for RegionIndex,(SequenceID,StartBase,StopBase) in enumerate(Regions):
+            if SequenceID not in Records:
+                Records[SequenceID]=self.__get_record__(SequenceID)
+                Grouped[SequenceID]=[]
+            Lower,Upper=min(StartBase,StopBase),max(StartBase,StopBase)
+            if Lower<0:
+                raise Exception("start position is less than 0")
+            if Upper>Records[SequenceID][0]:
+                raise Exception("stop position exceeds chromosome length")
+            Grouped[SequenceID].append((Lower,Upper,StartBase>StopBase,RegionIndex))
+        
+        ###### read each merged span once and cut the regions out of it
+        data_out=[None]*len(Regions)
+        for SequenceID,Intervals in Grouped.items():
+            Intervals.sort()
+            SpanStart,SpanStop=Intervals[0][0],Intervals[0][1]
+            Members=[Intervals[0]]
+            for Interval in Intervals[1:]+[None]:
+                if (Interval is not None and Interval[0]<=SpanStop+merge_gap
+                    and max(SpanStop,Interval[1])-SpanStart<=MaxSpan):
+                    SpanStop=max(SpanStop,Interval[1])
+                    Members.append(Interval)
+                    continue
+                Span=self.__read_bases__(Records[SequenceID],SpanStart,SpanStop)
+                if output_format=='str':
+                    Span=bytes(Span).decode('ascii') # decode once, slices are then plain str slices
+                for Lower,Upper,RevComp,RegionIndex in Members:
+                    if RevComp or output_format!='str':
+                        data_out[RegionIndex]=self.__format_output__(Span[Lower-SpanStart:Upper-SpanStart],RevComp,output_format)
+                    else:
+                        data_out[RegionIndex]=Span[Lower-SpanStart:Upper-SpanStart]
+                if Interval is not None:
+                    SpanStart,SpanStop=Interval[0],Interval[1]
+                    Members=[Interval]
+        if self.metrics is not None:
+            self.metrics.record('read_regions',StartTime,
+                                sum(Upper-Lower for Intervals in Grouped.values() for Lower,Upper,RevComp,RegionIndex in Intervals))
+        return data_out
+    
+    def read_regions_from_bed(self,path_to_bed,output_format='str',merge_gap=0):
+        """
+        read_regions_from_bed(path_to_bed)
+        
+        inputs:
+            path_to_bed : path to a bed file, the first three columns give the
+                          region and a '-' in the sixth (strand) column returns
+                          the reverse complement
+            output_format : see read_regions
+            merge_gap : see read_regions
+        outputs:
+            returns a list with the section of every bed line, in file order
+        """
+        
+        return self.read_regions(read_bed(path_to_bed),output_format=output_format,merge_gap=merge_gap)
+    
+    def read_regions_into(self,Regions,out=None,output_format='numpy',merge_gap=0):
+        """
+        read_regions_into(Regions,out)
+        
+        inputs:
+            Regions : iterable of (SequenceID, StartBase, StopBase) tuples of
+                      equal length, see read_regions
+            out : preallocated 2-D numpy uint8 array with one row per region,
+                  allocated when None
+            output_format : 'numpy' (ASCII codes) or 'numpy_codes' (0-4 base
+                            codes), see read_in_section
+            merge_gap : see read_regions
+        outputs:
+            returns out with row i holding region i
+        
+        The regions are read with read_regions, joined and converted in one
+        pass and copied into out once, there are no per region arrays.
+        """
+        
+        numpy=_import_numpy()
+        if output_format not in ('numpy','numpy_codes'):
+            raise Exception("unknown output format")
+        
+        Regions=list(Regions)
+        Widths=set(abs(StopBase-StartBase) for SequenceID,StartBase,StopBase in Regions)
+        if out is None:
+            if len(Widths)>1:
+                raise Exception("regions have to be of equal length")
+            out=numpy.empty((len(Regions),Widths.pop() if Widths else 0),dtype=numpy.uint8)
+        if out.ndim!=2 or out.dtype!=numpy.uint8 or out.shape[0]!=len(Regions):
+            raise Exception("out has to be a 2-D uint8 array with a row per region")
+        if Widths-{out.shape[1]}:
+            raise Exception("regions have to be as long as the rows of out")
+        
+        data_out=b''.join(self.read_regions(Regions,'bytes',merge_gap))
+        if output_format=='numpy_codes':
+            data_out=data_out.translate(BaseCodeTable)
+        out[...]=numpy.frombuffer(data_out,dtype=numpy.uint8).reshape(out.shape)
+        return out
+
+    def iter_sequence(self,SequenceID,chunk_size=1<<20,output_format='str'):
+        """
+        iter_sequence(SequenceID,chunk_size)
+
+        inputs:
+            SequenceID : the chromosome name e.g. 1 or X
+            chunk_size : number of bases per chunk
+            output_format : 'str' (default), 'bytes' or 'memoryview'
+        outputs:
+            generator over the whole sequence in chunks of chunk_size bases,
+            the last chunk may be shorter. Memory use is bounded by the chunk
+            size; the chunks are read around the block cache so a scan does
+            not evict it.
+        """
+
+        if output_format not in ('str','bytes','memoryview'):
+            raise Exception("unknown output format")
+        if chunk_size<1:
+            raise Exception("chunk size has to be positive")
+
+        Record=self.__get_record__(SequenceID)
+        for StartBase in range(0,Record[0],chunk_size):
+            data_out=self.__read_bases__(Record,StartBase,min(Record[0],StartBase+chunk_size),cached=False)
+            yield self.__format_output__(data_out,False,output_format)
+
+    def iter_windows(self,SequenceID,window,step=1,output_format='str',chunk_size=1<<20):
+        """
+        iter_windows(SequenceID,window,step)
+
+        inputs:
+            SequenceID : the chromosome name e.g. 1 or X
+            window : number of bases per window
+            step : distance in bases between the starts of two windows
+            output_format : 'str' (default), 'bytes' or 'memoryview', a
+                            'memoryview' window is a view of the read buffer
+                            and is only valid until the next window
+            chunk_size : number of bases read from the file at a time
+        outputs:
+            generator over the windows [i*step, i*step+window) that lie fully
+            inside the sequence. The file is read in chunks, the bases shared
+            by windows on both sides of a chunk boundary are carried over
+            instead of being read again.
+        """
+
+        if output_format not in ('str','bytes','memoryview'):
+            raise Exception("unknown output format")
+        if window<1 or step<1:
+            raise Exception("window and step have to be positive")
+
+        Record=self.__get_record__(SequenceID)
+        Length=Record[0]
+        buffer=b'' if output_format!='str' else ''
+        buffer_start=0
+        position=0
+        while position+window<=Length:
+            buffer_stop=buffer_start+len(buffer)
+            if position+window>buffer_stop: # refill, keeping the part of the buffer the next window starts in
+                read_from=max(position,buffer_stop)
+                read_to=min(Length,max(read_from+chunk_size,position+window))
+                data=self.__format_output__(self.__read_bases__(Record,read_from,read_to,cached=False),False,
+                                            'str' if output_format=='str' else 'bytes')
+                buffer=buffer[position-buffer_start:]+data if position<buffer_stop else data
+                buffer_start=position
+                view=memoryview(buffer) if output_format=='memoryview' else buffer
+            start=position-buffer_start
+            yield view[start:start+window]
+            position+=step
+
     def overwrite_section(self,SequenceID,StartBase,sequence):
         """
         overwrite_section(SequenceID,StartBase,sequence)
@@ -197,19 +808,14 @@ class FASTA_IO:
         """
           
         if len(sequence)>0:
+            if self.metrics is not None:
+                StartTime=self.metrics.clock()
         
             StopBase=StartBase+len(sequence)
      
-            try: #get the correct file handle for the chromsome
-                SequenceIndex=self.SequenceIDs.index(SequenceID)
-                File_handle=self.fasta_file_handle
-                SequenceStart=self.Start[SequenceIndex]
-                Length=self.Length[SequenceIndex]
-                BasesPerLine=self.BasesPerLine[SequenceIndex]
-                BytesPerLine=self.BytesPerLine[SequenceIndex]
-                ByteTail=BytesPerLine-BasesPerLine
-            except: #if file handle can not be found 
-                raise Exception("incorrect chromosome id given")
+            Record=self.__get_record__(SequenceID)
+            Length,SequenceStart,BasesPerLine,BytesPerLine=Record
+            ByteTail=BytesPerLine-BasesPerLine
                 
             if StartBase<1:
                 raise Exception("start position is less than 1")
@@ -217,27 +823,334 @@ class FASTA_IO:
             if StopBase>Length:
                 raise Exception("stop position exceeds chromosome length")
                 
+            if self.compressed:
+                raise Exception("compressed Fasta files are read-only")
+            if self.pending is not None: # batch in progress, keep the edit in memory
+                try:
+                    self.__add_edit__(Record,StartBase,sequence.encode('ascii'))
+                except:
+                    raise Exception("Could not write to file")
+                if self.metrics is not None:
+                    self.metrics.record('overwrite_section',StartTime,len(sequence))
+                return
+            if self.pid!=self.os.getpid():
+                self.__open_handles__()
+            File_handle=self.fasta_file_handle
+            
+            with self.lock:
+                self.__invalidate_cache__(Record,StartBase,StopBase)
                 
-            try: # get data start to stop
-                number_of_new_line_at_start=(StartBase)//BasesPerLine
-                File_handle.seek(StartBase+SequenceStart+(number_of_new_line_at_start*ByteTail),0)
-                
-                ### write the data for the line that contains the start position
-                NumberBaseFirstLine=((number_of_new_line_at_start+1)*BasesPerLine)-StartBase
-                first_chuck=sequence[:NumberBaseFirstLine]
-                File_handle.write(first_chuck)
-                
-                ### write the data for each subseqent line
-                sequence=sequence[NumberBaseFirstLine:]
-                for chunk in [sequence[i:i+BasesPerLine] for i in range(0, len(sequence), BasesPerLine)]:
-                    number_of_new_line_at_start+=1
-                    File_handle.seek(SequenceStart+(number_of_new_line_at_start*BytesPerLine),0)
-                    File_handle.write(chunk)
-                    File_handle.flush()
-                
-            except: #if could not get data
-                raise Exception("Could not write to file")
+                try: # get data start to stop
+                    sequence=sequence.encode('ascii')
+                    number_of_new_line_at_start=(StartBase)//BasesPerLine
+                    File_handle.seek(StartBase+SequenceStart+(number_of_new_line_at_start*ByteTail),0)
+                    
+                    ### write the data for the line that contains the start position
+                    NumberBaseFirstLine=((number_of_new_line_at_start+1)*BasesPerLine)-StartBase
+                    first_chuck=sequence[:NumberBaseFirstLine]
+                    File_handle.write(first_chuck)
+                    
+                    ### write the data for each subseqent line
+                    sequence=sequence[NumberBaseFirstLine:]
+                    for chunk in [sequence[i:i+BasesPerLine] for i in range(0, len(sequence), BasesPerLine)]:
+                        number_of_new_line_at_start+=1
+                        File_handle.seek(SequenceStart+(number_of_new_line_at_start*BytesPerLine),0)
+                        File_handle.write(chunk)
+                    File_handle.flush() # make the edit visible to positional and memory mapped readers
+                    
+                except: #if could not get data
+                    raise Exception("Could not write to file")
+            if self.metrics is not None:
+                Lines=(StopBase-1)//BasesPerLine-StartBase//BasesPerLine+1
+                self.metrics.add_io(writes=Lines,bytes_written=StopBase-StartBase,seeks=Lines,flushes=1)
+                self.metrics.record('overwrite_section',StartTime,StopBase-StartBase)
 
+    def begin_batch(self):
+        """
+        begin_batch()
+        
+        Start collecting the edits of overwrite_section and the masking
+        methods in memory instead of writing them to the file. Reads see the
+        pending edits. commit() writes them, rollback() drops them.
+        """
+        with self.lock:
+            if self.pending is not None:
+                raise Exception("batch already in progress")
+            self.pending={}
+    
+    def rollback(self):
+        """Drop the pending edits of the batch in progress."""
+        with self.lock:
+            if self.pending is None:
+                raise Exception("no batch in progress")
+            self.pending=None
+    
+    def commit(self,journal=True,merge_gap=4096,MaxSpan=1<<22):
+        """
+        commit()
+        
+        inputs:
+            journal : write the edits to a journal file before the fasta file
+            merge_gap : edits on the same sequence closer than this many bases
+                        are written with one write, the bases in between are
+                        read and written back unchanged
+            MaxSpan : largest number of bases combined into one write
+        
+        Write the pending edits and end the batch. Overlapping and adjacent
+        edits are merged, later edits win, and the merged edits are written
+        in file order with one positional write per span.
+        
+        With journal=True the spans are first written and fsynced to
+        path_to_file+'.journal' with a checksum, and the directory is fsynced
+        so the journal entry exists, then copied into the fasta file, which
+        is fsynced before the journal is removed (and the directory fsynced
+        again). A crash before
+        the journal is complete leaves the fasta file untouched, a crash
+        after it is repaired by replaying the journal on the next open.
+        Writing and replaying the journal holds an advisory lock (flock) on
+        the fasta file, so other processes neither replay nor remove a
+        journal that is in use and concurrent commits are serialized.
+        """
+        with self.lock:
+            if self.pending is None:
+                raise Exception("no batch in progress")
+            if not self.pending:
+                self.pending=None
+                return
+            if self.metrics is not None:
+                StartTime=self.metrics.clock()
+            if self.pid!=self.os.getpid():
+                self.__open_handles__()
+            try:
+                Spans=self.__pending_spans__(merge_gap,MaxSpan)
+                if journal:
+                    self.__lock_file__()
+                    try:
+                        if self.os.path.exists(self.path_to_journal_file): # left by an interrupted commit
+                            self.__replay_journal__()
+                        self.__write_journal__(Spans)
+                        self.__replay_journal__()
+                    finally:
+                        self.__unlock_file__()
+                else:
+                    for SpanStart,data in Spans:
+                        self.__write_at__(SpanStart,data)
+                    self.fasta_file_handle.flush()
+                    if self.metrics is not None:
+                        self.metrics.add_io(flushes=1)
+            except:
+                raise Exception("Could not write to file")
+            Bases=0
+            for Record,Edits in self.pending.values():
+                Starts,Stops,Data=Edits.runs()
+                if Starts:
+                    self.__invalidate_cache__(Record,Starts[0],Stops[-1])
+                    Bases+=sum(Stops)-sum(Starts)
+            self.pending=None
+            if self.metrics is not None:
+                self.metrics.record('commit',StartTime,Bases)
+    
+    @contextlib.contextmanager
+    def batch(self,journal=True,merge_gap=4096):
+        """
+        batch()
+        
+        Context manager around begin_batch(): the edits are committed when
+        the block ends and rolled back if it raises.
+        """
+        self.begin_batch()
+        try:
+            yield self
+        except:
+            self.rollback()
+            raise
+        self.commit(journal=journal,merge_gap=merge_gap)
+    
+    def __add_edit__(self,Record,StartBase,data):
+        with self.lock:
+            if Record[1] not in self.pending:
+                self.pending[Record[1]]=(Record,_PendingEdits())
+            self.pending[Record[1]][1].add(StartBase,data)
+    
+    def __overlay_pending__(self,Record,StartBase,StopBase,data_out):
+        
+        ###### copy the pending edits overlapping the region over data_out
+        with self.lock:
+            if not self.pending or Record[1] not in self.pending:
+                return data_out
+            Starts,Stops,Data=self.pending[Record[1]][1].runs()
+            Index=max(0,self.bisect.bisect_right(Starts,StartBase)-1)
+            while Index<len(Starts) and Starts[Index]<StopBase:
+                Lower,Upper=max(Starts[Index],StartBase),min(Stops[Index],StopBase)
+                if Lower<Upper:
+                    if not isinstance(data_out,bytearray):
+                        data_out=bytearray(data_out)
+                    data_out[Lower-StartBase:Upper-StartBase]=Data[Index][Lower-Starts[Index]:Upper-Starts[Index]]
+                Index+=1
+        return data_out
+    
+    def __pending_spans__(self,merge_gap,MaxSpan):
+        
+        #######################################################################
+        # Generator of (file offset, bytes) writes for the pending edits in
+        # file order. Nearby merged edits share a span, the span is read from
+        # the file and the edits are copied in line by line so the line
+        # terminators are kept.
+        #######################################################################
+        for SequenceStart in sorted(self.pending):
+            Record,Edits=self.pending[SequenceStart]
+            Length,SequenceStart,BasesPerLine,BytesPerLine=Record
+            Starts,Stops,Data=Edits.runs()
+            
+            def offset(Base): # file offset of a base
+                return SequenceStart+(Base//BasesPerLine)*BytesPerLine+(Base%BasesPerLine)
+            
+            Index=0
+            while Index<len(Starts):
+                First=Index
+                Index+=1
+                while (Index<len(Starts) and Starts[Index]-Stops[Index-1]<=merge_gap
+                       and Stops[Index]-Starts[First]<=MaxSpan):
+                    Index+=1
+                SpanStart=offset(Starts[First])
+                data=bytearray(self.__read_at__(SpanStart,offset(Stops[Index-1]-1)+1-SpanStart))
+                for Run in range(First,Index):
+                    Base,Position=Starts[Run],0
+                    Line,Column=divmod(Base,BasesPerLine)
+                    if Column+Stops[Run]-Base<=BasesPerLine: # the run is inside one line
+                        Target=SequenceStart+Line*BytesPerLine+Column-SpanStart
+                        data[Target:Target+Stops[Run]-Base]=Data[Run]
+                        continue
+                    while Base<Stops[Run]:
+                        Count=min(Stops[Run]-Base,BasesPerLine-Base%BasesPerLine)
+                        Target=offset(Base)-SpanStart
+                        data[Target:Target+Count]=Data[Run][Position:Position+Count]
+                        Base+=Count
+                        Position+=Count
+                yield SpanStart,data
+    
+    def __lock_file__(self,blocking=True):
+        
+        #######################################################################
+        # Take the advisory lock on the fasta file that guards the journal.
+        # flock locks belong to the open file, so they also exclude other
+        # FASTA_IO objects of this process. Returns False when blocking is
+        # False and the lock is held elsewhere.
+        #######################################################################
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.fasta_file_handle.fileno(),fcntl.LOCK_EX if blocking else fcntl.LOCK_EX|fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    
+    def __unlock_file__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fasta_file_handle.fileno(),fcntl.LOCK_UN)
+    
+    def __read_at__(self,offset,length):
+        if self.metrics is not None:
+            self.metrics.add_io(reads=1,bytes_read=length,seeks=int(not hasattr(self.os,'pread')))
+        if hasattr(self.os,'pread'):
+            return self.os.pread(self.fasta_file_handle.fileno(),length,offset)
+        self.fasta_file_handle.seek(offset,0)
+        return self.fasta_file_handle.read(length)
+    
+    def __write_at__(self,offset,data):
+        if self.metrics is not None:
+            self.metrics.add_io(writes=1,bytes_written=len(data),seeks=int(not hasattr(self.os,'pwrite')))
+        if hasattr(self.os,'pwrite'):
+            self.os.pwrite(self.fasta_file_handle.fileno(),data,offset)
+        else:
+            self.fasta_file_handle.seek(offset,0)
+            self.fasta_file_handle.write(data)
+    
+    def __write_journal__(self,Spans):
+        
+        #######################################################################
+        # Journal layout: magic, then 'E' (offset, length, bytes) entries,
+        # then a 'D' trailer with the entry count and the crc32 of the
+        # entries. The file is only valid once the trailer is written.
+        #######################################################################
+        with self.io.open(self.path_to_journal_file,'wb') as journal_file_handle:
+            journal_file_handle.write(JournalMagic)
+            Count,Checksum=0,0
+            for SpanStart,data in Spans:
+                entry=self.struct.pack('<QQ',SpanStart,len(data))
+                Checksum=self.zlib.crc32(data,self.zlib.crc32(entry,Checksum))
+                journal_file_handle.write(b'E'+entry)
+                journal_file_handle.write(data)
+                Count+=1
+            journal_file_handle.write(b'D'+self.struct.pack('<QI',Count,Checksum))
+            journal_file_handle.flush()
+            self.os.fsync(journal_file_handle.fileno())
+            if self.metrics is not None:
+                self.metrics.add_io(writes=2*Count+2,bytes_written=journal_file_handle.tell(),flushes=1,fsyncs=1)
+        self.__fsync_directory__() # the new journal entry is durable before the fasta file is touched
+    
+    def __replay_journal__(self):
+        
+        #######################################################################
+        # Copy the entries of a complete journal into the fasta file, fsync
+        # it and remove the journal. An incomplete journal means the fasta
+        # file was never touched, it is removed as well.
+        #######################################################################
+        JournalSize=self.os.path.getsize(self.path_to_journal_file)
+        with self.io.open(self.path_to_journal_file,'rb') as journal_file_handle:
+            Valid=journal_file_handle.read(len(JournalMagic))==JournalMagic
+            Entries=[]
+            Checksum=0
+            while Valid:
+                Tag=journal_file_handle.read(1)
+                if Tag==b'D': # trailer
+                    trailer=journal_file_handle.read(12)
+                    Valid=(len(trailer)==12 and self.struct.unpack('<QI',trailer)==(len(Entries),Checksum)
+                           and not journal_file_handle.read(1))
+                    break
+                entry=journal_file_handle.read(16)
+                if Tag!=b'E' or len(entry)<16:
+                    Valid=False
+                    break
+                SpanStart,Size=self.struct.unpack('<QQ',entry)
+                Position=journal_file_handle.tell()
+                if Position+Size>JournalSize:
+                    Valid=False
+                    break
+                Checksum=self.zlib.crc32(journal_file_handle.read(Size),self.zlib.crc32(entry,Checksum))
+                Entries.append((SpanStart,Size,Position))
+            if Valid:
+                for SpanStart,Size,Position in Entries:
+                    journal_file_handle.seek(Position)
+                    self.__write_at__(SpanStart,journal_file_handle.read(Size))
+                self.fasta_file_handle.flush()
+                self.os.fsync(self.fasta_file_handle.fileno())
+                if self.metrics is not None:
+                    self.metrics.add_io(flushes=1,fsyncs=1)
+                self.clear_cache()
+        self.os.remove(self.path_to_journal_file)
+        self.__fsync_directory__()
+    
+    def __fsync_directory__(self):
+        
+        #######################################################################
+        # fsync the directory of the journal so creating or removing it
+        # survives a crash. Skipped where directories can not be opened or
+        # synced (e.g. Windows).
+        #######################################################################
+        try:
+            directory=self.os.open(self.os.path.dirname(self.os.path.abspath(self.path_to_journal_file)),self.os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            self.os.fsync(directory)
+            if self.metrics is not None:
+                self.metrics.add_io(fsyncs=1)
+        except OSError:
+            pass
+        finally:
+            self.os.close(directory)
+    
     def soft_mask_region(self,SequenceID,StartBase,StopBase):
         """
         soft_mask_region(SequenceID,StartBase,sequence)
@@ -264,4 +1177,344 @@ class FASTA_IO:
           
         
         self.overwrite_section(SequenceID,StartBase,'N'*abs(StopBase-StartBase))
-            
\ No newline at end of file
+        
+    def soft_mask_regions(self,Regions,merge_gap=4096):
+        """
+        soft_mask_regions(Regions)
+        
+        inputs:
+            Regions : iterable of (SequenceID, StartBase, StopBase) tuples or
+                      the path to a bed file
+            merge_gap : masked stretches closer than this many bases are
+                        rewritten with a single read and write
+        """
+        
+        self.__mask_regions__(Regions,SoftMaskTable,merge_gap)
+        
+    def hard_mask_regions(self,Regions,merge_gap=4096):
+        """
+        hard_mask_regions(Regions)
+        
+        inputs:
+            Regions : iterable of (SequenceID, StartBase, StopBase) tuples or
+                      the path to a bed file
+            merge_gap : masked stretches closer than this many bases are
+                        rewritten with a single read and write
+        """
+        
+        self.__mask_regions__(Regions,HardMaskTable,merge_gap)
+        
+    def __mask_regions__(self,Regions,Table,merge_gap,MaxSpan=1<<22):
+        
+        #######################################################################
+        # Bulk masking: intervals are grouped per sequence, sorted and merged,
+        # nearby stretches are combined into spans of at most MaxSpan bases.
+        # Each span is read with one positional read, the masked stretches are
+        # translated in place (line terminators map to themselves so the line
+        # geometry is kept) and the span is written back with one write. The
+        # file is flushed once at the end. During a batch every merged stretch
+        # is read once, with the pending edits applied, and added as an edit.
+        #######################################################################
+        if self.compressed:
+            raise Exception("compressed Fasta files are read-only")
+        if isinstance(Regions,str):
+            Regions=read_bed(Regions)
+        if self.metrics is not None:
+            StartTime=self.metrics.clock()
+        
+        ###### group the regions by sequence and validate them
+        Records={}
+        Grouped={}
+        for SequenceID,StartBase,StopBase in Regions:
+            if SequenceID not in Records:
+                Records[SequenceID]=self.__get_record__(SequenceID)
+                Grouped[SequenceID]=[]
+            if StartBase>StopBase:
+                StartBase,StopBase=StopBase,StartBase
+            if StartBase<0:
+                raise Exception("start position is less than 0")
+            if StopBase>Records[SequenceID][0]:
+                raise Exception("stop position exceeds chromosome length")
+            if StartBase<StopBase:
+                Grouped[SequenceID].append((StartBase,StopBase))
+        
+        Bases=0
+        if self.pending is not None: # batch in progress, mask each merged stretch through the pending edits
+            for SequenceID,Intervals in Grouped.items():
+                Record=Records[SequenceID]
+                for Lower,Upper in _merge_intervals(Intervals,MaxSpan):
+                    self.__add_edit__(Record,Lower,bytes(self.__read_bases__(Record,Lower,Upper)).translate(Table))
+                    Bases+=Upper-Lower
+            if self.metrics is not None:
+                self.metrics.record('mask_regions',StartTime,Bases)
+            return
+        
+        if self.pid!=self.os.getpid():
+            self.__open_handles__()
+        File_handle=self.fasta_file_handle
+        
+        with self.lock:
+            try:
+                for SequenceID,Intervals in Grouped.items():
+                    Record=Records[SequenceID]
+                    Length,SequenceStart,BasesPerLine,BytesPerLine=Record
+                    
+                    def offset(Base): # file offset of a base
+                        return SequenceStart+(Base//BasesPerLine)*BytesPerLine+(Base%BasesPerLine)
+                    
+                    Pieces=_merge_intervals(Intervals,MaxSpan)
+                    
+                    ###### combine nearby pieces into spans and rewrite each span once
+                    Index=0
+                    while Index<len(Pieces):
+                        Span=[Pieces[Index]]
+                        Index+=1
+                        while (Index<len(Pieces) and Pieces[Index][0]-Span[-1][1]<=merge_gap
+                               and Pieces[Index][1]-Span[0][0]<=MaxSpan):
+                            Span.append(Pieces[Index])
+                            Index+=1
+                        
+                        SpanStart=offset(Span[0][0])
+                        SpanStop=offset(Span[-1][1]-1)+1
+                        if self.metrics is not None:
+                            NoPositional=int(not hasattr(self.os,'pread'))
+                            self.metrics.add_io(reads=1,bytes_read=SpanStop-SpanStart,writes=1,
+                                                bytes_written=SpanStop-SpanStart,seeks=2*NoPositional)
+                            Bases+=sum(Upper-Lower for Lower,Upper in Span)
+                        if hasattr(self.os,'pread'):
+                            data=bytearray(self.os.pread(File_handle.fileno(),SpanStop-SpanStart,SpanStart))
+                        else:
+                            File_handle.seek(SpanStart,0)
+                            data=bytearray(File_handle.read(SpanStop-SpanStart))
+                        for Lower,Upper in Span:
+                            a=offset(Lower)-SpanStart
+                            b=offset(Upper-1)+1-SpanStart
+                            data[a:b]=data[a:b].translate(Table)
+                        if hasattr(self.os,'pwrite'):
+                            self.os.pwrite(File_handle.fileno(),data,SpanStart)
+                        else:
+                            File_handle.seek(SpanStart,0)
+                            File_handle.write(data)
+                        self.__invalidate_cache__(Record,Span[0][0],Span[-1][1])
+                File_handle.flush()
+            except: #if could not write the data
+                raise Exception("Could not write to file")
+        if self.metrics is not None:
+            self.metrics.add_io(flushes=1)
+            self.metrics.record('mask_regions',StartTime,Bases)
+
+
+JournalMagic=b'FASTA_IO journal 1\n'
+
+
+_Readers=weakref.WeakValueDictionary() # id -> every live FASTA_IO of this process
+
+
+def _after_fork():
+    for reader in list(_Readers.values()):
+        reader.__after_fork__()
+
+if hasattr(os,'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class _PendingEdits:
+    """
+    Edits of one sequence collected during a batch. New edits are appended
+    to a log, runs() merges the log into sorted, non-overlapping runs
+    (Starts, Stops, Data) where later edits win over earlier ones. A short
+    log is merged edit by edit, bisecting into the runs, so reading after
+    every edit does not re-sort the whole batch; a long log is sorted and
+    merged with the runs in one pass.
+    """
+    
+    import bisect
+    
+    IncrementalMerge=512 # longest log merged edit by edit
+    
+    def __init__(self):
+        self.LogStarts,self.LogData=[],[]
+        self.Starts,self.Stops,self.Data=[],[],[]
+    
+    def add(self,StartBase,data):
+        self.LogStarts.append(StartBase)
+        self.LogData.append(data)
+    
+    def runs(self):
+        if self.LogStarts:
+            if len(self.LogStarts)<=self.IncrementalMerge:
+                for StartBase,data in zip(self.LogStarts,self.LogData):
+                    self.__insert__(StartBase,data)
+                self.LogStarts,self.LogData=[],[]
+            else:
+                self.__merge_log__()
+        return self.Starts,self.Stops,self.Data
+    
+    def __insert__(self,StartBase,data):
+        
+        ###### merge one edit into the runs it overlaps or touches, the edit wins
+        if not data:
+            return
+        StopBase=StartBase+len(data)
+        First=self.bisect.bisect_left(self.Stops,StartBase) # first run ending at or after the edit start
+        Last=self.bisect.bisect_right(self.Starts,StopBase) # past the last run starting at or before its stop
+        if First<Last: # edit the first run in place, an edit inside or at the end of a long run does not copy it
+            RunStart=min(self.Starts[First],StartBase)
+            Run=self.Data[First]
+            if RunStart<self.Starts[First]:
+                Run=bytearray(self.Starts[First]-RunStart)+Run
+            elif not isinstance(Run,bytearray):
+                Run=bytearray(Run)
+            for Index in range(First+1,Last): # the gaps in between are covered by the edit
+                Run+=bytes(self.Starts[Index]-RunStart-len(Run))
+                Run+=self.Data[Index]
+            Run[StartBase-RunStart:StopBase-RunStart]=data
+            StartBase,StopBase,data=RunStart,RunStart+len(Run),Run
+        self.Starts[First:Last]=[StartBase]
+        self.Stops[First:Last]=[StopBase]
+        self.Data[First:Last]=[data]
+    
+    def __merge_log__(self):
+        EditStarts=self.Starts+self.LogStarts # the merged runs are the oldest edits
+        EditData=self.Data+self.LogData
+        self.LogStarts,self.LogData=[],[]
+        
+        ###### stable sort by start, edits starting at the same base stay in the order they were made
+        Order=sorted(range(len(EditStarts)),key=EditStarts.__getitem__)
+        Starts,Stops,Data=[],[],[]
+        Stop=-1
+        First=0
+        for Position,Edit in enumerate(Order+[None]):
+            if Edit is not None:
+                Lower=EditStarts[Edit]
+                if Lower<=Stop:
+                    Stop=max(Stop,Lower+len(EditData[Edit]))
+                    continue
+            if Position: # close the run made of Order[First:Position]
+                Members=Order[First:Position]
+                if len(Members)==1:
+                    Data.append(EditData[Members[0]])
+                else:
+                    Run=bytearray(Stop-Starts[-1])
+                    for Member in sorted(Members):
+                        Run[EditStarts[Member]-Starts[-1]:EditStarts[Member]-Starts[-1]+len(EditData[Member])]=EditData[Member]
+                    Data.append(bytes(Run))
+                Stops.append(Stop)
+            if Edit is not None:
+                Starts.append(Lower)
+                Stop=Lower+len(EditData[Edit])
+                First=Position
+        self.Starts,self.Stops,self.Data=Starts,Stops,Data
+
+
+def _merge_intervals(Intervals,MaxSpan):
+    
+    ###### sorted (Lower, Upper) pieces of the merged overlapping/adjacent intervals, very long ones split at MaxSpan
+    Merged=[]
+    for Lower,Upper in sorted(Intervals):
+        if Merged and Lower<=Merged[-1][1]:
+            if Upper>Merged[-1][1]:
+                Merged[-1][1]=Upper
+        else:
+            Merged.append([Lower,Upper])
+    Pieces=[]
+    for Lower,Upper in Merged:
+        if Upper-Lower<=MaxSpan:
+            Pieces.append((Lower,Upper))
+        else:
+            for PieceStart in range(Lower,Upper,MaxSpan):
+                Pieces.append((PieceStart,min(Upper,PieceStart+MaxSpan)))
+    return Pieces
+
+
+def _make_mask_table(Masked):
+    
+    ###### translation table applying Masked to every byte but line terminators
+    table=bytearray(Masked(bytes([value]))[0] for value in range(256))
+    table[ord('\n')]=ord('\n')
+    table[ord('\r')]=ord('\r')
+    return bytes(table)
+
+SoftMaskTable=_make_mask_table(lambda value: value.lower())
+HardMaskTable=_make_mask_table(lambda value: b'N')
+
+
+def _make_revcomp_table():
+    
+    ###########################################################################
+    # 256 entry byte translation table built from FASTA_IO.RevCompDict,
+    # anything not in the dictionary becomes 'N'
+    ###########################################################################
+    table=bytearray(b'N'*256)
+    for base,complement in FASTA_IO.RevCompDict.items():
+        table[ord(base)]=ord(complement)
+    return bytes(table)
+
+RevCompTable=_make_revcomp_table()
+
+
+def _make_code_table():
+    
+    ###### ASCII to base codes A=0 C=1 G=2 T=3, anything else 4
+    table=bytearray(b'\x04'*256)
+    for code,base in enumerate(b'ACGT'):
+        table[base]=code
+        table[base+32]=code
+    return bytes(table)
+
+BaseCodeTable=_make_code_table()
+
+
+def _import_numpy():
+    
+    ###### numpy is only needed for the array output formats
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("numpy is required for the numpy output formats")
+    return numpy
+
+
+def reverse_complement(sequence):
+    """
+    reverse_complement(sequence)
+    
+    inputs:
+        sequence : str, bytes, bytearray or memoryview of bases
+    outputs:
+        returns the reverse complement, str for str input and bytes otherwise.
+        IUPAC codes and case follow FASTA_IO.RevCompDict and any other
+        character becomes 'N'
+    """
+    
+    if isinstance(sequence,str):
+        return sequence.encode('ascii','replace')[::-1].translate(RevCompTable).decode('ascii')
+    return bytes(sequence)[::-1].translate(RevCompTable)
+
+
+def read_bed(path_to_bed):
+    """
+    read_bed(path_to_bed)
+    
+    inputs:
+        path_to_bed : path to a bed file
+    outputs:
+        yields (SequenceID, StartBase, StopBase) for every interval, start and
+        stop are swapped for intervals on the '-' strand so that
+        FASTA_IO.read_in_section returns their reverse complement
+    """
+    import io
+    
+    with io.open(path_to_bed,'r') as bed_file_handle:
+        for line in bed_file_handle:
+            if not line.strip() or line.startswith(('#','track','browser')):
+                continue
+            fields=line.rstrip('\r\n').split('\t')
+            try:
+                SequenceID,StartBase,StopBase=fields[0],int(fields[1]),int(fields[2])
+            except:
+                raise Exception("could not process bed line: "+line.strip())
+            if len(fields)>5 and fields[5]=='-':
+                yield (SequenceID,StopBase,StartBase)
+            else:
+                yield (SequenceID,StartBase,StopBase)
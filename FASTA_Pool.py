@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+from FASTA_IO import FASTA_IO
+
+
+class FASTA_Pool:
+    
+    import collections, contextlib, os, threading
+    
+    def __init__(self,References=(),max_open=64,**options):
+        """
+        FASTA_Pool()
+        
+        inputs:
+            References : dict of reference name -> path to indexed fasta file,
+                         or an iterable of paths used as their own names
+            max_open : number of references whose file handles are kept open
+            options : passed on to every FASTA_IO, e.g. use_mmap or cache_size
+        
+        Queries name the reference they go to. A FASTA_IO is created for a
+        reference on its first query and kept for the life of the pool, so
+        its index is read once. Only the max_open most recently used readers
+        hold file handles, the others release them (FASTA_IO.release_handles)
+        and reopen on their next query. Readers serving a query in another
+        thread are never released, the limit can then be exceeded by the
+        number of concurrent queries.
+        """
+        self.max_open=max_open
+        self.options=options
+        self.paths={}
+        self.readers={}
+        self.open_readers=self.collections.OrderedDict() # LRU of readers holding handles
+        self.in_use=self.collections.Counter()
+        self.lock=self.threading.Lock()
+        self.opens=0
+        self.releases=0
+        if isinstance(References,dict):
+            References=References.items()
+        else:
+            References=[(path_to_file,path_to_file) for path_to_file in References]
+        for Reference,path_to_file in References:
+            self.add_reference(Reference,path_to_file)
+    
+    def add_reference(self,Reference,path_to_file):
+        """
+        add_reference(Reference,path_to_file)
+        
+        inputs:
+            Reference : name used in queries
+            path_to_file : path to indexed fasta reference file, only checked
+                           for existence until the first query
+        """
+        if not (self.os.path.exists(path_to_file) and self.os.path.exists(path_to_file+'.fai')):
+            raise Exception("File or index could not be opened or does not exist")
+        with self.lock:
+            if Reference in self.paths:
+                raise Exception("reference already in the pool")
+            self.paths[Reference]=path_to_file
+    
+    def get_reference_names(self):
+        """List of the reference names in the pool."""
+        return list(self.paths)
+    
+    def close(self):
+        """Close the file handles of every reader."""
+        with self.lock:
+            for reader in self.readers.values():
+                reader.close()
+            self.readers.clear()
+            self.open_readers.clear()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self,*exc_info):
+        self.close()
+    
+    def __del__(self):
+        self.close()
+    
+    @contextlib.contextmanager
+    def reader(self,Reference):
+        """
+        reader(Reference)
+        
+        Context manager lending the FASTA_IO of a reference, its handles are
+        not released while the block runs.
+        """
+        with self.lock:
+            if Reference not in self.readers:
+                if Reference not in self.paths:
+                    raise Exception("unknown reference")
+                self.readers[Reference]=FASTA_IO(self.paths[Reference],**self.options)
+            reader=self.readers[Reference]
+            if Reference in self.open_readers:
+                self.open_readers.move_to_end(Reference)
+            else:
+                self.open_readers[Reference]=reader
+                self.opens+=1
+            self.in_use[Reference]+=1
+            self.__release_idle__()
+        try:
+            yield reader
+        finally:
+            with self.lock:
+                self.in_use[Reference]-=1
+                if not self.in_use[Reference]:
+                    del self.in_use[Reference]
+                self.__release_idle__()
+    
+    def __release_idle__(self):
+        
+        ###### release the least recently used readers over the limit that are not in use
+        if len(self.open_readers)<=self.max_open:
+            return
+        for Reference in list(self.open_readers):
+            if len(self.open_readers)<=self.max_open:
+                break
+            if Reference not in self.in_use:
+                self.open_readers.pop(Reference).release_handles()
+                self.releases+=1
+    
+    def get_sequence_IDs(self,Reference):
+        """
+        get_sequence_IDs(Reference)
+        
+        inputs:
+            Reference : reference name
+        outputs:
+            returns a list of sequence ID's in the reference
+        """
+        with self.reader(Reference) as reader:
+            return reader.get_sequence_IDs()
+    
+    def read_in_section(self,Reference,SequenceID,StartBase,StopBase,output_format='str'):
+        """
+        read_in_section(Reference,SequenceID,StartBase,StopBase)
+        
+        inputs:
+            Reference : reference name
+            SequenceID, StartBase, StopBase, output_format : see
+                FASTA_IO.read_in_section
+        outputs:
+            returns the section from the start to the stop base in requested
+            chromosome of the reference
+        """
+        with self.reader(Reference) as reader:
+            return reader.read_in_section(SequenceID,StartBase,StopBase,output_format)
+    
+    def read_regions(self,Regions,output_format='str',merge_gap=0):
+        """
+        read_regions(Regions)
+        
+        inputs:
+            Regions : iterable of (Reference, SequenceID, StartBase, StopBase)
+            output_format, merge_gap : see FASTA_IO.read_regions
+        outputs:
+            returns a list with the section of every region, in the order
+            given. Each reference is opened once for all its regions.
+        """
+        Grouped={}
+        Regions=list(Regions)
+        for RegionIndex,(Reference,SequenceID,StartBase,StopBase) in enumerate(Regions):
+            Grouped.setdefault(Reference,[]).append((RegionIndex,(SequenceID,StartBase,StopBase)))
+        data_out=[None]*len(Regions)
+        for Reference,Members in Grouped.items():
+            with self.reader(Reference) as reader:
+                Sections=reader.read_regions([Region for RegionIndex,Region in Members],output_format,merge_gap)
+            for (RegionIndex,Region),Section in zip(Members,Sections):
+                data_out[RegionIndex]=Section
+        return data_out
+    
+    def get_pool_stats(self):
+        """
+        get_pool_stats()
+        
+        outputs:
+            returns a dict with the number of references, of readers created,
+            of readers holding handles, of handle (re)openings and releases
+        """
+        with self.lock:
+            return {'references':len(self.paths),'readers':len(self.readers),'open':len(self.open_readers),
+                    'opens':self.opens,'releases':self.releases,'max_open':self.max_open}
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+from FASTA_IO import FASTA_IO, reverse_complement
+
+
+TWOBIT_SIGNATURE=0x1A412743
+TWOBIT_BASES=b'TCAG' # 2-bit codes 0..3
+IndexChunkSize=1<<16 # bytes of the sequence index read at a time
+
+
+def _make_pack_table():
+    
+    ###### bases to 2-bit codes, N and other codes become 0 (T) and are restored from the N blocks
+    table=bytearray(256)
+    for code,base in enumerate(TWOBIT_BASES):
+        table[base]=code
+        table[base+32]=code
+    return bytes(table)
+
+PackTable=_make_pack_table()
+
+# UnpackTables[i] maps a packed byte to the i-th of its four bases, the first
+# base is in the two most significant bits
+UnpackTables=[bytes(TWOBIT_BASES[(byte>>(6-2*i))&3] for byte in range(256)) for i in range(4)]
+
+
+def _pack(data):
+    
+    #######################################################################
+    # Pack bases four to a byte. The code bytes are split into the four base
+    # positions and combined as big integers, every code is below 4 so the
+    # shifted values never carry into the neighbouring byte.
+    #######################################################################
+    codes=data.translate(PackTable)
+    if len(codes)%4:
+        codes+=bytes(4-len(codes)%4)
+    size=len(codes)//4
+    packed=0
+    for i in range(4):
+        packed|=int.from_bytes(codes[i::4],'big')<<(6-2*i)
+    return packed.to_bytes(size,'big')
+
+
+def _unpack(packed):
+    
+    ###### four bases per packed byte, interleaved from the unpack tables
+    data_out=bytearray(4*len(packed))
+    for i in range(4):
+        data_out[i::4]=packed.translate(UnpackTables[i])
+    return data_out
+
+
+def _find_runs(data,pattern,offset,Starts,Sizes):
+    
+    #######################################################################
+    # Append the runs matching pattern in data to Starts/Sizes, a run that
+    # starts where the last one ended (chunk boundary) extends it.
+    #######################################################################
+    for match in pattern.finditer(data):
+        start=offset+match.start()
+        if Starts and Starts[-1]+Sizes[-1]==start:
+            Sizes[-1]+=match.end()-match.start()
+        else:
+            Starts.append(start)
+            Sizes.append(match.end()-match.start())
+
+
+def fasta_to_twobit(path_to_file,path_to_twobit=None,chunk_size=1<<22):
+    """
+    fasta_to_twobit(path_to_file)
+    
+    inputs:
+        path_to_file : path to a fasta file, indexed with make_fai when no
+                       .fai exists
+        path_to_twobit : output file, the fasta path with a .2bit extension
+                         by default
+        chunk_size : number of bases read at a time, memory use is bounded by
+                     this and by the N and lower case run tables
+    outputs:
+        returns the path of the .2bit file
+    
+    The file follows the UCSC .2bit layout (little endian): 2 bits per base,
+    runs of N and runs of lower case bases stored as block tables. IUPAC
+    codes other than ACGT are stored as N as in faToTwoBit.
+    """
+    import io, os, re, struct, array
+    from make_fai import make_fai
+    
+    if path_to_twobit is None:
+        path_to_twobit=os.path.splitext(path_to_file)[0]+'.2bit'
+    if not os.path.exists(path_to_file+'.fai'):
+        make_fai(path_to_file)
+    chunk_size=max(4,chunk_size-chunk_size%4) # chunks start on packed byte boundaries
+    NPattern=re.compile(b'[^ACGTacgt]+')
+    MaskPattern=re.compile(b'[a-z]+')
+    
+    fasta=FASTA_IO(path_to_file)
+    try:
+        SequenceIDs=fasta.get_sequence_IDs()
+        Lengths=[fasta.__get_record__(SequenceID)[0] for SequenceID in SequenceIDs]
+        if max(Lengths,default=0)>0xFFFFFFFF:
+            raise Exception("sequence too long for the 2bit format")
+        version=1 if sum(Lengths)//4>0xC0000000 else 0 # 64 bit offsets for very large genomes
+        OffsetFormat='<Q' if version else '<I'
+        
+        with io.open(path_to_twobit,'wb') as twobit_file_handle:
+            twobit_file_handle.write(struct.pack('<IIII',TWOBIT_SIGNATURE,version,len(SequenceIDs),0))
+            OffsetPositions=[]
+            for SequenceID in SequenceIDs:
+                name=SequenceID.encode('ascii')
+                if len(name)>255:
+                    raise Exception("sequence name too long for the 2bit format")
+                twobit_file_handle.write(struct.pack('<B',len(name))+name)
+                OffsetPositions.append(twobit_file_handle.tell())
+                twobit_file_handle.write(struct.pack(OffsetFormat,0))
+            
+            Offsets=[]
+            for SequenceID,Length in zip(SequenceIDs,Lengths):
+                ###### first pass, N and lower case runs
+                NStarts,NSizes,MaskStarts,MaskSizes=[array.array('I') for _ in range(4)]
+                for number,chunk in enumerate(fasta.iter_sequence(SequenceID,chunk_size,'bytes')):
+                    _find_runs(chunk,NPattern,number*chunk_size,NStarts,NSizes)
+                    _find_runs(chunk,MaskPattern,number*chunk_size,MaskStarts,MaskSizes)
+                
+                ###### record header, then the packed bases in a second pass
+                Offsets.append(twobit_file_handle.tell())
+                twobit_file_handle.write(struct.pack('<II',Length,len(NStarts)))
+                twobit_file_handle.write(NStarts.tobytes()+NSizes.tobytes())
+                twobit_file_handle.write(struct.pack('<I',len(MaskStarts)))
+                twobit_file_handle.write(MaskStarts.tobytes()+MaskSizes.tobytes())
+                twobit_file_handle.write(struct.pack('<I',0))
+                for chunk in fasta.iter_sequence(SequenceID,chunk_size,'bytes'):
+                    twobit_file_handle.write(_pack(chunk))
+            
+            if not version and Offsets and Offsets[-1]>0xFFFFFFFF:
+                raise Exception("2bit file too large for 32 bit offsets")
+            for position,offset in zip(OffsetPositions,Offsets):
+                twobit_file_handle.seek(position)
+                twobit_file_handle.write(struct.pack(OffsetFormat,offset))
+    finally:
+        fasta.close()
+    return path_to_twobit
+
+
+class TwoBit_IO:
+    
+    import os, io, sys, array, bisect, struct, threading
+    
+    def __init__(self,path_to_file):
+        """
+        TwoBit_IO()
+        
+        inputs:
+            path_to_file : path to a .2bit file (see fasta_to_twobit)
+        
+        Reads sections of a UCSC style .2bit file with the same interface as
+        FASTA_IO. Only the sequence index is read on opening, the N and lower
+        case block tables of a sequence are loaded on its first read.
+        """
+        try: #try to open the file
+            self.twobit_file_handle=''
+            self.path_to_twobit_file=path_to_file
+            self.twobit_file_handle=self.io.open(self.path_to_twobit_file,'rb')
+        except:
+            raise Exception("File could not be opened or does not exist")
+        
+        self.lock=self.threading.Lock()
+        try:
+            self.__read_in_index__()
+        except:
+            raise Exception("Could not process 2bit index")
+        self.Records={}
+    
+    def close(self):
+        """Close the file handle."""
+        if self.twobit_file_handle!='':
+            self.twobit_file_handle.close()
+    
+    def __del__(self): #When object is deleted closes the connection to the file
+        self.close()
+    
+    def __pread__(self,length,offset):
+        if hasattr(self.os,'pread'):
+            return self.os.pread(self.twobit_file_handle.fileno(),length,offset)
+        with self.lock:
+            self.twobit_file_handle.seek(offset,0)
+            return self.twobit_file_handle.read(length)
+    
+    def __read_in_index__(self):
+        
+        #######################################################################
+        # Header and sequence index. The signature tells the byte order, the
+        # version the width of the record offsets. The index is read in
+        # chunks of IndexChunkSize bytes, refilled when the next entry (at
+        # most 1+255 name bytes and an offset) may run past the buffer, so
+        # opening does not allocate for the largest possible index.
+        #######################################################################
+        header=self.__pread__(16,0)
+        for order in '<>':
+            signature,version,count,reserved=self.struct.unpack(order+'IIII',header)
+            if signature==TWOBIT_SIGNATURE:
+                break
+        else:
+            raise Exception("not a 2bit file")
+        self.order=order
+        OffsetFormat=order+('Q' if version==1 else 'I')
+        OffsetSize=self.struct.calcsize(OffsetFormat)
+        
+        EntrySize=1+255+OffsetSize # largest index entry
+        data=b''
+        offset=16 # file offset of data[0]
+        position=0
+        Refill=-1 # refill once position passes this
+        self.SequenceIDs=[]
+        self.Offsets={}
+        for _ in range(count):
+            if position>Refill:
+                data=data[position:]+self.__pread__(IndexChunkSize,offset+len(data))
+                offset+=position
+                position=0
+                Refill=len(data)-EntrySize
+            size=data[position]
+            SequenceID=data[position+1:position+1+size].decode('ascii')
+            position+=1+size
+            self.SequenceIDs.append(SequenceID)
+            self.Offsets.setdefault(SequenceID,self.struct.unpack_from(OffsetFormat,data,position)[0])
+            position+=OffsetSize
+    
+    def get_sequence_IDs(self):
+        """
+        get_sequence_IDs()
+        
+        inputs:
+            None
+        outputs:
+            returns a list of sequence ID's in the 2bit file
+        """
+        return self.SequenceIDs
+    
+    def __get_record__(self,SequenceID):
+        
+        #######################################################################
+        # (Length, NStarts, NStops, MaskStarts, MaskStops, DnaOffset) of a
+        # sequence, parsed from its record header on first use
+        #######################################################################
+        Record=self.Records.get(SequenceID)
+        if Record is not None:
+            return Record
+        try:
+            offset=self.Offsets[SequenceID]
+        except KeyError:
+            raise Exception("incorrect chromosome id given")
+        
+        def read_table(offset):
+            count=self.struct.unpack(self.order+'I',self.__pread__(4,offset))[0]
+            Table=self.array.array('I',self.__pread__(8*count,offset+4))
+            if self.order!=('<' if self.sys.byteorder=='little' else '>'):
+                Table.byteswap()
+            Starts=Table[:count]
+            Stops=self.array.array('I',[start+size for start,size in zip(Starts,Table[count:])])
+            return Starts,Stops,offset+4+8*count
+        
+        Length=self.struct.unpack(self.order+'I',self.__pread__(4,offset))[0]
+        NStarts,NStops,offset=read_table(offset+4)
+        MaskStarts,MaskStops,offset=read_table(offset)
+        Record=(Length,NStarts,NStops,MaskStarts,MaskStops,offset+4)
+        self.Records[SequenceID]=Record
+        return Record
+    
+    def __apply_blocks__(self,data_out,Starts,Stops,StartBase,StopBase,fill):
+        
+        ###### apply the blocks overlapping [StartBase, StopBase) to data_out
+        i=max(0,self.bisect.bisect_right(Starts,StartBase)-1)
+        while i<len(Starts) and Starts[i]<StopBase:
+            start=max(Starts[i],StartBase)-StartBase
+            stop=min(Stops[i],StopBase)-StartBase
+            if stop>start:
+                data_out[start:stop]=fill(data_out[start:stop])
+            i+=1
+    
+    def read_in_section(self,SequenceID,StartBase,StopBase,output_format='str'):
+        """
+        read_in_section(SequenceID,StartBase,StopBase)
+        
+        inputs:
+            SequenceID : the chromosome name e.g. 1 or X
+            StartBase : start location of sequence to read (bed format) 
+            StopBase : end location of sequence to read (bed format)
+            output_format : 'str' (default), 'bytes' or 'memoryview'
+        outputs:
+            returns the section from the start to the stop base in requested
+            chromosome, reverse complemented when StartBase > StopBase
+        """
+        
+        if output_format not in ('str','bytes','memoryview'):
+            raise Exception("unknown output format")
+        
+        if StartBase>StopBase:
+            RevComp=True
+            StartBase,StopBase=StopBase,StartBase
+        else:
+            RevComp=False
+        
+        Length,NStarts,NStops,MaskStarts,MaskStops,DnaOffset=self.__get_record__(SequenceID)
+        
+        if StartBase<0:
+            raise Exception("start position is less than 0")
+            
+        if StopBase>Length:
+            raise Exception("stop position exceeds chromosome length")
+        
+        packed=self.__pread__((StopBase+3)//4-StartBase//4,DnaOffset+StartBase//4)
+        data_out=_unpack(packed)
+        del data_out[StopBase-StartBase//4*4:]
+        del data_out[:StartBase%4]
+        self.__apply_blocks__(data_out,NStarts,NStops,StartBase,StopBase,lambda data: b'N'*len(data))
+        self.__apply_blocks__(data_out,MaskStarts,MaskStops,StartBase,StopBase,lambda data: data.lower())
+        
+        if RevComp:
+            data_out=reverse_complement(data_out)
+        if output_format=='str':
+            return data_out.decode('ascii')
+        if output_format=='bytes':
+            return bytes(data_out)
+        return memoryview(data_out)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Local load test of AsyncFASTA_IO: many concurrent clients issue random
+region requests; reports p50/p99 request latency and throughput against
+calling the blocking FASTA_IO.read_in_section from the event loop, plus
+the event loop lag seen by a 1 ms heartbeat (how long other work on the
+loop, e.g. health checks, is held up).
+
+    python benchmarks/bench_async.py [clients] [requests_per_client]
+"""
+
+import asyncio, os, random, statistics, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from AsyncFASTA_IO import AsyncFASTA_IO
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def client(read, regions, latencies):
+    for region in regions:
+        start = time.perf_counter()
+        await read(*region)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0) # other clients get a turn, like a real request handler
+
+
+async def heartbeat(lags, done):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def load(read, batches):
+    latencies, lags, done = [], [], asyncio.Event()
+    beat = asyncio.ensure_future(heartbeat(lags, done))
+    start = time.perf_counter()
+    await asyncio.gather(*[client(read, batch, latencies) for batch in batches])
+    elapsed = time.perf_counter() - start
+    done.set()
+    await beat
+    return latencies, lags, elapsed
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    length = 50000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), [length])
+        make_fai(path)
+        rng = random.Random(8)
+        batches = []
+        for _ in range(clients):
+            batch = []
+            for _ in range(per_client):
+                StartBase = rng.randrange(0, length - 20000)
+                batch.append(('chr1', StartBase, StartBase + rng.randrange(100, 20000)))
+            batches.append(batch)
+
+        fasta = FASTA_IO(path)
+
+        async def blocking_read(*region):
+            return fasta.read_in_section(*region)
+
+        async def run_async():
+            async with AsyncFASTA_IO(path, max_workers=8) as async_fasta:
+                return await load(async_fasta.read_in_section, batches)
+
+        for label, runner in (('blocking', lambda: load(blocking_read, batches)), ('async', run_async)):
+            latencies, lags, elapsed = asyncio.run(runner())
+            print('%-9s p50 %7.2f ms  p99 %7.2f ms  mean %7.2f ms  %8.0f requests/s  loop lag p99 %7.2f ms max %7.2f ms' % (
+                label, percentile(latencies, 0.5) * 1e3, percentile(latencies, 0.99) * 1e3,
+                statistics.mean(latencies) * 1e3, len(latencies) / elapsed,
+                percentile(lags, 0.99) * 1e3, max(lags) * 1e3))
+        fasta.close()
+
+
+if __name__ == '__main__':
+    main()
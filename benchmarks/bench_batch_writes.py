@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Single-base edits (variant injection) applied with overwrite_section one
+at a time against a batch committed with and without the journal.
+
+    python benchmarks/bench_batch_writes.py [number_of_edits]
+"""
+
+import os, random, shutil, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lengths = [60000000, 40000000]
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), lengths)
+        make_fai(path)
+        rng = random.Random(19)
+        edits = []
+        for _ in range(count):
+            number = rng.randrange(len(lengths))
+            edits.append(('chr%d' % (number + 1), rng.randrange(1, lengths[number] - 1), rng.choice('ACGT')))
+
+        results = {}
+        for label in ('direct', 'batch + journal', 'batch'):
+            copy = os.path.join(directory, label.replace(' ', '_') + '.fa')
+            shutil.copyfile(path, copy)
+            shutil.copyfile(path + '.fai', copy + '.fai')
+            fasta = FASTA_IO(copy)
+            start = time.perf_counter()
+            if label == 'direct':
+                for edit in edits:
+                    fasta.overwrite_section(*edit)
+            else:
+                fasta.begin_batch()
+                for edit in edits:
+                    fasta.overwrite_section(*edit)
+                queued = time.perf_counter() - start
+                fasta.commit(journal=label == 'batch + journal')
+            elapsed = time.perf_counter() - start
+            fasta.close()
+            with open(copy, 'rb') as handle:
+                results[label] = handle.read()
+            print('%-16s %7.2f s  %9.0f edits/s%s' % (label, elapsed, count / elapsed,
+                                                     '' if label == 'direct' else '  (queueing %.2f s)' % queued))
+        assert len(set(results.values())) == 1
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Disk footprint and random access latency of a bgzip (BGZF) compressed fasta
+file against the plain file.
+
+    python benchmarks/bench_bgzf.py [number_of_reads]
+"""
+
+import os, random, sys, tempfile, time
+
+from synthetic import write_fasta
+from bgzf import bgzip
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lengths = [30000000, 20000000]
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), lengths)
+        start = time.perf_counter()
+        compressed = bgzip(path)
+        print('bgzip            %.2f s' % (time.perf_counter() - start))
+        for label, fasta_path in (('plain', path), ('bgzf', compressed)):
+            start = time.perf_counter()
+            make_fai(fasta_path)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(fasta_path)
+            if os.path.exists(fasta_path + '.gzi'):
+                size += os.path.getsize(fasta_path + '.gzi')
+            print('%-16s %8.1f MB on disk, make_fai %.2f s' % (label, size / 1e6, elapsed))
+
+        rng = random.Random(11)
+        regions = []
+        for _ in range(count):
+            number = rng.randrange(len(lengths))
+            StartBase = rng.randrange(0, lengths[number] - 1000)
+            regions.append(('chr%d' % (number + 1), StartBase, StartBase + rng.randrange(20, 1000)))
+
+        for label, fasta_path, options in (('plain', path, {}),
+                                           ('bgzf cache 1', compressed, {'bgzf_cache_blocks': 1}),
+                                           ('bgzf cache 64', compressed, {'bgzf_cache_blocks': 64}),
+                                           ('bgzf cache 1024', compressed, {'bgzf_cache_blocks': 1024})):
+            fasta = FASTA_IO(fasta_path, **options)
+            for region in regions: # warm up the page cache and block cache
+                fasta.read_in_section(*region)
+            start = time.perf_counter()
+            for region in regions:
+                fasta.read_in_section(*region)
+            elapsed = time.perf_counter() - start
+            print('%-16s %8.1f us per random read' % (label, elapsed / count * 1e6))
+            fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Repeated, overlapping reads around a set of hot spots (pileup / primer
+design pattern) with and without the FASTA_IO block cache.
+
+    python benchmarks/bench_block_cache.py [number_of_reads]
+"""
+
+import os, random, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    length = 20000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), [length])
+        make_fai(path)
+        rng = random.Random(5)
+        hot_spots = [rng.randrange(0, length - 5000) for _ in range(200)]
+        regions = []
+        for _ in range(count):
+            StartBase = rng.choice(hot_spots) + rng.randrange(0, 4000)
+            regions.append(('chr1', StartBase, StartBase + rng.randrange(20, 1000)))
+
+        for label, options in (('no cache', {}), ('cache 16 MB', {'cache_size': 1 << 24}),
+                               ('mmap', {'use_mmap': True}), ('mmap + cache', {'use_mmap': True, 'cache_size': 1 << 24})):
+            fasta = FASTA_IO(path, **options)
+            start = time.perf_counter()
+            for region in regions:
+                fasta.read_in_section(*region)
+            elapsed = time.perf_counter() - start
+            print('%-14s %9.0f reads/s  %s' % (label, count / elapsed, fasta.get_cache_stats() if options.get('cache_size') else ''))
+            fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk masking of many intervals with hard_mask_regions / soft_mask_regions
+against the per interval methods (timed on a sample and extrapolated).
+
+    python benchmarks/bench_bulk_masking.py [number_of_intervals]
+"""
+
+import os, random, shutil, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lengths = [50000000] * 4
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'genome.fa'), lengths)
+        make_fai(path)
+        rng = random.Random(7)
+        regions = []
+        for _ in range(count):
+            number = rng.randrange(len(lengths))
+            StartBase = rng.randrange(1, lengths[number] - 400)
+            regions.append(('chr%d' % (number + 1), StartBase, StartBase + rng.randrange(10, 400)))
+        sample = regions[:min(count, 20000)]
+
+        for label, single_method, bulk_method in (('hard', 'hard_mask_region', 'hard_mask_regions'),
+                                                  ('soft', 'soft_mask_region', 'soft_mask_regions')):
+            copy = os.path.join(directory, 'copy.fa')
+            shutil.copy(path, copy)
+            shutil.copy(path + '.fai', copy + '.fai')
+            fasta = FASTA_IO(copy)
+            start = time.perf_counter()
+            for region in sample:
+                getattr(fasta, single_method)(*region)
+            single_time = (time.perf_counter() - start) * count / len(sample)
+            fasta.close()
+
+            shutil.copy(path, copy)
+            fasta = FASTA_IO(copy)
+            start = time.perf_counter()
+            getattr(fasta, bulk_method)(regions)
+            bulk_time = time.perf_counter() - start
+            fasta.close()
+            print('%s mask %d intervals: per interval ~%.1f s (extrapolated), bulk %.1f s, %.0fx' % (
+                label, count, single_time, bulk_time, single_time / bulk_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Cold open of indexes with many contigs: time from constructing FASTA_IO to
+the first region read, for the text .fai and the memory mapped binary
+index. Each measurement runs
+in a fresh interpreter, as a short-lived command line job would.
+
+    python benchmarks/bench_cold_open.py [contigs]
+"""
+
+import os, subprocess, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from binary_index import make_binary_index
+
+JOB = """
+import sys, time
+sys.path.insert(0, %r)
+start = time.perf_counter()
+from FASTA_IO import FASTA_IO
+fasta = FASTA_IO(%r, binary_index=%r)
+fasta.read_in_section(%r, 0, 10)
+print(time.perf_counter() - start)
+"""
+
+
+def cold_open(path, binary_index, query, repeats=5):
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', JOB % (root, path, binary_index, query)],
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output))
+    return min(times)
+
+
+def main():
+    contigs = int(float(sys.argv[1])) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'contigs.fa'), [200] * contigs)
+        make_fai(path)
+        query = 'chr%d' % (contigs // 2)
+        start = time.perf_counter()
+        make_binary_index(path + '.fai')
+        print('%d contigs, .fai %.1f MB, .fai.bin %.1f MB, binary index built in %.2f s'
+              % (contigs, os.path.getsize(path + '.fai') / 1e6, os.path.getsize(path + '.fai.bin') / 1e6,
+                 time.perf_counter() - start))
+        print('text .fai, first read         %8.1f ms' % (cold_open(path, False, query) * 1e3))
+        print('binary index, first read      %8.1f ms' % (cold_open(path, True, query) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
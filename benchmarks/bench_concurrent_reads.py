@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of random reads from one shared FASTA_IO object with a growing
+number of threads, and with the object pickled into process pool workers.
+
+    python benchmarks/bench_concurrent_reads.py [reads] [max_workers]
+"""
+
+import os, random, sys, tempfile, time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def read_batch(fasta, regions):
+    for region in regions:
+        fasta.read_in_section(*region)
+    return len(regions)
+
+
+def run(executor_class, workers, fasta, regions):
+    batches = [regions[offset::workers * 4] for offset in range(workers * 4)]
+    start = time.perf_counter()
+    with executor_class(max_workers=workers) as pool:
+        done = sum(pool.map(read_batch, [fasta] * len(batches), batches))
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    length = 50000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), [length])
+        make_fai(path)
+        rng = random.Random(6)
+        regions = []
+        for _ in range(count):
+            StartBase = rng.randrange(0, length - 10000)
+            regions.append(('chr1', StartBase, StartBase + rng.randrange(100, 10000)))
+
+        for use_mmap in (False, True):
+            fasta = FASTA_IO(path, use_mmap=use_mmap)
+            workers = 1
+            while workers <= max_workers:
+                print('mmap=%-5s %2d workers: threads %9.0f reads/s  processes %9.0f reads/s' % (
+                    use_mmap, workers, run(ThreadPoolExecutor, workers, fasta, regions),
+                    run(ProcessPoolExecutor, workers, fasta, regions)))
+                workers *= 2
+            fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Index scaling with many contigs: open time, sequence-ID lookup time and
+memory held by the index, compared with the previous list based index
+(five python lists and SequenceIDs.index lookups).
+
+    python benchmarks/bench_index_scaling.py [max_contigs]
+"""
+
+import os, random, sys, tempfile, time, tracemalloc
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def list_index(path):
+    with open(path + '.fai') as handle:
+        fai_data = [line.strip().split('\t') for line in handle.readlines()]
+    return ([line[0].split(" ")[0] for line in fai_data],
+            [[int(line[column]) for line in fai_data] for column in range(1, 5)])
+
+
+def main():
+    max_contigs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print('%9s %12s %12s %14s %14s %10s %10s' % ('contigs', 'open list s', 'open new s', 'list lookup/s',
+                                                  'new lookup/s', 'list MB', 'new MB'))
+    with tempfile.TemporaryDirectory() as directory:
+        contigs = 100000
+        while contigs <= max_contigs:
+            rng = random.Random(contigs)
+            lengths = [rng.randrange(260, 300) for _ in range(contigs)]
+            path = write_fasta(os.path.join(directory, 'contigs.fa'), lengths)
+            make_fai(path)
+            queries = ['chr%d' % random.Random(3).randrange(1, contigs + 1) for _ in range(200)]
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            SequenceIDs, columns = list_index(path)
+            list_open = time.perf_counter() - start
+            list_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            start = time.perf_counter()
+            for SequenceID in queries:
+                SequenceIDs.index(SequenceID)
+            list_lookup = len(queries) / (time.perf_counter() - start)
+            del SequenceIDs, columns
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            fasta = FASTA_IO(path)
+            fasta.get_sequence_IDs() # the index is loaded on first use
+            new_open = time.perf_counter() - start
+            new_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            lookups = queries * 500
+            start = time.perf_counter()
+            for SequenceID in lookups:
+                fasta.read_in_section(SequenceID, 0, 10)
+            new_lookup = len(lookups) / (time.perf_counter() - start)
+            fasta.close()
+
+            print('%9d %12.2f %12.2f %14.0f %14.0f %10.1f %10.1f' % (contigs, list_open, new_open, list_lookup,
+                                                                     new_lookup, list_memory / 1e6, new_memory / 1e6))
+            contigs *= 10 if contigs * 10 <= max_contigs else max_contigs + 1
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Whole-sequence scans with iter_sequence and iter_windows: throughput and
+resident memory sampled during the scan, which should stay flat however long
+the sequence is.
+
+    python benchmarks/bench_iterators.py [sequence_length]
+"""
+
+import os, resource, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError: # no /proc, fall back to the peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def main():
+    length = int(float(sys.argv[1])) if len(sys.argv) > 1 else 2000000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), [length])
+        make_fai(path)
+        fasta = FASTA_IO(path)
+
+        scans = (('iter_sequence 1 MB', lambda: fasta.iter_sequence('chr1', 1 << 20), len),
+                 ('GC windows 1 kb', lambda: fasta.iter_windows('chr1', 1000, 1000), lambda window: window.count('G') + window.count('C')))
+        for label, scan, measure in scans:
+            samples = [rss_mb()]
+            start = time.perf_counter()
+            total = 0
+            for number, item in enumerate(scan()):
+                total += measure(item)
+                if number % 4096 == 0:
+                    samples.append(rss_mb())
+            elapsed = time.perf_counter() - start
+            print('%-20s %7.1f Mb/s  RSS min %.1f MB max %.1f MB' % (label, length / elapsed / 1e6, min(samples), max(samples)))
+        fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the chunked make_fai indexer with the previous line by line
+implementation (kept below as legacy_make_fai) on a synthetic genome.
+
+    python benchmarks/bench_make_fai.py [size_in_MB]
+"""
+
+import copy, io, os, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+
+
+def legacy_make_fai(path_to_file):
+    Data_out = []
+    with io.open(path_to_file, 'rb') as fasta_file_handle:
+        line = fasta_file_handle.readline().decode('ascii')
+        sequenceID = line[1:].split(' ')[0].replace('\n', '').replace('\r', '')
+        sequenceStart = fasta_file_handle.tell()
+        line = fasta_file_handle.readline().decode('ascii')
+        BytesPerLine = len(line)
+        line = line.strip()
+        BasesPerLine = len(line)
+        SequenceLength = len(line)
+        NextLine = fasta_file_handle.readline().decode('ascii')
+        while True:
+            line = copy.deepcopy(NextLine)
+            lineStart = fasta_file_handle.tell()
+            NextLine = fasta_file_handle.readline().decode('ascii')
+            if not NextLine:
+                SequenceLength += len(line.strip())
+                Data_out.append([sequenceID, SequenceLength, sequenceStart, BasesPerLine, BytesPerLine])
+                break
+            if line[:1] == ">":
+                Data_out.append([sequenceID, SequenceLength, sequenceStart, BasesPerLine, BytesPerLine])
+                sequenceID = line[1:].split(' ')[0].replace('\n', '').replace('\r', '')
+                sequenceStart = lineStart
+                BytesPerLine = len(NextLine)
+                NextLine = NextLine.strip()
+                BasesPerLine = len(NextLine)
+                SequenceLength = len(NextLine)
+                NextLine = fasta_file_handle.readline().decode('ascii')
+            else:
+                SequenceLength += len(line.strip())
+    with io.open(path_to_file + '.fai', 'w') as fai_file_handle:
+        fai_file_handle.write('\n'.join(['\t'.join([str(item) for item in value]) for value in Data_out]))
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'genome.fa')
+        write_fasta(path, [size * 1000000 // 24] * 24)
+        megabytes = os.path.getsize(path) / 1e6
+
+        start = time.perf_counter()
+        legacy_make_fai(path)
+        legacy_time = time.perf_counter() - start
+        with open(path + '.fai') as handle:
+            legacy_index = handle.read()
+
+        start = time.perf_counter()
+        make_fai(path)
+        new_time = time.perf_counter() - start
+        with open(path + '.fai') as handle:
+            assert handle.read() == legacy_index
+
+        print('%.0f MB: legacy %.1f s (%.0f MB/s), chunked %.1f s (%.0f MB/s), %.1fx' % (
+            megabytes, legacy_time, megabytes / legacy_time, new_time, megabytes / new_time, legacy_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Scaling of make_fai with the number of worker processes.
+
+    python benchmarks/bench_make_fai_parallel.py [size_in_MB] [max_workers]
+"""
+
+import os, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'genome.fa')
+        # a few large sequences so most range boundaries fall inside a sequence
+        write_fasta(path, [size * 1000000 // 5] * 5)
+        megabytes = os.path.getsize(path) / 1e6
+        reference = None
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            make_fai(path, workers=workers)
+            elapsed = time.perf_counter() - start
+            with open(path + '.fai') as handle:
+                index = handle.read()
+            reference = index if reference is None else reference
+            assert index == reference
+            if workers == 1:
+                serial = elapsed
+            print('%3d workers: %6.2f s %8.0f MB/s %5.1fx' % (workers, elapsed, megabytes / elapsed, serial / elapsed))
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the handle based and the memory mapped read paths of
+FASTA_IO.read_in_section across region sizes.
+
+    python benchmarks/bench_mmap_read.py [sequence_length]
+"""
+
+import os, random, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def time_reads(fasta, regions, output_format):
+    start = time.perf_counter()
+    for SequenceID, StartBase, StopBase in regions:
+        fasta.read_in_section(SequenceID, StartBase, StopBase, output_format=output_format)
+    return time.perf_counter() - start
+
+
+def main():
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 20000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), [length])
+        make_fai(path)
+        handle_reader = FASTA_IO(path)
+        mmap_reader = FASTA_IO(path, use_mmap=True)
+        rng = random.Random(1)
+        print('%10s %8s %12s %12s %12s %8s' % ('size', 'reads', 'handle/s', 'mmap/s', 'mmap-mv/s', 'speedup'))
+        for size in (10, 100, 1000, 10000, 100000, 1000000):
+            count = max(20, min(20000, 20000000 // size))
+            regions = []
+            for _ in range(count):
+                StartBase = rng.randrange(0, length - size)
+                regions.append(('chr1', StartBase, StartBase + size))
+            handle_time = time_reads(handle_reader, regions, 'str')
+            mmap_time = time_reads(mmap_reader, regions, 'str')
+            view_time = time_reads(mmap_reader, regions, 'memoryview')
+            print('%10d %8d %12.0f %12.0f %12.0f %7.1fx' % (size, count, count / handle_time, count / mmap_time,
+                                                         count / view_time, handle_time / mmap_time))
+        handle_reader.close()
+        mmap_reader.close()
+
+
+if __name__ == '__main__':
+    main()
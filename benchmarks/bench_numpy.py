@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Region reads into numpy uint8 base codes: str output converted afterwards
+against the 'numpy_codes' output format and the batched read_regions_into.
+
+    python benchmarks/bench_numpy.py [number_of_regions] [region_length]
+"""
+
+import os, random, sys, tempfile, time
+
+import numpy
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    length = 50000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), [length])
+        make_fai(path)
+        rng = random.Random(17)
+        regions = []
+        for _ in range(count):
+            StartBase = rng.randrange(0, length - width)
+            regions.append(('chr1', StartBase, StartBase + width))
+        lookup = numpy.full(256, 4, dtype=numpy.uint8)
+        for code, base in enumerate(b'ACGT'):
+            lookup[base] = lookup[base + 32] = code
+
+        for label, options in (('handle', {}), ('mmap', {'use_mmap': True})):
+            fasta = FASTA_IO(path, **options)
+            fasta.read_regions(regions) # warm up the page cache
+
+            start = time.perf_counter()
+            out = numpy.stack([lookup[numpy.frombuffer(fasta.read_in_section(*region).encode('ascii'), dtype=numpy.uint8)]
+                               for region in regions])
+            baseline = time.perf_counter() - start
+
+            start = time.perf_counter()
+            arrays = numpy.stack([fasta.read_in_section(*region, output_format='numpy_codes') for region in regions])
+            single = time.perf_counter() - start
+
+            buffer = numpy.empty((count, width), dtype=numpy.uint8)
+            start = time.perf_counter()
+            fasta.read_regions_into(regions, buffer, 'numpy_codes')
+            batched = time.perf_counter() - start
+
+            assert (out == arrays).all() and (out == buffer).all()
+            print('%-7s str + convert %8.0f regions/s  numpy_codes %8.0f regions/s  read_regions_into %8.0f regions/s'
+                  % (label, count / baseline, count / single, count / batched))
+            fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Random region reads across many small references under a low open file
+limit: one FASTA_IO per reference runs out of file descriptors, FASTA_Pool
+keeps at most max_open readers holding handles.
+
+    python benchmarks/bench_pool.py [references] [fd_limit]
+"""
+
+import os, random, resource, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from FASTA_Pool import FASTA_Pool
+
+
+def queries(references, count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        start = rng.randrange(9900)
+        yield rng.choice(references), 'chr%d' % rng.randint(1, 2), start, start + 100
+
+
+def run_pool(paths, references, max_open, count=20000):
+    with FASTA_Pool(paths, max_open=max_open) as pool:
+        start_time = time.perf_counter()
+        for query in queries(references, count):
+            pool.read_in_section(*query)
+        elapsed = time.perf_counter() - start_time
+        stats = pool.get_pool_stats()
+    print('pool max_open=%-5d %8.1f us/query, %6d opens, %6d releases'
+          % (max_open, elapsed / count * 1e6, stats['opens'], stats['releases']))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    fd_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {}
+        for number in range(count):
+            path = write_fasta(os.path.join(directory, 'ref%d.fa' % number), [10000, 10000], seed=number)
+            make_fai(path)
+            paths['ref%d' % number] = path
+        references = list(paths)
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(fd_limit, hard), hard))
+        try:
+            readers = {}
+            try:
+                for reference, SequenceID, start, stop in queries(references, 20000):
+                    if reference not in readers:
+                        readers[reference] = FASTA_IO(paths[reference])
+                    readers[reference].read_in_section(SequenceID, start, stop)
+                print('one FASTA_IO per reference: all %d opened' % len(readers))
+            except Exception as error:
+                print('one FASTA_IO per reference: failed after %d readers (%s)' % (len(readers), error))
+            for reader in readers.values():
+                reader.close()
+
+            for max_open in (16, 64, 128):
+                run_pool(paths, references, max_open)
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        if soft > count + 16:
+            print('without the fd limit:')
+            run_pool(paths, references, count)
+
+
+if __name__ == '__main__':
+    main()
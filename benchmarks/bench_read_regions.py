@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Compare a python loop over FASTA_IO.read_in_section with the batched
+FASTA_IO.read_regions call for many short intervals.
+
+    python benchmarks/bench_read_regions.py [number_of_intervals]
+"""
+
+import os, random, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    lengths = [5000000] * 4
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), lengths)
+        make_fai(path)
+        rng = random.Random(2)
+        regions = []
+        for _ in range(count):
+            number = rng.randrange(len(lengths))
+            StartBase = rng.randrange(0, lengths[number] - 500)
+            StopBase = StartBase + rng.randrange(50, 500)
+            regions.append(('chr%d' % (number + 1), StartBase, StopBase))
+        reverse = [(SequenceID, StopBase, StartBase) if rng.random() < 0.5 else (SequenceID, StartBase, StopBase)
+                   for SequenceID, StartBase, StopBase in regions]
+
+        for use_mmap, label, regions in ((False, 'forward', regions), (True, 'forward', regions),
+                                         (False, 'mixed', reverse), (True, 'mixed', reverse)):
+            fasta = FASTA_IO(path, use_mmap=use_mmap)
+            start = time.perf_counter()
+            looped = [fasta.read_in_section(*region) for region in regions]
+            loop_time = time.perf_counter() - start
+            start = time.perf_counter()
+            batched = fasta.read_regions(regions)
+            batch_time = time.perf_counter() - start
+            assert looped == batched
+            print('%-8s mmap=%-5s loop %8.0f regions/s   read_regions %8.0f regions/s   %5.1fx' % (
+                label, use_mmap, count / loop_time, count / batch_time, loop_time / batch_time))
+            fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the translation table reverse complement with the previous per
+base dictionary lookup at 1 kb, 100 kb and 10 Mb.
+
+    python benchmarks/bench_reverse_complement.py
+"""
+
+import random, time
+
+import synthetic  # noqa: F401, puts the repository on sys.path
+from FASTA_IO import FASTA_IO, reverse_complement
+
+
+def dictionary_reverse_complement(sequence):
+    return "".join([FASTA_IO.RevCompDict.get(value, "N") for value in sequence[::-1]])
+
+
+def best_time(function, sequence, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(sequence)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    rng = random.Random(4)
+    print('%10s %14s %14s %14s %9s' % ('size', 'dict MB/s', 'str MB/s', 'bytes MB/s', 'speedup'))
+    for size in (1000, 100000, 10000000):
+        sequence = "".join(rng.choice("ACGTNacgtn") for _ in range(size))
+        repeats = max(3, 1000000 // size)
+        old = best_time(dictionary_reverse_complement, sequence, repeats)
+        new = best_time(reverse_complement, sequence, repeats)
+        raw = best_time(reverse_complement, sequence.encode('ascii'), repeats)
+        print('%10d %14.1f %14.1f %14.1f %8.0fx' % (size, size / old / 1e6, size / new / 1e6, size / raw / 1e6, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Whole genome scans with scan.py against the hand written loop over
+get_sequence_IDs and read_in_section, for 1 to N worker processes.
+
+    python benchmarks/bench_scan.py [genome_bases] [max_workers]
+"""
+
+import os, sys, tempfile, time
+
+from synthetic import contig_lengths, write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from scan import base_composition, n_gaps
+
+
+def loop_composition(path):
+    fasta = FASTA_IO(path)
+    counts = {}
+    for SequenceID in fasta.get_sequence_IDs():
+        sequence = fasta.read_in_section(SequenceID, 0, fasta.__get_record__(SequenceID)[0]).upper()
+        counts[SequenceID] = {base: sequence.count(base) for base in 'ACGTN'}
+    fasta.close()
+    return counts
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    bases = int(float(sys.argv[1])) if len(sys.argv) > 1 else 200000000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(4, os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as directory:
+        lengths = contig_lengths(200, 1e4, 1e7)
+        lengths = [max(1, length * bases // sum(lengths)) for length in lengths]
+        path = write_fasta(os.path.join(directory, 'genome.fa'), lengths, lowercase_runs=100, n_runs=5)
+        make_fai(path)
+        size = os.path.getsize(path) / 1e6
+        print('%d contigs, %.0f MB, %d CPUs' % (len(lengths), size, os.cpu_count() or 1))
+        elapsed = timed(loop_composition, path)
+        print('%-34s %8.2f s %8.0f MB/s' % ('loop over read_in_section', elapsed, size / elapsed))
+        workers = 1
+        while workers <= max_workers:
+            elapsed = timed(base_composition, path, workers=workers)
+            print('%-34s %8.2f s %8.0f MB/s' % ('base_composition, %d workers' % workers, elapsed, size / elapsed))
+            elapsed = timed(n_gaps, path, workers=workers)
+            print('%-34s %8.2f s %8.0f MB/s' % ('n_gaps, %d workers' % workers, elapsed, size / elapsed))
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Pattern search on both strands: streaming search against lookups in the
+k-mer sidecar index, for primers, a degenerate guide RNA with its PAM and a
+short restriction site (shorter than k, always streamed).
+
+    python benchmarks/bench_search.py [genome_bases] [k]
+"""
+
+import os, random, sys, tempfile, time
+
+from synthetic import contig_lengths, write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from search import find_pattern, make_kmer_index, KmerIndex
+
+
+def main():
+    bases = int(float(sys.argv[1])) if len(sys.argv) > 1 else 50000000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    with tempfile.TemporaryDirectory() as directory:
+        lengths = contig_lengths(50, 1e4, 1e7)
+        lengths = [max(1, length * bases // sum(lengths)) for length in lengths]
+        path = write_fasta(os.path.join(directory, 'genome.fa'), lengths, lowercase_runs=100, n_runs=5)
+        make_fai(path)
+        fasta = FASTA_IO(path)
+        rng = random.Random(3)
+        SequenceID = fasta.get_sequence_IDs()[0]
+        primers = []
+        for _ in range(3):
+            start = rng.randrange(lengths[0] - 30)
+            primers.append(fasta.read_in_section(SequenceID, start, start + 20).upper().replace('N', 'A'))
+        queries = [('primer %d' % number, primer) for number, primer in enumerate(primers)]
+        queries.append(('guide + NGG', primers[0][:20] + 'NGG'))
+        queries.append(('degenerate primer', primers[1][:8] + 'RY' + primers[1][10:]))
+        queries.append(('EcoRI GAATTC', 'GAATTC'))
+
+        start = time.perf_counter()
+        index_path = make_kmer_index(fasta, k=k)
+        print('%.0f Mb, k=%d index built in %.1f s, %.0f MB'
+              % (sum(lengths) / 1e6, k, time.perf_counter() - start, os.path.getsize(index_path) / 1e6))
+        index = KmerIndex(index_path)
+        print('%-20s %8s %12s %12s' % ('query', 'hits', 'streaming s', 'indexed ms'))
+        for name, pattern in queries:
+            start = time.perf_counter()
+            streamed = find_pattern(fasta, pattern)
+            streaming_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(10):
+                indexed = find_pattern(fasta, pattern, index=index)
+            indexed_time = (time.perf_counter() - start) / 10
+            assert indexed == streamed
+            print('%-20s %8d %12.2f %12.2f' % (name, len(streamed), streaming_time, indexed_time * 1e3))
+        index.close()
+        fasta.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+File size, open time and random access throughput of the 2bit format
+against the text FASTA reader, on a synthetic genome with soft masked and N
+runs.
+
+    python benchmarks/bench_twobit.py [number_of_reads]
+"""
+
+import os, random, sys, tempfile, time
+
+from synthetic import write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from TwoBit_IO import TwoBit_IO, fasta_to_twobit
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    lengths = [40000000, 30000000, 20000000] + [200000] * 50
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_fasta(os.path.join(directory, 'bench.fa'), lengths)
+        make_fai(path)
+        rng = random.Random(13)
+        fasta = FASTA_IO(path)
+        for mask, average in ((fasta.soft_mask_regions, 300), (fasta.hard_mask_regions, 5000)):
+            regions = []
+            for number, length in enumerate(lengths):
+                for _ in range(length // (average * 20)):
+                    StartBase = rng.randrange(length - average * 2)
+                    regions.append(('chr%d' % (number + 1), StartBase, StartBase + rng.randrange(1, average * 2)))
+            mask(regions)
+        fasta.close()
+
+        start = time.perf_counter()
+        twobit_path = fasta_to_twobit(path)
+        print('fasta_to_twobit     %.2f s' % (time.perf_counter() - start))
+        print('size  fasta+fai  %8.1f MB' % ((os.path.getsize(path) + os.path.getsize(path + '.fai')) / 1e6))
+        print('size  2bit       %8.1f MB' % (os.path.getsize(twobit_path) / 1e6))
+
+        regions = []
+        for _ in range(count):
+            number = rng.randrange(len(lengths))
+            StartBase = rng.randrange(0, lengths[number] - 1000)
+            regions.append(('chr%d' % (number + 1), StartBase, StartBase + rng.randrange(20, 1000)))
+
+        for label, reader, reader_path in (('fasta', FASTA_IO, path), ('2bit', TwoBit_IO, twobit_path)):
+            start = time.perf_counter()
+            for _ in range(100):
+                reader(reader_path).close()
+            opened = (time.perf_counter() - start) / 100
+            io = reader(reader_path)
+            for region in regions[:1000]: # warm up
+                io.read_in_section(*region)
+            start = time.perf_counter()
+            for region in regions:
+                io.read_in_section(*region)
+            elapsed = time.perf_counter() - start
+            print('%-6s open %7.1f us  %9.0f random reads/s' % (label, opened * 1e6, count / elapsed))
+            io.close()
+
+
+if __name__ == '__main__':
+    main()
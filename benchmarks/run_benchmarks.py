@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: indexing, random and sequential reads, reverse complement,
+masking and overwrites on deterministic synthetic genomes (synthetic.py).
+Results are written as JSON so runs on different commits can be compared.
+
+    python benchmarks/run_benchmarks.py [--scale quick|default|large] [--repeat 5]
+                                        [--filter read] [--output results.json]
+    python benchmarks/run_benchmarks.py --compare base.json new.json [--threshold 0.1]
+
+With --compare the ratio new/base of the best time of every case is
+printed and the exit status is 1 when a case got slower by more than the
+threshold, for use in CI.
+"""
+
+import argparse, json, os, platform, random, shutil, statistics, subprocess, sys, tempfile, time
+
+from synthetic import contig_lengths, write_fasta
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+SCALES = {
+    # contigs, shortest and longest contig, short contigs of the many contig genome, number of operations
+    'quick': dict(contigs=8, min_length=5e4, max_length=2e6, many_contigs=2000, operations=2000),
+    'default': dict(contigs=24, min_length=1e5, max_length=2e7, many_contigs=50000, operations=20000),
+    'large': dict(contigs=24, min_length=1e6, max_length=2.5e8, many_contigs=500000, operations=100000),
+}
+
+CASES = []
+
+
+def case(name, mutates=False):
+    """Register a benchmark, mutating cases get a fresh copy of the genome for every repeat."""
+    def register(function):
+        CASES.append((name, function, mutates))
+        return function
+    return register
+
+
+class Genomes:
+    """The synthetic files of one run and the parameters they were made with."""
+
+    def __init__(self, directory, scale, seed):
+        self.directory = directory
+        self.scale = SCALES[scale]
+        self.seed = seed
+        self.operations = self.scale['operations']
+        self.lengths = contig_lengths(self.scale['contigs'], int(self.scale['min_length']),
+                                      int(self.scale['max_length']), seed)
+        self.path = write_fasta(os.path.join(directory, 'genome.fa'), self.lengths, seed=seed)
+        self.masked_path = write_fasta(os.path.join(directory, 'masked_crlf.fa'), self.lengths, line_width=70,
+                                       seed=seed, crlf=True, lowercase_runs=200, n_runs=20)
+        self.many_lengths = contig_lengths(self.scale['many_contigs'], 200, 5000, seed)
+        self.many_path = write_fasta(os.path.join(directory, 'contigs.fa'), self.many_lengths, seed=seed)
+        for path in (self.path, self.masked_path, self.many_path):
+            make_fai(path)
+        self.names = ['chr%d' % (number + 1) for number in range(len(self.lengths))]
+
+    def regions(self, size, count, seed):
+        """Random regions of a fixed size, sequences picked in proportion to their length."""
+        rng = random.Random(seed)
+        names = rng.choices(self.names, weights=self.lengths, k=count)
+        regions = []
+        for name in names:
+            length = self.lengths[int(name[3:]) - 1]
+            start = rng.randrange(max(1, length - size))
+            regions.append((name, start, min(length, start + size)))
+        return regions
+
+    def copy(self):
+        """A fresh copy of the genome and its index for cases that write."""
+        path = os.path.join(self.directory, 'scratch.fa')
+        shutil.copyfile(self.path, path)
+        shutil.copyfile(self.path + '.fai', path + '.fai')
+        return path
+
+
+###### indexing
+
+@case('make_fai')
+def bench_make_fai(genomes, path):
+    make_fai(genomes.path)
+    return 1, os.path.getsize(genomes.path)
+
+
+@case('make_fai_crlf_masked')
+def bench_make_fai_crlf_masked(genomes, path):
+    make_fai(genomes.masked_path)
+    return 1, os.path.getsize(genomes.masked_path)
+
+
+@case('make_fai_many_contigs')
+def bench_make_fai_many_contigs(genomes, path):
+    make_fai(genomes.many_path)
+    return 1, os.path.getsize(genomes.many_path)
+
+
+@case('open_many_contigs')
+def bench_open_many_contigs(genomes, path):
+    fasta = FASTA_IO(genomes.many_path)
+    fasta.read_in_section('chr%d' % len(genomes.many_lengths), 0, 10)
+    fasta.close()
+    return 1, os.path.getsize(genomes.many_path + '.fai')
+
+
+###### reads
+
+def read_all(fasta, regions, output_format='str'):
+    for SequenceID, StartBase, StopBase in regions:
+        fasta.read_in_section(SequenceID, StartBase, StopBase, output_format)
+    return len(regions), sum(abs(StopBase - StartBase) for SequenceID, StartBase, StopBase in regions)
+
+
+@case('random_read_100')
+def bench_random_read_100(genomes, path):
+    fasta = FASTA_IO(genomes.path)
+    result = read_all(fasta, genomes.regions(100, genomes.operations, 1))
+    fasta.close()
+    return result
+
+
+@case('random_read_100_mmap')
+def bench_random_read_100_mmap(genomes, path):
+    fasta = FASTA_IO(genomes.path, use_mmap=True)
+    result = read_all(fasta, genomes.regions(100, genomes.operations, 1))
+    fasta.close()
+    return result
+
+
+@case('random_read_100_crlf_masked')
+def bench_random_read_100_crlf_masked(genomes, path):
+    fasta = FASTA_IO(genomes.masked_path)
+    result = read_all(fasta, genomes.regions(100, genomes.operations, 1))
+    fasta.close()
+    return result
+
+
+@case('random_read_10k')
+def bench_random_read_10k(genomes, path):
+    fasta = FASTA_IO(genomes.path)
+    result = read_all(fasta, genomes.regions(10000, genomes.operations // 10, 2))
+    fasta.close()
+    return result
+
+
+@case('read_regions_100')
+def bench_read_regions_100(genomes, path):
+    fasta = FASTA_IO(genomes.path)
+    regions = genomes.regions(100, genomes.operations, 1)
+    fasta.read_regions(regions)
+    fasta.close()
+    return len(regions), 100 * len(regions)
+
+
+@case('sequential_read_1m')
+def bench_sequential_read_1m(genomes, path):
+    fasta = FASTA_IO(genomes.path)
+    regions = [(name, start, min(length, start + 1000000))
+               for name, length in zip(genomes.names, genomes.lengths) for start in range(0, length, 1000000)]
+    result = read_all(fasta, regions)
+    fasta.close()
+    return result
+
+
+@case('iter_sequence')
+def bench_iter_sequence(genomes, path):
+    fasta = FASTA_IO(genomes.path)
+    total = sum(len(chunk) for chunk in fasta.iter_sequence('chr1', output_format='bytes'))
+    fasta.close()
+    return 1, total
+
+
+@case('reverse_complement_10k')
+def bench_reverse_complement_10k(genomes, path):
+    fasta = FASTA_IO(genomes.path)
+    regions = [(name, stop, start) for name, start, stop in genomes.regions(10000, genomes.operations // 10, 3)]
+    result = read_all(fasta, regions)
+    fasta.close()
+    return result
+
+
+###### writes
+
+@case('soft_mask_regions', mutates=True)
+def bench_soft_mask_regions(genomes, path):
+    fasta = FASTA_IO(path)
+    regions = genomes.regions(200, genomes.operations, 4)
+    fasta.soft_mask_regions(regions)
+    fasta.close()
+    return len(regions), 200 * len(regions)
+
+
+@case('hard_mask_region', mutates=True)
+def bench_hard_mask_region(genomes, path):
+    fasta = FASTA_IO(path)
+    regions = genomes.regions(200, genomes.operations // 10, 5)
+    for SequenceID, StartBase, StopBase in regions:
+        fasta.hard_mask_region(SequenceID, StartBase, StopBase)
+    fasta.close()
+    return len(regions), 200 * len(regions)
+
+
+@case('overwrite_section', mutates=True)
+def bench_overwrite_section(genomes, path):
+    fasta = FASTA_IO(path)
+    regions = genomes.regions(20, genomes.operations // 4, 6)
+    for SequenceID, StartBase, StopBase in regions:
+        fasta.overwrite_section(SequenceID, max(1, StartBase), 'ACGTN' * 4)
+    fasta.close()
+    return len(regions), 20 * len(regions)
+
+
+@case('overwrite_section_batch', mutates=True)
+def bench_overwrite_section_batch(genomes, path):
+    fasta = FASTA_IO(path)
+    regions = genomes.regions(20, genomes.operations // 4, 6)
+    with fasta.batch():
+        for SequenceID, StartBase, StopBase in regions:
+            fasta.overwrite_section(SequenceID, max(1, StartBase), 'ACGTN' * 4)
+    fasta.close()
+    return len(regions), 20 * len(regions)
+
+
+@case('soft_mask_regions_batch', mutates=True)
+def bench_soft_mask_regions_batch(genomes, path):
+    fasta = FASTA_IO(path)
+    regions = genomes.regions(200, genomes.operations, 4)
+    with fasta.batch():
+        fasta.soft_mask_regions(regions)
+    fasta.close()
+    return len(regions), 200 * len(regions)
+
+
+@case('read_then_overwrite_batch', mutates=True)
+def bench_read_then_overwrite_batch(genomes, path):
+    fasta = FASTA_IO(path)
+    regions = genomes.regions(20, genomes.operations // 4, 6)
+    with fasta.batch():
+        for SequenceID, StartBase, StopBase in regions:
+            fasta.overwrite_section(SequenceID, max(1, StartBase),
+                                    fasta.read_in_section(SequenceID, max(1, StartBase), StopBase).lower())
+    fasta.close()
+    return len(regions), 2 * 20 * len(regions)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(scale, repeat, pattern, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        genomes = Genomes(directory, scale, seed)
+        results = {}
+        print('%-30s %10s %10s %12s %10s' % ('case', 'best s', 'median s', 'ops/s', 'MB/s'))
+        for name, function, mutates in CASES:
+            if pattern and pattern not in name:
+                continue
+            times = []
+            for _ in range(repeat):
+                path = genomes.copy() if mutates else None
+                start = time.perf_counter()
+                operations, nbytes = function(genomes, path)
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            results[name] = {'best_seconds': best, 'median_seconds': statistics.median(times), 'seconds': times,
+                             'operations': operations, 'bytes': nbytes,
+                             'operations_per_second': operations / best, 'mb_per_second': nbytes / best / 1e6}
+            print('%-30s %10.4f %10.4f %12.0f %10.1f' % (name, best, statistics.median(times),
+                                                         operations / best, nbytes / best / 1e6))
+        return {'meta': {'commit': git_commit(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                         'python': platform.python_version(), 'platform': platform.platform(),
+                         'cpu_count': os.cpu_count(), 'scale': scale, 'scale_parameters': SCALES[scale],
+                         'seed': seed, 'repeat': repeat, 'genome_bases': sum(genomes.lengths)},
+                'results': results}
+
+
+def compare(path_to_base, path_to_new, threshold):
+    with open(path_to_base) as handle:
+        base = json.load(handle)
+    with open(path_to_new) as handle:
+        new = json.load(handle)
+    print('base %s, new %s' % (base['meta'].get('commit'), new['meta'].get('commit')))
+    print('%-30s %10s %10s %8s' % ('case', 'base s', 'new s', 'ratio'))
+    regressions = 0
+    for name, result in new['results'].items():
+        if name not in base['results']:
+            continue
+        base_time, new_time = base['results'][name]['best_seconds'], result['best_seconds']
+        ratio = new_time / base_time
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  slower'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = '  faster'
+        print('%-30s %10.4f %10.4f %7.2fx%s' % (name, base_time, new_time, ratio, flag))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FASTA_IO benchmark suite.')
+    parser.add_argument('--scale', choices=list(SCALES), default='default')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported by --compare')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.threshold))
+    results = run(args.scale, args.repeat, args.filter, args.seed)
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=1)
+    print('results written to %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
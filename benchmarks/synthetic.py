@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers shared by the benchmark scripts: deterministic synthetic FASTA
+files so timings are comparable between runs and machines.
+
+Also usable from the command line to write a genome for other tools:
+
+    python benchmarks/synthetic.py out.fa --contigs 24 --min-length 1e5 --max-length 5e7 --crlf
+"""
+
+import os, random, sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def contig_lengths(contigs, min_length, max_length, seed=0):
+    """
+    contig_lengths(contigs, min_length, max_length, seed)
+
+    inputs:
+        contigs : number of sequences
+        min_length, max_length : range of the lengths, drawn log-uniformly
+                                 so a few long chromosomes come with many
+                                 short contigs as in real assemblies
+        seed : random seed
+    outputs:
+        returns the list of lengths, longest first
+    """
+    import math
+    rng = random.Random(seed)
+    low, high = math.log(min_length), math.log(max_length)
+    return sorted((int(math.exp(rng.uniform(low, high))) for _ in range(contigs)), reverse=True)
+
+
+def _runs(rng, length, per_mb, run_length, kind):
+    """Random (start, stop, kind) runs, about per_mb of them per megabase."""
+    count = int(length * per_mb / 1e6 + rng.random())
+    runs = []
+    for _ in range(count):
+        start = rng.randrange(length)
+        runs.append((start, min(length, start + rng.randint(1, 2 * run_length)), kind))
+    return runs
+
+
+def write_fasta(path_to_file, lengths, line_width=60, seed=0, crlf=False, lowercase_runs=0, n_runs=0, run_length=500):
+    """
+    write_fasta(path_to_file, lengths, line_width, seed)
+
+    inputs:
+        path_to_file : fasta file to create
+        lengths : list of sequence lengths, sequences are named chr1, chr2, ...
+        line_width : bases per line, or a list with one width per sequence
+        seed : random seed so the same file is produced every time
+        crlf : end lines with '\\r\\n' instead of '\\n'
+        lowercase_runs : soft masked (lowercase) runs per megabase
+        n_runs : runs of N per megabase
+        run_length : mean length of the runs
+    """
+    rng = random.Random(seed)
+    block = bytes(rng.choice(b'ACGT') for _ in range(1 << 16))
+    newline = b'\r\n' if crlf else b'\n'
+    lower, to_n = bytes.maketrans(b'ACGT', b'acgt'), bytes.maketrans(b'ACGTacgt', b'NNNNNNNN')
+    with open(path_to_file, 'wb') as handle:
+        for number, length in enumerate(lengths):
+            width = line_width[number] if isinstance(line_width, (list, tuple)) else line_width
+            runs = []
+            if lowercase_runs or n_runs:
+                runs = sorted(_runs(rng, length, lowercase_runs, run_length, lower) + _runs(rng, length, n_runs, run_length, to_n),
+                              key=lambda run: run[0])
+            handle.write(b'>chr%d\n' % (number + 1) if not crlf else b'>chr%d\r\n' % (number + 1))
+            written = 0
+            first = 0 # runs before it ended before this line
+            while written < length:
+                line = min(width, length - written)
+                start = (written * 7) % (len(block) - width)
+                data = block[start:start + line]
+                while first < len(runs) and runs[first][1] <= written:
+                    first += 1
+                if first < len(runs) and runs[first][0] < written + line:
+                    data = bytearray(data)
+                    for run_start, run_stop, table in runs[first:]:
+                        if run_start >= written + line:
+                            break
+                        a, b = max(run_start, written) - written, min(run_stop, written + line) - written
+                        if a < b:
+                            data[a:b] = data[a:b].translate(table)
+                handle.write(data + newline)
+                written += line
+    return path_to_file
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Write a deterministic synthetic fasta file.')
+    parser.add_argument('path')
+    parser.add_argument('--contigs', type=int, default=24)
+    parser.add_argument('--min-length', type=float, default=1e5)
+    parser.add_argument('--max-length', type=float, default=5e6)
+    parser.add_argument('--line-width', type=int, default=60)
+    parser.add_argument('--crlf', action='store_true')
+    parser.add_argument('--lowercase-runs', type=float, default=0)
+    parser.add_argument('--n-runs', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    lengths = contig_lengths(args.contigs, int(args.min_length), int(args.max_length), args.seed)
+    write_fasta(args.path, lengths, args.line_width, args.seed, args.crlf, args.lowercase_runs, args.n_runs)
+    print('%s: %d contigs, %d bases' % (args.path, len(lengths), sum(lengths)))
+
+
+if __name__ == '__main__':
+    main()
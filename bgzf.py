@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+
+BGZF_EOF=bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+BGZF_MAX_INPUT=65280
+
+
+def is_gzip(path_to_file):
+    """
+    is_gzip(path_to_file)
+    
+    inputs:
+        path_to_file : path to a file
+    outputs:
+        True if the file starts with the gzip magic bytes
+    """
+    import io
+    
+    with io.open(path_to_file,'rb') as file_handle:
+        return file_handle.read(2)==b'\x1f\x8b'
+
+
+def is_bgzf(path_to_file):
+    """
+    is_bgzf(path_to_file)
+    
+    inputs:
+        path_to_file : path to a file
+    outputs:
+        True if the file is gzip compressed with BGZF blocks (bgzip)
+    """
+    import io
+    
+    with io.open(path_to_file,'rb') as file_handle:
+        try:
+            _block_size(file_handle.read(18+256))
+            return True
+        except:
+            return False
+
+
+def _block_size(header):
+    
+    ###########################################################################
+    # Total size in bytes of the BGZF block starting with header, read from
+    # the BSIZE field of the 'BC' extra subfield.
+    ###########################################################################
+    import struct
+    
+    if header[:4]!=b'\x1f\x8b\x08\x04':
+        raise Exception("not a BGZF block")
+    xlen=struct.unpack_from('<H',header,10)[0]
+    position=12
+    while position+4<=12+xlen:
+        si1,si2,slen=header[position],header[position+1],struct.unpack_from('<H',header,position+2)[0]
+        if si1==66 and si2==67 and slen==2:
+            return struct.unpack_from('<H',header,position+4)[0]+1
+        position+=4+slen
+    raise Exception("not a BGZF block")
+
+
+def make_gzi(path_to_file,write=True):
+    """
+    make_gzi(path_to_file)
+    
+    inputs:
+        path_to_file : path to a bgzip compressed fasta file
+        write : write the index to path_to_file+'.gzi'
+    outputs:
+        returns the block index, a list of (compressed offset, uncompressed
+        offset) for every block, the first block (0, 0) included. The .gzi
+        file uses the samtools layout: a little endian uint64 count followed
+        by the pairs of every block but the first.
+    """
+    import io, os, struct
+    
+    Blocks=[]
+    size=os.path.getsize(path_to_file)
+    with io.open(path_to_file,'rb') as file_handle:
+        compressed,uncompressed=0,0
+        while compressed<size:
+            file_handle.seek(compressed)
+            header=file_handle.read(18+256)
+            block_size=_block_size(header)
+            file_handle.seek(compressed+block_size-4)
+            isize=struct.unpack('<I',file_handle.read(4))[0]
+            if isize:
+                Blocks.append((compressed,uncompressed))
+            compressed+=block_size
+            uncompressed+=isize
+    if not Blocks:
+        Blocks.append((0,0))
+    
+    if write:
+        with io.open(path_to_file+'.gzi','wb') as gzi_file_handle:
+            gzi_file_handle.write(struct.pack('<Q',len(Blocks)-1))
+            for entry in Blocks[1:]:
+                gzi_file_handle.write(struct.pack('<QQ',*entry))
+    return Blocks
+
+
+def read_gzi(path_to_gzi):
+    """
+    read_gzi(path_to_gzi)
+    
+    inputs:
+        path_to_gzi : path to a .gzi index
+    outputs:
+        returns the block index, see make_gzi
+    """
+    import io, struct
+    
+    with io.open(path_to_gzi,'rb') as gzi_file_handle:
+        data=gzi_file_handle.read()
+    count=struct.unpack_from('<Q',data,0)[0]
+    values=struct.unpack_from('<%dQ' % (2*count),data,8)
+    return [(0,0)]+list(zip(values[0::2],values[1::2]))
+
+
+def bgzip(path_to_file,path_to_output=None,level=6):
+    """
+    bgzip(path_to_file)
+    
+    inputs:
+        path_to_file : file to compress
+        path_to_output : compressed file, path_to_file+'.gz' by default
+        level : zlib compression level
+    outputs:
+        returns the path of the BGZF compressed file
+    """
+    import io, struct, zlib
+    
+    if path_to_output is None:
+        path_to_output=path_to_file+'.gz'
+    with io.open(path_to_file,'rb') as input_handle, io.open(path_to_output,'wb') as output_handle:
+        while True:
+            data=input_handle.read(BGZF_MAX_INPUT)
+            if not data:
+                break
+            compressor=zlib.compressobj(level,zlib.DEFLATED,-15)
+            compressed=compressor.compress(data)+compressor.flush()
+            output_handle.write(struct.pack('<4BI2BH2BHH',31,139,8,4,0,0,255,6,66,67,2,len(compressed)+25))
+            output_handle.write(compressed)
+            output_handle.write(struct.pack('<II',zlib.crc32(data),len(data)))
+        output_handle.write(BGZF_EOF)
+    return path_to_output
+
+
+class BGZF_Reader:
+    
+    import os, bisect, collections, threading, zlib
+    
+    def __init__(self,file_handle,Blocks,cache_blocks=256):
+        """
+        BGZF_Reader()
+        
+        inputs:
+            file_handle : binary file handle of the bgzip compressed file
+            Blocks : block index from make_gzi or read_gzi
+            cache_blocks : number of decompressed blocks kept in an LRU cache
+        
+        Random access to the uncompressed data, only the blocks overlapping a
+        read are decompressed.
+        """
+        self.file_handle=file_handle
+        self.compressed_offsets=[entry[0] for entry in Blocks]
+        self.uncompressed_offsets=[entry[1] for entry in Blocks]
+        self.cache_blocks=cache_blocks
+        self.cache=self.collections.OrderedDict()
+        self.lock=self.threading.Lock()
+    
+    def __read_compressed__(self,length,offset):
+        if hasattr(self.os,'pread'):
+            return self.os.pread(self.file_handle.fileno(),length,offset)
+        with self.lock:
+            self.file_handle.seek(offset,0)
+            return self.file_handle.read(length)
+    
+    def __block__(self,Block):
+        
+        ###### decompressed data of a block, from the cache when possible
+        with self.lock:
+            data=self.cache.get(Block)
+            if data is not None:
+                self.cache.move_to_end(Block)
+                return data
+        raw=self.__read_compressed__(65536,self.compressed_offsets[Block])
+        block_size=_block_size(raw)
+        xlen=raw[10]|(raw[11]<<8)
+        data=self.zlib.decompress(raw[12+xlen:block_size-8],-15)
+        with self.lock:
+            self.cache[Block]=data
+            while len(self.cache)>self.cache_blocks:
+                self.cache.popitem(last=False)
+        return data
+    
+    def pread(self,length,offset):
+        """
+        pread(length,offset)
+        
+        inputs:
+            length : number of uncompressed bytes to read
+            offset : position in the uncompressed data
+        outputs:
+            returns up to length bytes, fewer at the end of the data
+        """
+        Block=self.bisect.bisect_right(self.uncompressed_offsets,offset)-1
+        data_out=[]
+        while length>0 and Block<len(self.compressed_offsets):
+            data=self.__block__(Block)
+            piece=data[offset-self.uncompressed_offsets[Block]:offset-self.uncompressed_offsets[Block]+length]
+            data_out.append(piece)
+            length-=len(piece)
+            offset+=len(piece)
+            Block+=1
+        return data_out[0] if len(data_out)==1 else b''.join(data_out)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+
+BinaryIndexMagic=b'FAIBIN1\x00'
+BinaryIndexHeader='<8sQQqq' # magic, count, hash table size, .fai size, .fai mtime in ns
+RecordFormat='<qqqq' # Length, Start, BasesPerLine, BytesPerLine
+
+
+def make_binary_index(path_to_fai,path_to_index=None):
+    """
+    make_binary_index(path_to_fai)
+    
+    inputs:
+        path_to_fai : path to a .fai index
+        path_to_index : binary index to write, path_to_fai+'.bin' by default
+    outputs:
+        returns the path of the binary index
+    
+    Layout (little endian), every section at a fixed offset from the header:
+        header : magic, count, table size, .fai size and mtime
+        records : count x (Length, Start, BasesPerLine, BytesPerLine) int64
+        name offsets : count+1 uint64 offsets into the names
+        hash table : table size x uint32, record number + 1 or 0 when empty,
+                     crc32 of the name with linear probing
+        names : the sequence IDs joined by newlines
+    The file is written next to the target and renamed into place so
+    concurrent readers never see a partial index.
+    """
+    import io, os, struct, array, zlib
+    
+    if path_to_index is None:
+        path_to_index=path_to_fai+'.bin'
+    status=os.stat(path_to_fai)
+    with io.open(path_to_fai,'rb') as fai_file_handle:
+        Rows=[line.split(b'\t') for line in fai_file_handle.read().splitlines() if line.strip()]
+    Names=[row[0].split(b' ')[0] for row in Rows]
+    Records=array.array('q')
+    for row in Rows:
+        Records.extend((int(row[1]),int(row[2]),int(row[3]),int(row[4])))
+    NameOffsets=array.array('Q',[0])
+    Position=0
+    for name in Names:
+        Position+=len(name)+1
+        NameOffsets.append(Position)
+    
+    TableSize=1
+    while TableSize<2*len(Names):
+        TableSize*=2
+    Table=array.array('I',bytes(4*TableSize))
+    Mask=TableSize-1
+    Seen=set()
+    for number,name in enumerate(Names):
+        if name in Seen: # the first entry wins for duplicated names
+            continue
+        Seen.add(name)
+        slot=zlib.crc32(name)&Mask
+        while Table[slot]:
+            slot=(slot+1)&Mask
+        Table[slot]=number+1
+    
+    if struct.pack('=I',1)!=struct.pack('<I',1): # big endian host
+        for values in (Records,NameOffsets,Table):
+            values.byteswap()
+    path_to_temporary=path_to_index+'.%d.tmp' % os.getpid()
+    with io.open(path_to_temporary,'wb') as index_file_handle:
+        index_file_handle.write(struct.pack(BinaryIndexHeader,BinaryIndexMagic,len(Names),TableSize,
+                                            status.st_size,status.st_mtime_ns))
+        index_file_handle.write(Records.tobytes())
+        index_file_handle.write(NameOffsets.tobytes())
+        index_file_handle.write(Table.tobytes())
+        index_file_handle.write(b'\n'.join(Names)+b'\n')
+    os.replace(path_to_temporary,path_to_index)
+    return path_to_index
+
+
+class BinaryIndex:
+    
+    import io, os, mmap, struct, zlib
+    
+    def __init__(self,path_to_index):
+        """
+        BinaryIndex()
+        
+        inputs:
+            path_to_index : binary index written by make_binary_index
+        
+        Opening maps the file and reads the header only, records are looked
+        up through the hash table without parsing the rest of the index.
+        """
+        self.index_file_handle=self.io.open(path_to_index,'rb')
+        try:
+            self.index_mmap=self.mmap.mmap(self.index_file_handle.fileno(),0,access=self.mmap.ACCESS_READ)
+            magic,self.count,self.table_size,self.fai_size,self.fai_mtime=self.struct.unpack_from(BinaryIndexHeader,self.index_mmap,0)
+            if magic!=BinaryIndexMagic:
+                raise Exception("not a binary fasta index")
+        except:
+            self.close()
+            raise
+        self.records_offset=self.struct.calcsize(BinaryIndexHeader)
+        self.name_offsets_offset=self.records_offset+32*self.count
+        self.table_offset=self.name_offsets_offset+8*(self.count+1)
+        self.names_offset=self.table_offset+4*self.table_size
+        self.SequenceIDs=None
+    
+    def close(self):
+        """Close the memory map and file handle."""
+        if getattr(self,'index_mmap',None) is not None:
+            self.index_mmap.close()
+            self.index_mmap=None
+        self.index_file_handle.close()
+    
+    def is_current(self,path_to_fai):
+        """True if the index was built from the .fai as it is now."""
+        status=self.os.stat(path_to_fai)
+        return (status.st_size,status.st_mtime_ns)==(self.fai_size,self.fai_mtime)
+    
+    def get_sequence_IDs(self):
+        """List of the sequence IDs in index order, decoded on first use."""
+        if self.SequenceIDs is None:
+            self.SequenceIDs=self.index_mmap[self.names_offset:].decode('utf-8').split('\n')[:self.count]
+        return self.SequenceIDs
+    
+    def get_record(self,SequenceID):
+        """
+        get_record(SequenceID)
+        
+        inputs:
+            SequenceID : the chromosome name e.g. 1 or X
+        outputs:
+            returns (Length, Start, BasesPerLine, BytesPerLine) or None when
+            the name is not in the index
+        """
+        name=SequenceID.encode('utf-8')
+        Mask=self.table_size-1
+        slot=self.zlib.crc32(name)&Mask
+        while True:
+            entry=self.struct.unpack_from('<I',self.index_mmap,self.table_offset+4*slot)[0]
+            if not entry:
+                return None
+            NameStart,NameStop=self.struct.unpack_from('<QQ',self.index_mmap,self.name_offsets_offset+8*(entry-1))
+            if self.index_mmap[self.names_offset+NameStart:self.names_offset+NameStop-1]==name:
+                return self.struct.unpack_from(RecordFormat,self.index_mmap,self.records_offset+32*(entry-1))
+            slot=(slot+1)&Mask
@@ -24,74 +24,279 @@ SOFTWARE.
 """
 
 
-def make_fai(path_to_file):
+class _FaiScanner:
+    """
+    Incremental .fai builder fed with raw chunks of a fasta file.
+
+    Only complete lines are processed, the partial line at the end of each
+    chunk is carried over. Within a record the body lines between two headers
+    are checked in bulk: the newline count and the newlines at every
+    BytesPerLine stride are enough to prove that all lines but the last have
+    the same width, so no per line python work is done.
+
+    Each record is kept as a part:
+        [sequenceID, sequenceStart, BytesPerLine, BasesPerLine,
+         FullLines, TailBytes, TailBases]
+    where the tail is the last, shorter line of the record.
+    """
+
+    def __init__(self, offset=0, starts_in_record=False):
+        self.offset = offset # file position of the first byte in self.pending
+        self.pending = b''
+        self.parts = []
+        self.current = None
+        if starts_in_record: # range starts inside a record whose header is in an earlier range
+            self.current = [None, None, 0, 0, 0, 0, 0]
+            self.parts.append(self.current)
+
+    def feed(self, chunk):
+        data = self.pending + chunk if self.pending else chunk
+        end = data.rfind(b'\n') + 1
+        if end:
+            self.__scan__(data, end)
+            self.offset += end
+        self.pending = data[end:]
+
+    def finish(self):
+        line = self.pending
+        self.pending = b''
+        if line[:1] == b'>': # header without a newline at the end of the file
+            self.__scan__(line + b'\n', len(line) + 1)
+            self.current[1] = self.offset + len(line)
+        elif line:
+            if self.current is None or self.current[5]:
+                raise Exception("sequence line outside of a record")
+            bases = len(line) - (1 if line[-1:] == b'\r' else 0)
+            if not self.current[2]:
+                self.current[2], self.current[3] = len(line), bases
+            self.current[5], self.current[6] = len(line), bases
+        return self.parts
+
+    def __scan__(self, data, end):
+        i = 0
+        while i < end:
+            if data[i] == 62: # '>'
+                nl = data.find(b'\n', i, end)
+                sequenceID = data[i + 1:nl].split(b' ')[0].replace(b'\r', b'').decode('ascii')
+                self.current = [sequenceID, self.offset + nl + 1, 0, 0, 0, 0, 0]
+                self.parts.append(self.current)
+                i = nl + 1
+            else:
+                if self.current is None:
+                    raise Exception("sequence line outside of a record")
+                j = data.find(b'>', i, end)
+                if j == -1:
+                    j = end
+                elif data[j - 1] != 10: # '>' has to start a line
+                    raise Exception("'>' inside a sequence line")
+                self.__scan_body__(data, i, j)
+                i = j
+
+    def __scan_body__(self, data, start, stop):
+        part = self.current
+        if part[5]:
+            raise Exception("line after a short line")
+        BytesPerLine = part[2]
+        if not BytesPerLine: # first line of the record sets the geometry
+            nl = data.find(b'\n', start, stop)
+            BytesPerLine = nl - start + 1
+            part[2] = BytesPerLine
+            part[3] = BytesPerLine - (2 if BytesPerLine > 1 and data[nl - 1] == 13 else 1)
+        ByteTail = BytesPerLine - part[3]
+
+        lines = data.count(b'\n', start, stop)
+        full_stop = start + (lines - 1) * BytesPerLine
+        if lines > 1:
+            if data[start + BytesPerLine - 1:full_stop:BytesPerLine].count(b'\n') != lines - 1:
+                raise Exception("inconsistent line length")
+            if data.count(b'\r', start, full_stop) != (lines - 1) * (ByteTail - 1):
+                raise Exception("inconsistent line terminator")
+
+        last = stop - full_stop
+        if last < 1: # newlines at every stride but one too many, a line is short
+            raise Exception("inconsistent line length")
+        if last == BytesPerLine and (ByteTail == 1 or data[stop - 2] == 13):
+            part[4] += lines
+        else:
+            part[4] += lines - 1
+            part[5] = last
+            part[6] = last - (2 if last > 1 and data[stop - 2] == 13 else 1)
+
+
+def _scan_range(path_to_file, start, stop, chunk_size):
+    """
+    Scan the bytes [start, stop) of a fasta file, both ends on line starts.
+    A range starting after the beginning of the file may begin inside a
+    record, its first part then has no sequenceID and is stitched onto the
+    last part of the previous range by _merge_parts.
+    """
+    import io
+    
+    scanner = _FaiScanner(start, starts_in_record=start > 0)
+    with io.open(path_to_file, 'rb') as fasta_file_handle:
+        fasta_file_handle.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = fasta_file_handle.read(min(chunk_size, remaining))
+            if not chunk: # EOF
+                break
+            remaining -= len(chunk)
+            scanner.feed(chunk)
+    return scanner.finish()
+
+
+def _scan_bgzf(path_to_file, chunk_size):
+    """
+    Scan a bgzip compressed fasta file, the offsets in the parts are positions
+    in the uncompressed data as in samtools faidx.
+    """
+    import gzip
+    
+    scanner = _FaiScanner()
+    with gzip.open(path_to_file, 'rb') as fasta_file_handle:
+        while True:
+            chunk = fasta_file_handle.read(chunk_size)
+            if not chunk: # EOF
+                break
+            scanner.feed(chunk)
+    return scanner.finish()
+
+
+def _merge_parts(part, following):
+    """
+    Append the continuation part of a record found at the start of the next
+    range to the part that holds the record header.
+    """
+    if not following[2]: # range started on a header, nothing to add
+        return
+    if part[5]:
+        raise Exception("line after a short line")
+    if not part[2]: # header was the last line of the previous range
+        part[2:] = following[2:]
+    elif following[2:4] == part[2:4]:
+        part[4] += following[4]
+        part[5:] = following[5:]
+    elif following[4] == 0:
+        part[5:] = following[5:]
+    elif following[4] == 1 and not following[5]: # a single line that is the short last line of the record
+        part[5], part[6] = following[2], following[3]
+    else:
+        raise Exception("inconsistent line length")
+
+
+def _split_points(path_to_file, workers):
+    """
+    Byte offsets that cut the file into about equal ranges, each moved
+    forward to the start of the next line.
+    """
+    import io, os
+    
+    size = os.path.getsize(path_to_file)
+    points = [0]
+    with io.open(path_to_file, 'rb') as fasta_file_handle:
+        for worker in range(1, workers):
+            position = max(size * worker // workers, points[-1])
+            fasta_file_handle.seek(position)
+            while True:
+                block = fasta_file_handle.read(1 << 16)
+                nl = block.find(b'\n')
+                if nl != -1 or not block:
+                    position += nl + 1 if nl != -1 else len(block)
+                    break
+                position += len(block)
+            if position < size and position > points[-1]:
+                points.append(position)
+    points.append(size)
+    return points
+
+
+def _scan_fasta(path_to_file, chunk_size, workers):
+    """
+    Scan an uncompressed fasta file, in a process pool when workers > 1.
+    """
+    import io
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with io.open(path_to_file, 'rb') as fasta_file_handle:
+        if fasta_file_handle.read(1) != b">":
+            raise Exception("file does not start with a header")
+    points = _split_points(path_to_file, max(1, workers))
+    if len(points) <= 2:
+        return _scan_range(path_to_file, 0, points[-1], chunk_size)
+    with ProcessPoolExecutor(max_workers=len(points) - 1) as pool:
+        ranges = list(pool.map(_scan_range, [path_to_file] * (len(points) - 1), points[:-1], points[1:],
+                               [chunk_size] * (len(points) - 1)))
+    parts = ranges[0]
+    for range_parts in ranges[1:]:
+        _merge_parts(parts[-1], range_parts[0])
+        parts.extend(range_parts[1:])
+    return parts
+
+
+def _fai_rows(parts):
+    """
+    Turn scanner parts into the five .fai columns
+    [sequenceID, SequenceLength, sequenceStart, BasesPerLine, BytesPerLine]
+    """
+    return [[sequenceID, FullLines * BasesPerLine + TailBases, sequenceStart, BasesPerLine, BytesPerLine]
+            for sequenceID, sequenceStart, BytesPerLine, BasesPerLine, FullLines, TailBytes, TailBases in parts]
+
+
+def make_fai(path_to_file, chunk_size=1 << 24, verbose=False, workers=1, metrics=None):
     """
     make_fai(path_to_file)
     
     inputs:
         path_to_file : path to indexed fasta reference file.
+        chunk_size : number of bytes read from the fasta file at a time, memory
+                     use is bounded by this rather than by the sequence sizes
+        verbose : print the indexing throughput in MB/s
+        workers : number of processes, with more than one the file is cut
+                  into byte ranges at line starts which are scanned in a
+                  process pool and stitched back together, sequences
+                  crossing a range boundary included. The index is identical
+                  to the one built by a single process.
+        metrics : a Metrics object (see metrics.py), the run is recorded as
+                  a 'make_fai' operation with the bytes scanned and written
 
+    A bgzip (BGZF) compressed file is indexed on its uncompressed data and a
+    .gzi block index is written next to the .fai, compressed files are always
+    scanned by a single process. Plain gzip files can not be read at random
+    and are rejected.
     """
-    import io, os, copy
+    import io, os, time
+    from bgzf import is_gzip, is_bgzf, make_gzi
     
     if not os.path.exists(path_to_file):
         raise Exception("Fasta file does not exist")
+    compressed=is_gzip(path_to_file)
+    if compressed and not is_bgzf(path_to_file):
+        raise Exception("gzip compressed Fasta file has to be compressed with bgzip")
 
     try: #try to open the file
         path_to_fasta_file=path_to_file
         path_to_fai_file=path_to_file+'.fai'
-        Data_out=[]
-        with io.open(path_to_fasta_file,'rb') as fasta_file_handle:
-            
-            line = fasta_file_handle.readline().decode('ascii')
-            if line[:1] != ">":
-                raise Exception()
-                
-            sequenceID=line[1:].split(' ')[0].replace('\n','').replace('\r','')
-            sequenceStart=fasta_file_handle.tell()
-            line = fasta_file_handle.readline().decode('ascii')
-            BytesPerLine=len(line)
-            line=line.strip()
-            BasesPerLine=len(line)
-            SequenceLength=len(line)
-            NextLine = fasta_file_handle.readline().decode('ascii')
-            
-            while True:  
-                line=copy.deepcopy(NextLine)
-                lineStart=fasta_file_handle.tell()
-                NextLine=fasta_file_handle.readline().decode('ascii')
-                
-                if not NextLine: # Check if the line is empty (EOF)
-                    SequenceLength+=len(line.strip())
-                    Data_out.append([sequenceID,SequenceLength,sequenceStart,BasesPerLine,BytesPerLine])
-                    break
-                
-                if line[:1] == ">":
-                    Data_out.append([sequenceID,SequenceLength,sequenceStart,BasesPerLine,BytesPerLine])
-                    
-                    sequenceID=line[1:].split(' ')[0].replace('\n','').replace('\r','')
-                    sequenceStart=lineStart
-                    BytesPerLine=len(NextLine)
-                    NextLine=NextLine.strip()
-                    BasesPerLine=len(NextLine)
-                    SequenceLength=len(NextLine)
-                    NextLine=fasta_file_handle.readline().decode('ascii')
-                    
-                else:
-                    if len(line) != BytesPerLine and NextLine[:1] != ">": 
-                        print(line)
-                        raise Exception
-                    line=line.strip()
-                    if BasesPerLine != len(line) and NextLine[:1] != ">":
-                        print(line)
-                        raise Exception
-                    SequenceLength+=len(line)
-                            
+        start_time=time.perf_counter()
+        if compressed:
+            make_gzi(path_to_fasta_file)
+            parts=_scan_bgzf(path_to_fasta_file,chunk_size)
+        else:
+            parts=_scan_fasta(path_to_fasta_file,chunk_size,workers)
+        Data_out=_fai_rows(parts)
                 
         with io.open(path_to_fai_file,'w') as fai_file_handle:
             fai_file_handle.write('\n'.join(['\t'.join([str(item) for item in value]) for value in Data_out]))
+        
+        if metrics is not None:
+            size=os.path.getsize(path_to_fasta_file)
+            metrics.add_io(reads=-(-size//chunk_size),bytes_read=size,writes=1,bytes_written=os.path.getsize(path_to_fai_file))
+            metrics.record('make_fai',start_time,size)
+        
+        if verbose:
+            elapsed=time.perf_counter()-start_time
+            size=os.path.getsize(path_to_fasta_file)/1e6
+            print("indexed %.1f MB in %.2f s (%.1f MB/s)" % (size,elapsed,size/max(elapsed,1e-9)))
 
     except: #if file can not be opened create a file
         raise Exception("could not process Fasta File")
         #raise Exception("File or index could not be opened or does not exist")
-    
\ No newline at end of file
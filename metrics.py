@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+
+HistogramBuckets=40 # bucket b counts latencies below 2**b microseconds, the last one everything above
+
+
+class Metrics:
+    
+    import threading, time
+    
+    IOCounters=('reads','bytes_read','writes','bytes_written','seeks','flushes','fsyncs')
+    
+    def __init__(self,callback=None):
+        """
+        Metrics()
+        
+        inputs:
+            callback : called as callback(Operation, Seconds, Bytes) after
+                       every recorded operation, e.g. to export to a
+                       monitoring system. Runs in the thread of the operation.
+        
+        Collects per operation call counts, bytes, total and maximum latency
+        and a log2 latency histogram, plus file I/O counters. One object can
+        be shared by several FASTA_IO objects and make_fai calls and between
+        threads. Objects created without metrics only test for None on their
+        I/O paths.
+        """
+        self.callback=callback
+        self.clock=self.time.perf_counter
+        self.lock=self.threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Set every counter back to zero."""
+        with self.lock:
+            self.operations={}
+            self.io=dict.fromkeys(self.IOCounters,0)
+    
+    def record(self,Operation,StartTime,Bytes=0):
+        """
+        record(Operation,StartTime,Bytes)
+        
+        inputs:
+            Operation : name of the operation, e.g. 'read_in_section'
+            StartTime : value of self.clock() when the operation started
+            Bytes : number of bases or bytes the operation returned or wrote
+        """
+        Seconds=self.clock()-StartTime
+        Bucket=min(int(Seconds*1e6).bit_length(),HistogramBuckets-1)
+        with self.lock:
+            Entry=self.operations.get(Operation)
+            if Entry is None:
+                Entry=self.operations[Operation]=[0,0,0.0,0.0,[0]*HistogramBuckets]
+            Entry[0]+=1
+            Entry[1]+=Bytes
+            Entry[2]+=Seconds
+            if Seconds>Entry[3]:
+                Entry[3]=Seconds
+            Entry[4][Bucket]+=1
+        if self.callback is not None:
+            self.callback(Operation,Seconds,Bytes)
+    
+    def add_io(self,reads=0,bytes_read=0,writes=0,bytes_written=0,seeks=0,flushes=0,fsyncs=0):
+        """Add to the file I/O counters."""
+        with self.lock:
+            io=self.io
+            io['reads']+=reads
+            io['bytes_read']+=bytes_read
+            io['writes']+=writes
+            io['bytes_written']+=bytes_written
+            io['seeks']+=seeks
+            io['flushes']+=flushes
+            io['fsyncs']+=fsyncs
+    
+    def snapshot(self):
+        """
+        snapshot()
+        
+        outputs:
+            returns a dict with 'operations', per operation the calls, bytes,
+            total_seconds, max_seconds and histogram ({upper bound in
+            microseconds: calls}, empty buckets left out, the last bound is
+            None), and 'io' with the file I/O counters
+        """
+        with self.lock:
+            Operations={}
+            for Operation,(Calls,Bytes,Total,Maximum,Histogram) in self.operations.items():
+                Operations[Operation]={'calls':Calls,'bytes':Bytes,'total_seconds':Total,'max_seconds':Maximum,
+                                       'histogram':{(1<<Bucket if Bucket<HistogramBuckets-1 else None):Count
+                                                    for Bucket,Count in enumerate(Histogram) if Count}}
+            return {'operations':Operations,'io':dict(self.io)}
+    
+    def percentile(self,Operation,Fraction):
+        """
+        percentile(Operation,Fraction)
+        
+        inputs:
+            Operation : name of the operation
+            Fraction : e.g. 0.99
+        outputs:
+            returns an upper bound in seconds of the latency of that fraction
+            of the calls, from the histogram, or None without calls
+        """
+        with self.lock:
+            Entry=self.operations.get(Operation)
+            if Entry is None:
+                return None
+            Target=Fraction*Entry[0]
+            Seen=0
+            for Bucket,Count in enumerate(Entry[4]):
+                Seen+=Count
+                if Count and Seen>=Target:
+                    return min((1<<Bucket)/1e6,Entry[3]) if Bucket<HistogramBuckets-1 else Entry[3]
+            return Entry[3]
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+
+from FASTA_IO import FASTA_IO
+
+_worker_reader=None # FASTA_IO of a pool worker process, set by _init_worker
+
+
+def make_tiles(fasta,tile_size=1<<24,overlap=0,SequenceIDs=None):
+    """
+    make_tiles(fasta)
+    
+    inputs:
+        fasta : FASTA_IO object
+        tile_size : bytes of the fasta file per task
+        overlap : bases read past the end of every tile, for functions over
+                  windows that start in the tile
+        SequenceIDs : sequences to cover, all of them by default
+    outputs:
+        returns a list of tasks, each a list of tiles
+        (SequenceID, StartBase, StopBase, ReadStop)
+    
+    Long sequences are cut into tiles of whole lines, tile_size bytes of the
+    file each using the line geometry of the .fai, so every read starts at a
+    line start. Short sequences are grouped into tasks of about tile_size
+    bytes so many small contigs do not cost a task each. The tiles of all
+    tasks cover [0, Length) of every sequence once, ReadStop is StopBase
+    plus the overlap, cut at the end of the sequence. Empty sequences get
+    no tiles.
+    """
+    if SequenceIDs is None:
+        SequenceIDs=fasta.get_sequence_IDs()
+    Tasks=[]
+    Task,TaskBytes=[],0
+    for SequenceID in SequenceIDs:
+        Length,SequenceStart,BasesPerLine,BytesPerLine=fasta.__get_record__(SequenceID)
+        if Length==0 or BytesPerLine==0: # empty record, indexed as 'name 0 offset 0 0'
+            continue
+        TileBases=max(1,tile_size//BytesPerLine)*BasesPerLine
+        for StartBase in range(0,Length,TileBases):
+            StopBase=min(Length,StartBase+TileBases)
+            Task.append((SequenceID,StartBase,StopBase,min(Length,StopBase+overlap)))
+            TaskBytes+=(StopBase-StartBase)*BytesPerLine//BasesPerLine+1
+            if TaskBytes>=tile_size:
+                Tasks.append(Task)
+                Task,TaskBytes=[],0
+    if Task:
+        Tasks.append(Task)
+    return Tasks
+
+
+def _run_tiles(fasta,map_function,Tiles,output_format,args):
+    return [map_function(SequenceID,StartBase,StopBase,fasta.read_in_section(SequenceID,StartBase,ReadStop,output_format),*args)
+            for SequenceID,StartBase,StopBase,ReadStop in Tiles]
+
+
+def _init_worker(fasta):
+    global _worker_reader
+    _worker_reader=fasta # unpickled copy, reopens its own file handle on first read
+
+
+def _run_task(map_function,Tiles,output_format,args):
+    return _run_tiles(_worker_reader,map_function,Tiles,output_format,args)
+
+
+def scan(fasta,map_function,reduce_function=None,initial=None,workers=1,tile_size=1<<24,overlap=0,
+         SequenceIDs=None,output_format='bytes',args=()):
+    """
+    scan(fasta,map_function,reduce_function,initial)
+    
+    inputs:
+        fasta : FASTA_IO object or path to an indexed fasta file
+        map_function : called as map_function(SequenceID, StartBase,
+                       StopBase, sequence, *args) for every tile, sequence
+                       holds the bases from StartBase up to StopBase plus
+                       the overlap. Has to be a module level function when
+                       workers > 1 so it can be sent to the processes.
+        reduce_function : called as reduce_function(accumulator, result)
+                          with the map results in genome order, returns the
+                          new accumulator
+        initial : first accumulator, without it the first map result is
+                  the first accumulator as with functools.reduce
+        workers : number of processes, 1 runs in this process
+        tile_size, overlap, SequenceIDs : see make_tiles
+        output_format : format of sequence, 'bytes' (default) or any
+                        format of FASTA_IO.read_in_section
+        args : extra arguments of map_function
+    outputs:
+        returns the final accumulator, or the list of map results in genome
+        order without a reduce_function
+    
+    With workers > 1 the tasks run in a process pool. Each worker gets a
+    pickled copy of the reader with its loaded index and opens its own file
+    handle. Results are reduced in this process as they arrive, in order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    if isinstance(fasta,str):
+        reader=FASTA_IO(fasta)
+        try:
+            return scan(reader,map_function,reduce_function,initial,workers,tile_size,overlap,SequenceIDs,output_format,args)
+        finally:
+            reader.close()
+    if reduce_function is None:
+        reduce_function,initial=_append,[]
+    Tasks=make_tiles(fasta,tile_size,overlap,SequenceIDs)
+    
+    if workers<=1 or len(Tasks)<=1:
+        return _reduce((_run_tiles(fasta,map_function,Tiles,output_format,args) for Tiles in Tasks),reduce_function,initial)
+    with ProcessPoolExecutor(max_workers=min(workers,len(Tasks)),initializer=_init_worker,initargs=(fasta,)) as pool:
+        return _reduce(pool.map(_run_task,[map_function]*len(Tasks),Tasks,[output_format]*len(Tasks),[args]*len(Tasks)),
+                       reduce_function,initial)
+
+
+def _reduce(Results,reduce_function,initial):
+    accumulator=initial
+    for TaskResults in Results:
+        for result in TaskResults:
+            if accumulator is None:
+                accumulator=result
+            else:
+                accumulator=reduce_function(accumulator,result)
+    return accumulator
+
+
+def _append(accumulator,result):
+    accumulator.append(result)
+    return accumulator
+
+
+###############################################################################
+# Built-in scans
+###############################################################################
+
+CompositionKeys=('A','C','G','T','N','other','lowercase')
+LowercaseLetters=bytes(range(ord('a'),ord('z')+1))
+GapTable=bytes(78 if byte in b'Nn' else 46 for byte in range(256)) # N stays N, every other byte becomes '.'
+
+
+def composition_map(SequenceID,StartBase,StopBase,sequence):
+    """Base counts of one tile: A, C, G, T and N in either case, other codes and lowercase bases."""
+    try:
+        import numpy
+    except ImportError:
+        numpy=None
+    if numpy is not None: # one pass for every byte value
+        Histogram=numpy.bincount(numpy.frombuffer(sequence,dtype=numpy.uint8),minlength=256).tolist()
+        Counts={Base:Histogram[ord(Base)]+Histogram[ord(Base.lower())] for Base in 'ACGTN'}
+        Counts['other']=len(sequence)-sum(Counts.values())
+        Counts['lowercase']=sum(Histogram[ord('a'):ord('z')+1])
+        return SequenceID,Counts
+    sequence=bytes(sequence)
+    Counts={}
+    for Base in 'ACGTN': # deleting is faster than bytes.count
+        Counts[Base]=len(sequence)-len(sequence.translate(None,(Base+Base.lower()).encode()))
+    Counts['other']=len(sequence)-sum(Counts.values())
+    Counts['lowercase']=len(sequence)-len(sequence.translate(None,LowercaseLetters))
+    return SequenceID,Counts
+
+
+def composition_reduce(accumulator,result):
+    """Add the counts of a tile to those of its sequence."""
+    SequenceID,Counts=result
+    Total=accumulator.setdefault(SequenceID,dict.fromkeys(CompositionKeys,0))
+    for Key,Count in Counts.items():
+        Total[Key]+=Count
+    return accumulator
+
+
+def base_composition(fasta,workers=1,tile_size=1<<24):
+    """
+    base_composition(fasta)
+    
+    inputs:
+        fasta : FASTA_IO object or path to an indexed fasta file
+        workers, tile_size : see scan
+    outputs:
+        returns {SequenceID: {'A', 'C', 'G', 'T', 'N', 'other', 'lowercase':
+        count}} in sequence order, counts are case insensitive apart from
+        'lowercase' which counts the soft masked bases
+    """
+    return scan(fasta,composition_map,composition_reduce,{},workers=workers,tile_size=tile_size)
+
+
+def n_gaps_map(SequenceID,StartBase,StopBase,sequence):
+    """Runs of N or n inside one tile as (SequenceID, start, stop)."""
+    sequence=bytes(sequence[:StopBase-StartBase]).translate(GapTable)
+    Gaps=[]
+    Stop=sequence.find(b'N')
+    while Stop!=-1:
+        Start=Stop
+        Stop=sequence.find(b'.',Start)
+        if Stop==-1:
+            Gaps.append((SequenceID,StartBase+Start,StopBase))
+            break
+        Gaps.append((SequenceID,StartBase+Start,StartBase+Stop))
+        Stop=sequence.find(b'N',Stop)
+    return Gaps
+
+
+def n_gaps_reduce(accumulator,result):
+    """Collect the runs, joining runs that meet at a tile boundary."""
+    for Gap in result:
+        if accumulator and accumulator[-1][0]==Gap[0] and accumulator[-1][2]==Gap[1]:
+            accumulator[-1]=(Gap[0],accumulator[-1][1],Gap[2])
+        else:
+            accumulator.append(Gap)
+    return accumulator
+
+
+def n_gaps(fasta,path_to_bed=None,min_length=1,workers=1,tile_size=1<<24):
+    """
+    n_gaps(fasta)
+    
+    inputs:
+        fasta : FASTA_IO object or path to an indexed fasta file
+        path_to_bed : when given the gaps are also written to this bed file
+        min_length : shortest run of N reported
+        workers, tile_size : see scan
+    outputs:
+        returns a list of (SequenceID, StartBase, StopBase) runs of N or n,
+        in genome order
+    """
+    import io
+    
+    Gaps=[Gap for Gap in scan(fasta,n_gaps_map,n_gaps_reduce,[],workers=workers,tile_size=tile_size)
+          if Gap[2]-Gap[1]>=min_length]
+    if path_to_bed is not None:
+        with io.open(path_to_bed,'w') as bed_file_handle:
+            bed_file_handle.write(''.join('%s\t%d\t%d\n' % Gap for Gap in Gaps))
+    return Gaps
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Oleg S. Ovchinnikov
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+
+from FASTA_IO import FASTA_IO, BaseCodeTable, reverse_complement, _import_numpy
+from scan import make_tiles, scan
+
+IUPAC={'A':'A','C':'C','G':'G','T':'T','U':'T',
+       'R':'AG','Y':'CT','S':'CG','W':'AT','K':'GT','M':'AC',
+       'B':'CGT','D':'AGT','H':'ACT','V':'ACG','N':'ACGT'}
+UpperTable=bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz',b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+KmerIndexMagic=b'FAKMER1\x00'
+KmerIndexHeader='<8sIIQQqQQ' # magic, k, position bytes, entries, fasta size, fasta mtime in ns, bases, sequences
+
+
+def _normalize(Pattern):
+    
+    ###### upper case pattern of IUPAC codes
+    Pattern=Pattern.decode('ascii') if isinstance(Pattern,(bytes,bytearray)) else Pattern
+    Pattern=Pattern.upper().replace('U','T')
+    if not Pattern or any(Base not in IUPAC for Base in Pattern):
+        raise Exception("pattern has to be made of IUPAC bases")
+    return Pattern
+
+
+def _strand_patterns(Pattern,strand):
+    
+    ###### (pattern, strand) pairs, the '-' strand is found as the reverse complement on the '+' strand
+    if strand not in ('both','+','-'):
+        raise Exception("strand has to be 'both', '+' or '-'")
+    Patterns=[]
+    if strand in ('both','+'):
+        Patterns.append((Pattern,'+'))
+    if strand in ('both','-'):
+        Patterns.append((reverse_complement(Pattern),'-'))
+    return Patterns
+
+
+def _matcher(Pattern):
+    
+    #######################################################################
+    # Function returning the start positions of a pattern in upper case
+    # bytes, overlapping hits included. Plain ACGT patterns use bytes.find,
+    # degenerate ones a regular expression of character classes.
+    #######################################################################
+    import re
+    
+    if all(Base in 'ACGT' for Base in Pattern):
+        Needle=Pattern.encode('ascii')
+        
+        def find(sequence,Stop):
+            Starts=[]
+            Start=sequence.find(Needle,0,Stop+len(Needle)-1)
+            while Start!=-1:
+                Starts.append(Start)
+                Start=sequence.find(Needle,Start+1,Stop+len(Needle)-1)
+            return Starts
+        return find
+    
+    Expression=re.compile(''.join('['+IUPAC[Base]+']' if len(IUPAC[Base])>1 else Base for Base in Pattern).encode('ascii'))
+    
+    def find(sequence,Stop):
+        Starts=[]
+        Match=Expression.search(sequence,0)
+        while Match is not None and Match.start()<Stop:
+            Starts.append(Match.start())
+            Match=Expression.search(sequence,Match.start()+1)
+        return Starts
+    return find
+
+
+def _pattern_map(SequenceID,StartBase,StopBase,sequence,Patterns):
+    
+    ###### hits starting inside the tile, the overlap of len(pattern)-1 bases completes those at its end
+    sequence=bytes(sequence).translate(UpperTable)
+    Hits=[]
+    for Pattern,Strand in Patterns:
+        for Start in _matcher(Pattern)(sequence,StopBase-StartBase):
+            Hits.append((SequenceID,StartBase+Start,StartBase+Start+len(Pattern),Strand))
+    Hits.sort(key=lambda Hit: (Hit[1],Hit[3]))
+    return Hits
+
+
+def _extend(accumulator,result):
+    accumulator.extend(result)
+    return accumulator
+
+
+def find_pattern(fasta,Pattern,strand='both',workers=1,tile_size=1<<24,index=None,path_to_bed=None):
+    """
+    find_pattern(fasta,Pattern)
+    
+    inputs:
+        fasta : FASTA_IO object or path to an indexed fasta file
+        Pattern : bases to look for, IUPAC codes (R, Y, N, ...) match any of
+                  their bases, either case
+        strand : 'both' (default), '+' or '-'. Hits on '-' are places where
+                 the reverse complement of the pattern is on the '+' strand,
+                 palindromes are reported on both strands.
+        workers, tile_size : see scan.scan
+        index : a KmerIndex built from this file, patterns of at least k
+                bases are then looked up instead of streamed
+        path_to_bed : when given the hits are also written to this bed file
+                      with the pattern as name and the strand column
+    outputs:
+        returns a list of (SequenceID, StartBase, StopBase, Strand) hits in
+        genome order, bed coordinates, overlapping hits included
+    
+    Reference bases match case-insensitively, ambiguity codes in the
+    reference (N, R, ...) match nothing. The streaming search reads the
+    sequences in tiles overlapping by len(Pattern)-1 bases, so hits across
+    tile edges are found once.
+    """
+    import io
+    
+    if isinstance(fasta,str):
+        reader=FASTA_IO(fasta)
+        try:
+            return find_pattern(reader,Pattern,strand,workers,tile_size,index,path_to_bed)
+        finally:
+            reader.close()
+    Pattern=_normalize(Pattern)
+    Patterns=_strand_patterns(Pattern,strand)
+    
+    Hits=None
+    if index is not None:
+        Hits=index.find(fasta,Patterns)
+    if Hits is None: # no index or the pattern is too short or too degenerate for it
+        Hits=scan(fasta,_pattern_map,_extend,[],workers=workers,tile_size=tile_size,overlap=len(Pattern)-1,args=(Patterns,))
+    
+    if path_to_bed is not None:
+        with io.open(path_to_bed,'w') as bed_file_handle:
+            bed_file_handle.write(''.join('%s\t%d\t%d\t%s\t0\t%s\n' % (SequenceID,StartBase,StopBase,Pattern,Strand)
+                                          for SequenceID,StartBase,StopBase,Strand in Hits))
+    return Hits
+
+
+###############################################################################
+# k-mer sidecar index
+###############################################################################
+
+def make_kmer_index(fasta,k=12,path_to_index=None,tile_size=1<<24):
+    """
+    make_kmer_index(fasta)
+    
+    inputs:
+        fasta : FASTA_IO object or path to an indexed fasta file
+        k : k-mer length, at most 16; patterns shorter than k are streamed
+        path_to_index : index to write, path_to_file+'.kmi' by default
+        tile_size : bytes of the fasta file processed at a time
+    outputs:
+        returns the path of the index
+    
+    Every position whose k bases are all A, C, G or T (either case) is
+    stored as a 2 bit packed k-mer code with its position in the
+    concatenated sequences, sorted by code. Layout (little endian):
+        header : magic, k, bytes per position, entries, fasta size and
+                 mtime, total bases, number of sequences
+        codes : entries x uint32, sorted
+        positions : entries x uint32 (uint64 for genomes over 4 Gb)
+    Needs numpy and about 8 bytes per base on disk, three times that in
+    memory while building. The file is written next to the target and
+    renamed into place.
+    """
+    import os, struct
+    numpy=_import_numpy()
+    
+    if isinstance(fasta,str):
+        reader=FASTA_IO(fasta)
+        try:
+            return make_kmer_index(reader,k,path_to_index,tile_size)
+        finally:
+            reader.close()
+    if not 1<=k<=16:
+        raise Exception("k has to be between 1 and 16")
+    if path_to_index is None:
+        path_to_index=fasta.path_to_fasta_file+'.kmi'
+    
+    SequenceIDs=fasta.get_sequence_IDs()
+    Offsets={}
+    Total=0
+    for SequenceID in SequenceIDs:
+        Offsets[SequenceID]=Total
+        Total+=fasta.__get_record__(SequenceID)[0]
+    PositionType=numpy.uint32 if Total<1<<32 else numpy.uint64
+    
+    Codes,Positions=[],[]
+    for Tiles in make_tiles(fasta,tile_size,k-1):
+        for SequenceID,StartBase,StopBase,ReadStop in Tiles:
+            Values=numpy.frombuffer(fasta.read_in_section(SequenceID,StartBase,ReadStop,'bytes').translate(BaseCodeTable),dtype=numpy.uint8)
+            Windows=min(StopBase-StartBase,len(Values)-k+1)
+            if Windows<=0:
+                continue
+            Invalid=numpy.concatenate(([0],numpy.cumsum(Values==4,dtype=numpy.int64)))
+            Valid=numpy.nonzero(Invalid[k:k+Windows]==Invalid[:Windows])[0]
+            Code=numpy.zeros(Windows,dtype=numpy.uint32)
+            for Shift in range(k):
+                Code<<=2
+                Code|=Values[Shift:Shift+Windows]&3
+            Codes.append(Code[Valid])
+            Positions.append((Valid+Offsets[SequenceID]+StartBase).astype(PositionType))
+    Codes=numpy.concatenate(Codes) if Codes else numpy.zeros(0,dtype=numpy.uint32)
+    Positions=numpy.concatenate(Positions) if Positions else numpy.zeros(0,dtype=PositionType)
+    Order=numpy.argsort(Codes,kind='stable')
+    
+    status=os.stat(fasta.path_to_fasta_file)
+    path_to_temp=path_to_index+'.tmp%d' % os.getpid()
+    with open(path_to_temp,'wb') as index_file_handle:
+        index_file_handle.write(struct.pack(KmerIndexHeader,KmerIndexMagic,k,numpy.dtype(PositionType).itemsize,len(Codes),
+                                            status.st_size,status.st_mtime_ns,Total,len(SequenceIDs)))
+        Codes[Order].tofile(index_file_handle)
+        Positions[Order].tofile(index_file_handle)
+    os.replace(path_to_temp,path_to_index)
+    return path_to_index
+
+
+class KmerIndex:
+    
+    import os, itertools, struct
+    
+    MaxExpansions=1024 # concrete k-mers looked up for one degenerate pattern before streaming instead
+    
+    def __init__(self,path_to_index):
+        """
+        KmerIndex()
+        
+        inputs:
+            path_to_index : k-mer index written by make_kmer_index
+        
+        The codes and positions are memory mapped, a lookup is a binary
+        search so only the pages it touches are read.
+        """
+        numpy=_import_numpy()
+        self.numpy=numpy
+        with open(path_to_index,'rb') as index_file_handle:
+            Header=index_file_handle.read(self.struct.calcsize(KmerIndexHeader))
+        try:
+            (magic,self.k,PositionBytes,self.entries,self.fasta_size,self.fasta_mtime,
+             self.bases,self.sequences)=self.struct.unpack(KmerIndexHeader,Header)
+        except:
+            raise Exception("not a k-mer index")
+        if magic!=KmerIndexMagic:
+            raise Exception("not a k-mer index")
+        Offset=len(Header)
+        self.codes=numpy.memmap(path_to_index,dtype=numpy.uint32,mode='r',offset=Offset,shape=(self.entries,)) if self.entries else numpy.zeros(0,dtype=numpy.uint32)
+        PositionType=numpy.uint32 if PositionBytes==4 else numpy.uint64
+        self.positions=(numpy.memmap(path_to_index,dtype=PositionType,mode='r',offset=Offset+4*self.entries,shape=(self.entries,))
+                        if self.entries else numpy.zeros(0,dtype=PositionType))
+    
+    def close(self):
+        """Release the memory maps."""
+        self.codes=None
+        self.positions=None
+    
+    def is_current(self,path_to_fasta):
+        """True if the index was built from the fasta file as it is now."""
+        status=self.os.stat(path_to_fasta)
+        return (status.st_size,status.st_mtime_ns)==(self.fasta_size,self.fasta_mtime)
+    
+    def __lookup__(self,Pattern):
+        
+        #######################################################################
+        # Candidate starts of a pattern: the window of k bases with the
+        # fewest concrete k-mers is looked up, every k-mer is a range of the
+        # sorted codes. None when the pattern is shorter than k or too
+        # degenerate.
+        #######################################################################
+        k=self.k
+        if len(Pattern)<k:
+            return None
+        Best=None
+        for Shift in range(len(Pattern)-k+1):
+            Count=1
+            for Base in Pattern[Shift:Shift+k]:
+                Count*=len(IUPAC[Base])
+            if Best is None or Count<Best[0]:
+                Best=(Count,Shift)
+        Count,Shift=Best
+        if Count>self.MaxExpansions:
+            return None
+        Values=[[BaseCodeTable[ord(Base)] for Base in IUPAC[Letter]] for Letter in Pattern[Shift:Shift+k]]
+        Codes=[]
+        for Kmer in self.itertools.product(*Values):
+            Code=0
+            for Value in Kmer:
+                Code=(Code<<2)|Value
+            Codes.append(Code)
+        Codes=self.numpy.array(sorted(Codes),dtype=self.numpy.uint32)
+        Lower=self.numpy.searchsorted(self.codes,Codes,side='left')
+        Upper=self.numpy.searchsorted(self.codes,Codes,side='right')
+        Starts=[self.positions[a:b] for a,b in zip(Lower.tolist(),Upper.tolist()) if b>a]
+        if not Starts:
+            return self.numpy.zeros(0,dtype=self.numpy.int64)
+        return self.numpy.concatenate(Starts).astype(self.numpy.int64)-Shift
+    
+    def find(self,fasta,Patterns):
+        """
+        find(fasta,Patterns)
+        
+        inputs:
+            fasta : FASTA_IO object of the indexed file
+            Patterns : list of (upper case IUPAC pattern, strand)
+        outputs:
+            returns the hits as find_pattern, or None when a pattern can not
+            be looked up and has to be streamed
+        
+        Candidates are checked against the file with one read_regions call.
+        """
+        if not self.is_current(fasta.path_to_fasta_file):
+            raise Exception("k-mer index is out of date, rebuild it with make_kmer_index")
+        SequenceIDs=fasta.get_sequence_IDs()
+        if len(SequenceIDs)!=self.sequences:
+            raise Exception("k-mer index does not belong to this file")
+        Candidates=[]
+        for Pattern,Strand in Patterns:
+            Starts=self.__lookup__(Pattern)
+            if Starts is None:
+                return None
+            Candidates.append((Pattern,Strand,Starts))
+        
+        numpy=self.numpy
+        Lengths=numpy.array([fasta.__get_record__(SequenceID)[0] for SequenceID in SequenceIDs],dtype=numpy.int64)
+        Offsets=numpy.concatenate(([0],numpy.cumsum(Lengths)))
+        Hits=[]
+        for Pattern,Strand,Starts in Candidates:
+            Sequence=numpy.searchsorted(Offsets,Starts,side='right')-1
+            Local=Starts-Offsets[numpy.clip(Sequence,0,len(SequenceIDs)-1)]
+            Inside=(Starts>=0)&(Local+len(Pattern)<=Lengths[numpy.clip(Sequence,0,len(SequenceIDs)-1)])
+            Regions=[(SequenceIDs[Number],Start,Start+len(Pattern))
+                     for Number,Start in zip(Sequence[Inside].tolist(),Local[Inside].tolist())]
+            find=_matcher(Pattern)
+            for Region,Section in zip(Regions,fasta.read_regions(Regions,'bytes')):
+                if find(Section.translate(UpperTable),1):
+                    Hits.append(Region+(Strand,))
+        Order={SequenceID:Number for Number,SequenceID in enumerate(SequenceIDs)}
+        Hits.sort(key=lambda Hit: (Order[Hit[0]],Hit[1],Hit[3]))
+        return Hits
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import threading
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from AsyncFASTA_IO import AsyncFASTA_IO
+
+class TestAsyncFastaIO(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up a dummy FASTA file and index for the whole test class."""
+        cls.fasta_filename = "test_async_io.fasta"
+        cls.fai_filename = cls.fasta_filename + ".fai"
+        cls.sequence = "ACGTTGCAAC" * 20 # 200 bases over lines of 9
+
+        with open(cls.fasta_filename, "w") as f:
+            f.write(">seq1\n")
+            f.write("ACGTACGTACGT\n") # 12 bases
+            f.write(">seq2\n")
+            for i in range(0, len(cls.sequence), 9):
+                f.write(cls.sequence[i:i + 9] + "\n")
+
+        make_fai(cls.fasta_filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files after all tests are done."""
+        if os.path.exists(cls.fasta_filename):
+            os.remove(cls.fasta_filename)
+        if os.path.exists(cls.fai_filename):
+            os.remove(cls.fai_filename)
+
+    def test_read_in_section(self):
+        """Test reads across lines, reverse complement and output formats."""
+        async def run():
+            async with AsyncFASTA_IO(self.fasta_filename) as fasta_io:
+                self.assertEqual(await fasta_io.read_in_section("seq1", 0, 4), "ACGT")
+                self.assertEqual(await fasta_io.read_in_section("seq2", 5, 150), self.sequence[5:150])
+                self.assertEqual(await fasta_io.read_in_section("seq2", 20, 14), "GTTGCA")
+                self.assertEqual(await fasta_io.read_in_section("seq2", 3, 3), "")
+                self.assertEqual(await fasta_io.read_in_section("seq2", 0, 5, output_format="bytes"), b"ACGTT")
+        asyncio.run(run())
+
+    def test_read_regions(self):
+        """Test many concurrent regions come back in order."""
+        regions = [("seq2", start, start + 37) for start in range(0, 160, 7)] + [("seq1", 12, 0)]
+        expected = [self.sequence[start:stop] for _, start, stop in regions[:-1]] + ["ACGTACGTACGT"]
+
+        async def run():
+            async with AsyncFASTA_IO(self.fasta_filename, max_workers=4) as fasta_io:
+                return await fasta_io.read_regions(regions)
+        self.assertEqual(asyncio.run(run()), expected)
+
+    def test_concurrent_requests_share_reads(self):
+        """Test concurrent requests for the same region trigger a single read of just that region."""
+        async def run():
+            async with AsyncFASTA_IO(self.fasta_filename) as fasta_io:
+                await fasta_io.get_sequence_IDs()
+                calls = []
+                read = fasta_io.fasta.read_in_section
+
+                def counting_read(*args):
+                    calls.append(args)
+                    return read(*args)
+                fasta_io.fasta.read_in_section = counting_read
+                results = await asyncio.gather(*[fasta_io.read_in_section("seq2", 15, 25) for _ in range(20)],
+                                               fasta_io.read_in_section("seq2", 20, 30),
+                                               fasta_io.read_in_section("seq2", 25, 15))
+                return calls, results
+        calls, results = asyncio.run(run())
+        self.assertEqual(sorted(calls), [("seq2", 15, 25, "str"), ("seq2", 20, 30, "str"), ("seq2", 25, 15, "str")])
+        self.assertEqual(results[:20], [self.sequence[15:25]] * 20)
+        self.assertEqual(results[20], self.sequence[20:30])
+        self.assertEqual(results[21], self.sequence[15:25][::-1].translate(str.maketrans("ACGT", "TGCA")))
+
+    def test_index_loaded_off_loop(self):
+        """Test the index is read on the thread pool, not on the event loop thread."""
+        async def run():
+            async with AsyncFASTA_IO(self.fasta_filename) as fasta_io:
+                threads = []
+                read_in_fai = fasta_io.fasta.__read_in_fai__
+
+                def recording_read_in_fai():
+                    threads.append(threading.get_ident())
+                    read_in_fai()
+                fasta_io.fasta.__read_in_fai__ = recording_read_in_fai
+                results = await asyncio.gather(fasta_io.read_in_section("seq1", 0, 4), fasta_io.get_sequence_IDs())
+                return threads, threading.get_ident(), results
+        threads, loop_thread, results = asyncio.run(run())
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+        self.assertEqual(results, ["ACGT", ["seq1", "seq2"]])
+
+    def test_errors(self):
+        """Test the errors of FASTA_IO are raised."""
+        async def run(region):
+            async with AsyncFASTA_IO(self.fasta_filename) as fasta_io:
+                await fasta_io.read_in_section(*region)
+        with self.assertRaises(Exception) as context:
+            asyncio.run(run(("seq11", 0, 5)))
+        self.assertTrue("incorrect chromosome id given" in str(context.exception))
+        with self.assertRaises(Exception) as context:
+            asyncio.run(run(("seq1", 0, 15)))
+        self.assertTrue("stop position exceeds chromosome length" in str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
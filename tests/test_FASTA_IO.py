@@ -1,12 +1,25 @@
 import unittest
 import os
 import sys
+import pickle
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from make_fai import make_fai
-from FASTA_IO import FASTA_IO
+from FASTA_IO import FASTA_IO, reverse_complement
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class TestFastaIO(unittest.TestCase):
 
@@ -62,6 +75,12 @@ class TestFastaIO(unittest.TestCase):
         ids = self.fasta_io.get_sequence_IDs()
         self.assertEqual(ids, ['seq1', 'seq2', 'seq3', 'seq4', 'seq5'])
 
+    def test_sequence_index(self):
+        """Test the name lookup agrees with the order of the index."""
+        for position, seq_id in enumerate(self.fasta_io.get_sequence_IDs()):
+            self.assertEqual(self.fasta_io.SequenceIndex[seq_id], position)
+        self.assertEqual(list(self.fasta_io.Length), [12, 24, 12, 12, 24])
+
     def test_read_in_section_simple(self):
         """Test reading a simple section of a sequence."""
         seq = self.fasta_io.read_in_section("seq1", 0, 4)
@@ -112,6 +131,805 @@ class TestFastaIO(unittest.TestCase):
         seq = self.fasta_io.read_in_section("seq5", 0, 24)
         self.assertEqual(seq, "TCAAAAGATCGATCGATCGATCGA")
 
+    def test_read_regions(self):
+        """Test batch reads come back in the given order, including reverse complements."""
+        regions = [("seq2", 10, 14), ("seq1", 0, 4), ("seq2", 0, 24), ("seq1", 4, 0), ("seq2", 12, 13), ("seq2", 20, 30)]
+        with self.assertRaises(Exception) as context:
+            self.fasta_io.read_regions(regions)
+        self.assertTrue("stop position exceeds chromosome length" in str(context.exception))
+        regions[-1] = ("seq2", 14, 10)
+        expected = [self.fasta_io.read_in_section(*region) for region in regions]
+        self.assertEqual(self.fasta_io.read_regions(regions), expected)
+        self.assertEqual(self.fasta_io.read_regions(regions, merge_gap=100), expected)
+        self.assertEqual(self.fasta_io.read_regions([]), [])
+
+    def test_read_regions_max_span(self):
+        """Test tiled and overlapping regions are read in spans of at most MaxSpan bases."""
+        regions = [("seq2", start, start + 3) for start in range(0, 24, 3)]
+        regions += [("seq2", 4, 9), ("seq2", 10, 2), ("seq2", 1, 23), ("seq2", 20, 24)]
+        expected = [self.fasta_io.read_in_section(*region) for region in regions]
+        whole = self.fasta_io.read_in_section("seq2", 0, 24)
+        spans = []
+        read_bases = self.fasta_io.__read_bases__
+
+        def recording_read_bases(record, start, stop, *args, **kwargs):
+            spans.append(stop - start)
+            return read_bases(record, start, stop, *args, **kwargs)
+
+        self.fasta_io.__read_bases__ = recording_read_bases
+        try:
+            for output_format in ("str", "bytes"):
+                spans.clear()
+                result = self.fasta_io.read_regions(regions, output_format, MaxSpan=8)
+                if output_format == "bytes":
+                    result = [region.decode() for region in result]
+                self.assertEqual(result, expected)
+                self.assertEqual(sorted(spans)[-2:], [8, 22]) # only the region longer than MaxSpan exceeds it
+            spans.clear()
+            self.assertEqual(self.fasta_io.read_regions(regions), expected)
+            self.assertEqual(spans, [24])
+            spans.clear()
+            self.assertEqual(self.fasta_io.read_regions([("seq2", 0, 24), ("seq2", 2, 5)], MaxSpan=8), [whole, whole[2:5]])
+            self.assertEqual(spans, [24, 3]) # the oversized first region is read once
+        finally:
+            del self.fasta_io.__read_bases__
+
+    def test_read_regions_from_bed(self):
+        """Test batch reads from a bed file honour the strand column."""
+        bed_filename = "test_io_regions.bed"
+        with open(bed_filename, "w") as f:
+            f.write("track name=test\n")
+            f.write("seq2\t10\t14\n")
+            f.write("seq1\t0\t4\tname\t0\t-\n")
+        try:
+            self.assertEqual(self.fasta_io.read_regions_from_bed(bed_filename), ["GATC", "ACGT"])
+        finally:
+            os.remove(bed_filename)
+
+
+class TestReverseComplement(unittest.TestCase):
+
+    def test_matches_dictionary(self):
+        """Test the translation table agrees with RevCompDict, unknown bases become N."""
+        sequence = "".join(FASTA_IO.RevCompDict) + "XZ*é"
+        expected = "".join([FASTA_IO.RevCompDict.get(value, "N") for value in sequence[::-1]])
+        self.assertEqual(reverse_complement(sequence), expected)
+        self.assertEqual(reverse_complement(sequence[:-1].encode("ascii")), expected[1:].encode())
+
+    def test_bytes_like_input(self):
+        """Test bytes, bytearray and memoryview input return bytes."""
+        for sequence in (b"AACGTn", bytearray(b"AACGTn"), memoryview(b"AACGTn")):
+            self.assertEqual(reverse_complement(sequence), b"nACGTT")
+        self.assertEqual(reverse_complement(""), "")
+
+
+class TestFastaIOCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a fresh file for every test as the tests write to it."""
+        self.fasta_filename = "test_io_cache.fasta"
+        self.fai_filename = self.fasta_filename + ".fai"
+        self.sequence = "ACGTTGCAAC" * 10 # 100 bases over lines of 7
+
+        with open(self.fasta_filename, "w") as f:
+            f.write(">seq1\n")
+            for i in range(0, len(self.sequence), 7):
+                f.write(self.sequence[i:i + 7] + "\n")
+
+        make_fai(self.fasta_filename)
+        self.fasta_io = FASTA_IO(self.fasta_filename, cache_size=64, cache_block_size=16)
+
+    def tearDown(self):
+        """Clean up the created files."""
+        self.fasta_io.close()
+        if os.path.exists(self.fasta_filename):
+            os.remove(self.fasta_filename)
+        if os.path.exists(self.fai_filename):
+            os.remove(self.fai_filename)
+
+    def test_cached_reads(self):
+        """Test reads through the cache and the hit/miss/eviction counters."""
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 5, 40), self.sequence[5:40])
+        self.assertEqual(self.fasta_io.get_cache_stats()["misses"], 3)
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 20, 30), self.sequence[20:30])
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 30, 20), self.fasta_io.read_in_section("seq1", 30, 20))
+        self.assertEqual(self.fasta_io.get_cache_stats()["hits"], 3)
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 0, 100), self.sequence)
+        stats = self.fasta_io.get_cache_stats()
+        self.assertEqual(stats["misses"], 7)
+        self.assertEqual(stats["evictions"], 3)
+        self.assertLessEqual(stats["bytes"], 64)
+
+    def test_writes_invalidate_cache(self):
+        """Test overwrite_section and masking drop stale blocks."""
+        self.fasta_io.read_in_section("seq1", 0, 60)
+        self.fasta_io.overwrite_section("seq1", 14, "TTTT")
+        self.fasta_io.hard_mask_region("seq1", 30, 35)
+        self.fasta_io.soft_mask_region("seq1", 40, 50)
+        expected = self.sequence[:14] + "TTTT" + self.sequence[18:30] + "NNNNN" + self.sequence[35:40] + \
+            self.sequence[40:50].lower() + self.sequence[50:]
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 0, 100), expected)
+        self.assertEqual(FASTA_IO(self.fasta_filename).read_in_section("seq1", 0, 100), expected)
+
+    def test_write_during_cache_miss(self):
+        """Test a block read before a write to it is not cached after the write."""
+        read_file = self.fasta_io.__read_file__
+
+        def read_then_write(*args, **kwargs):
+            data = read_file(*args, **kwargs)
+            del self.fasta_io.__read_file__
+            thread = threading.Thread(target=self.fasta_io.overwrite_section, args=("seq1", 1, "TTTT"))
+            thread.start()
+            thread.join()
+            return data
+
+        self.fasta_io.__read_file__ = read_then_write
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 0, 10), self.sequence[:10])
+        expected = self.sequence[:1] + "TTTT" + self.sequence[5:]
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 0, 10), expected[:10])
+
+    def test_threads_read_and_write(self):
+        """Test cached reads stay consistent with the file while other threads write."""
+        fasta_io = FASTA_IO(self.fasta_filename, cache_size=1 << 16, cache_block_size=8)
+        rng = random.Random(7)
+        edits = [(rng.randrange(1, 90), "".join(rng.choice("ACGT") for _ in range(rng.randrange(1, 10))))
+                 for _ in range(300)]
+
+        def writer(offset):
+            for start, sequence in edits[offset::4]:
+                fasta_io.overwrite_section("seq1", start, sequence)
+
+        def reader(offset):
+            for _ in range(300):
+                start = rng.randrange(0, 90)
+                fasta_io.read_in_section("seq1", start, start + 10)
+
+        threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(4)]
+        threads += [threading.Thread(target=reader, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(fasta_io.read_in_section("seq1", 0, 100),
+                         FASTA_IO(self.fasta_filename).read_in_section("seq1", 0, 100))
+        fasta_io.close()
+
+
+class TestFastaIOBulkMasking(unittest.TestCase):
+
+    def setUp(self):
+        """Set up two identical files, one masked per interval and one in bulk."""
+        self.filenames = ["test_io_mask_single.fasta", "test_io_mask_bulk.fasta"]
+        rng = random.Random(1)
+        self.lengths = {"seq1": 700, "seq2": 1500}
+        lines = []
+        for seq_id, length in self.lengths.items():
+            sequence = "".join(rng.choice("ACGT") for _ in range(length))
+            lines.append(">%s\r\n" % seq_id if seq_id == "seq2" else ">%s\n" % seq_id)
+            for i in range(0, length, 60):
+                lines.append(sequence[i:i + 60] + ("\r\n" if seq_id == "seq2" else "\n"))
+        for filename in self.filenames:
+            with open(filename, "w", newline="") as f:
+                f.write("".join(lines))
+            make_fai(filename)
+        self.regions = []
+        for _ in range(300):
+            seq_id = rng.choice(sorted(self.lengths))
+            start = rng.randrange(1, self.lengths[seq_id] - 1)
+            self.regions.append((seq_id, start, min(self.lengths[seq_id], start + rng.randrange(1, 80))))
+
+    def tearDown(self):
+        """Clean up the created files."""
+        for filename in self.filenames:
+            for path in (filename, filename + ".fai"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def assertFilesEqual(self):
+        with open(self.filenames[0], "rb") as single, open(self.filenames[1], "rb") as bulk:
+            self.assertEqual(single.read(), bulk.read())
+
+    def test_soft_mask_regions(self):
+        """Test bulk soft masking gives the same file as soft_mask_region."""
+        single, bulk = FASTA_IO(self.filenames[0]), FASTA_IO(self.filenames[1], cache_size=4096)
+        bulk.read_in_section("seq2", 0, 1500)
+        for region in self.regions:
+            single.soft_mask_region(*region)
+        bulk.soft_mask_regions(self.regions, merge_gap=50)
+        self.assertEqual(bulk.read_in_section("seq2", 0, 1500), single.read_in_section("seq2", 0, 1500))
+        single.close()
+        bulk.close()
+        self.assertFilesEqual()
+
+    def test_hard_mask_regions_from_bed(self):
+        """Test bulk hard masking from a bed file gives the same file as hard_mask_region."""
+        bed_filename = "test_io_mask.bed"
+        with open(bed_filename, "w") as f:
+            for seq_id, start, stop in self.regions:
+                f.write("%s\t%d\t%d\n" % (seq_id, start, stop))
+        single, bulk = FASTA_IO(self.filenames[0]), FASTA_IO(self.filenames[1])
+        for region in self.regions:
+            single.hard_mask_region(*region)
+        try:
+            bulk.hard_mask_regions(bed_filename, merge_gap=0)
+        finally:
+            os.remove(bed_filename)
+        single.close()
+        bulk.close()
+        self.assertFilesEqual()
+
+    def test_mask_regions_out_of_bounds(self):
+        """Test invalid intervals are rejected before anything is written."""
+        bulk = FASTA_IO(self.filenames[1])
+        with self.assertRaises(Exception) as context:
+            bulk.hard_mask_regions([("seq1", 0, 10), ("seq1", 690, 701)])
+        self.assertTrue("stop position exceeds chromosome length" in str(context.exception))
+        bulk.close()
+        self.assertFilesEqual()
+
+
+class TestFastaIOMmap(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up a multi-line FASTA file read through the memory mapped path."""
+        cls.fasta_filename = "test_io_mmap.fasta"
+        cls.fai_filename = cls.fasta_filename + ".fai"
+        cls.sequence = "ACGTTGCAAC" * 7 # 70 bases over lines of 8
+
+        with open(cls.fasta_filename, "w") as f:
+            f.write(">seq1\n")
+            for i in range(0, len(cls.sequence), 8):
+                f.write(cls.sequence[i:i + 8] + "\n")
+            f.write(">seq2\r\n")
+            for i in range(0, len(cls.sequence), 8):
+                f.write(cls.sequence[i:i + 8] + "\r\n")
+
+        make_fai(cls.fasta_filename)
+        cls.fasta_io = FASTA_IO(cls.fasta_filename, use_mmap=True)
+        cls.handle_io = FASTA_IO(cls.fasta_filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files after all tests are done."""
+        cls.fasta_io.close()
+        cls.handle_io.close()
+        if os.path.exists(cls.fasta_filename):
+            os.remove(cls.fasta_filename)
+        if os.path.exists(cls.fai_filename):
+            os.remove(cls.fai_filename)
+
+    def test_matches_handle_path(self):
+        """Test the mapped reads for every region, LF and CRLF."""
+        for seq_id in ("seq1", "seq2"):
+            for start in range(0, 70, 3):
+                for stop in range(start, 71, 5):
+                    self.assertEqual(self.fasta_io.read_in_section(seq_id, start, stop),
+                                     self.sequence[start:stop])
+                    self.assertEqual(self.handle_io.read_in_section(seq_id, start, stop),
+                                     self.sequence[start:stop])
+                    self.assertEqual(self.fasta_io.read_in_section(seq_id, stop, start),
+                                     "".join(FASTA_IO.RevCompDict[base] for base in self.sequence[start:stop][::-1]))
+
+    def test_output_formats(self):
+        """Test bytes and memoryview output."""
+        self.assertEqual(self.fasta_io.read_in_section("seq1", 1, 6, output_format="bytes"), b"CGTTG")
+        view = self.fasta_io.read_in_section("seq2", 5, 20, output_format="memoryview")
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view.tobytes(), self.sequence[5:20].encode())
+        view.release()
+        self.assertEqual(self.handle_io.read_in_section("seq1", 1, 6, output_format="bytes"), b"CGTTG")
+
+    def test_unknown_output_format(self):
+        """Test an invalid output format is rejected."""
+        with self.assertRaises(Exception) as context:
+            self.fasta_io.read_in_section("seq1", 0, 4, output_format="list")
+        self.assertTrue("unknown output format" in str(context.exception))
+
+
+def read_regions_in_worker(fasta_io, regions):
+    """Module level so process pool workers can run it on a pickled FASTA_IO."""
+    return [fasta_io.read_in_section(*region) for region in regions]
+
+
+class TestFastaIOConcurrency(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up a random multi-sequence file and a pool of random regions."""
+        cls.fasta_filename = "test_io_concurrency.fasta"
+        cls.fai_filename = cls.fasta_filename + ".fai"
+        rng = random.Random(0)
+        cls.sequences = {"seq%d" % i: "".join(rng.choice("ACGTacgtN") for _ in range(rng.randrange(500, 3000)))
+                         for i in range(5)}
+        with open(cls.fasta_filename, "w") as f:
+            for seq_id, sequence in cls.sequences.items():
+                f.write(">%s\n" % seq_id)
+                for i in range(0, len(sequence), 61):
+                    f.write(sequence[i:i + 61] + "\n")
+        make_fai(cls.fasta_filename)
+
+        cls.regions = []
+        for _ in range(2000):
+            seq_id = rng.choice(sorted(cls.sequences))
+            start = rng.randrange(0, len(cls.sequences[seq_id]))
+            cls.regions.append((seq_id, start, min(len(cls.sequences[seq_id]), start + rng.randrange(1, 400))))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files after all tests are done."""
+        if os.path.exists(cls.fasta_filename):
+            os.remove(cls.fasta_filename)
+        if os.path.exists(cls.fai_filename):
+            os.remove(cls.fai_filename)
+
+    def expected(self, regions):
+        return [self.sequences[seq_id][start:stop] for seq_id, start, stop in regions]
+
+    def test_threads_share_one_reader(self):
+        """Test many threads doing random reads on one object, for every read mode."""
+        for options in ({}, {"use_mmap": True}, {"cache_size": 4096, "cache_block_size": 128}):
+            fasta_io = FASTA_IO(self.fasta_filename, **options)
+            failures = []
+
+            def worker(offset):
+                regions = self.regions[offset::16]
+                if read_regions_in_worker(fasta_io, regions) != self.expected(regions):
+                    failures.append(offset)
+
+            threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            fasta_io.close()
+            self.assertEqual(failures, [], options)
+
+    def test_pickle_reopens_lazily(self):
+        """Test a pickled reader opens its own handle on first use."""
+        fasta_io = FASTA_IO(self.fasta_filename, use_mmap=True)
+        copy = pickle.loads(pickle.dumps(fasta_io))
+        self.assertEqual(copy.fasta_file_handle, "")
+        self.assertEqual(read_regions_in_worker(copy, self.regions[:50]), self.expected(self.regions[:50]))
+        self.assertNotEqual(copy.fasta_file_handle, "")
+        copy.close()
+        fasta_io.close()
+
+    @unittest.skipIf(not hasattr(os, "fork"), "no fork")
+    def test_fork_while_locked(self):
+        """Test a forked child can read while a parent thread held the lock at the fork."""
+        import time
+        fasta_io = FASTA_IO(self.fasta_filename, cache_size=4096, cache_block_size=128)
+        fasta_io.read_in_section("seq0", 0, 10)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with fasta_io.lock:
+                locked.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait()
+        pid = os.fork()
+        if pid == 0:
+            ok = read_regions_in_worker(fasta_io, self.regions[:50]) == self.expected(self.regions[:50])
+            os._exit(0 if ok else 1)
+        release.set()
+        thread.join()
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                break
+            time.sleep(0.01)
+        else:
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+            self.fail("child process deadlocked")
+        fasta_io.close()
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+    def test_process_pool_workers(self):
+        """Test passing one reader to process pool workers."""
+        fasta_io = FASTA_IO(self.fasta_filename)
+        fasta_io.read_in_section("seq0", 0, 10) # handles in use before the workers start
+        batches = [self.regions[offset::4] for offset in range(4)]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(read_regions_in_worker, [fasta_io] * 4, batches))
+        fasta_io.close()
+        self.assertEqual(results, [self.expected(batch) for batch in batches])
+
+
+class TestFastaIOIterators(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up LF and CRLF records and a larger record for the memory test."""
+        cls.fasta_filename = "test_io_iter.fasta"
+        cls.fai_filename = cls.fasta_filename + ".fai"
+        rng = random.Random(3)
+        cls.sequence = ''.join(rng.choice("ACGTN") for _ in range(1001))
+        cls.long_length = 60 * 66667
+
+        with open(cls.fasta_filename, "w") as f:
+            f.write(">seq1\n")
+            for i in range(0, len(cls.sequence), 60):
+                f.write(cls.sequence[i:i + 60] + "\n")
+            f.write(">seq2\n")
+            for i in range(0, len(cls.sequence), 13):
+                f.write(cls.sequence[i:i + 13] + "\r\n")
+            f.write(">long\n")
+            line = "ACGT" * 15
+            f.write((line + "\n") * (cls.long_length // 60))
+
+        make_fai(cls.fasta_filename)
+        cls.fasta_io = FASTA_IO(cls.fasta_filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files after all tests are done."""
+        cls.fasta_io.close()
+        if os.path.exists(cls.fasta_filename):
+            os.remove(cls.fasta_filename)
+        if os.path.exists(cls.fai_filename):
+            os.remove(cls.fai_filename)
+
+    def test_iter_sequence(self):
+        """Test if the chunks join back to the whole sequence."""
+        for seq_id in ("seq1", "seq2"):
+            for chunk_size in (1, 7, 60, 1000, 1001, 5000):
+                chunks = list(self.fasta_io.iter_sequence(seq_id, chunk_size))
+                self.assertEqual(''.join(chunks), self.sequence)
+                self.assertTrue(all(len(chunk) == chunk_size for chunk in chunks[:-1]))
+        self.assertEqual(b''.join(self.fasta_io.iter_sequence("seq2", 100, 'bytes')), self.sequence.encode())
+
+    def test_iter_windows(self):
+        """Test windows against slices for overlapping, adjacent and gapped steps."""
+        for seq_id in ("seq1", "seq2"):
+            for window, step in ((1, 1), (5, 1), (21, 7), (10, 10), (4, 9), (1001, 1), (1002, 1)):
+                for chunk_size in (1, 16, 100, 4096):
+                    expected = [self.sequence[i:i + window] for i in range(0, len(self.sequence) - window + 1, step)]
+                    self.assertEqual(list(self.fasta_io.iter_windows(seq_id, window, step, chunk_size=chunk_size)),
+                                     expected)
+        windows = [bytes(view) for view in self.fasta_io.iter_windows("seq1", 30, 11, 'memoryview', chunk_size=50)]
+        self.assertEqual(windows, [self.sequence[i:i + 30].encode() for i in range(0, 972, 11)])
+        with self.assertRaises(Exception):
+            list(self.fasta_io.iter_windows("seq1", 0, 1))
+
+    def test_constant_memory(self):
+        """Test if scanning a sequence keeps the memory peak near the chunk size."""
+        import tracemalloc
+        chunk_size = 1 << 16
+        tracemalloc.start()
+        try:
+            total = sum(len(chunk) for chunk in self.fasta_io.iter_sequence("long", chunk_size))
+            _, sequence_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            gc = sum(window.count('G') for window in self.fasta_io.iter_windows("long", 1000, 1000, chunk_size=chunk_size))
+            _, window_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(total, self.long_length)
+        self.assertEqual(gc, self.long_length // 1000 * 250) # full windows only
+        self.assertLess(sequence_peak, 8 * chunk_size)
+        self.assertLess(window_peak, 8 * chunk_size)
+
+
+class TestFastaIOBatch(unittest.TestCase):
+
+    def setUp(self):
+        """Set up two identical files, one edited directly and one in batches."""
+        self.filenames = ["test_io_batch_direct.fasta", "test_io_batch.fasta"]
+        rng = random.Random(6)
+        self.sequences = {"seq1": "".join(rng.choice("ACGT") for _ in range(700)),
+                          "seq2": "".join(rng.choice("ACGT") for _ in range(1500))}
+        lines = []
+        for seq_id, sequence in self.sequences.items():
+            ending = "\r\n" if seq_id == "seq2" else "\n"
+            lines.append(">%s%s" % (seq_id, ending))
+            for i in range(0, len(sequence), 60):
+                lines.append(sequence[i:i + 60] + ending)
+        for filename in self.filenames:
+            with open(filename, "w", newline="") as f:
+                f.write("".join(lines))
+            make_fai(filename)
+        self.edits = []
+        for _ in range(500):
+            seq_id = rng.choice(sorted(self.sequences))
+            start = rng.randrange(1, len(self.sequences[seq_id]) - 1)
+            size = rng.choice([1, 1, 1, 2, 5, 70, 150])
+            stop = min(len(self.sequences[seq_id]) - 1, start + size)
+            self.edits.append((seq_id, start, "".join(rng.choice("acgtN") for _ in range(stop - start))))
+
+    def tearDown(self):
+        """Clean up the created files."""
+        for filename in self.filenames:
+            for path in (filename, filename + ".fai", filename + ".journal"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def read_file(self, filename):
+        with open(filename, "rb") as f:
+            return f.read()
+
+    def test_batch_matches_direct_writes(self):
+        """Test reads during the batch and the file after commit."""
+        direct = FASTA_IO(self.filenames[0])
+        batched = FASTA_IO(self.filenames[1], cache_size=4096, cache_block_size=64)
+        model = {seq_id: list(sequence) for seq_id, sequence in self.sequences.items()}
+        for journal in (True, False):
+            batched.begin_batch()
+            for seq_id, start, sequence in self.edits[::2] if journal else self.edits[1::2]:
+                direct.overwrite_section(seq_id, start, sequence)
+                batched.overwrite_section(seq_id, start, sequence)
+                model[seq_id][start:start + len(sequence)] = sequence
+                lower = max(0, start - 10)
+                self.assertEqual(batched.read_in_section(seq_id, lower, start + len(sequence)),
+                                 "".join(model[seq_id][lower:start + len(sequence)]))
+            batched.soft_mask_regions([("seq1", 100, 300), ("seq2", 900, 1000)])
+            direct.soft_mask_regions([("seq1", 100, 300), ("seq2", 900, 1000)])
+            for seq_id in model:
+                model[seq_id] = list(direct.read_in_section(seq_id, 0, len(model[seq_id])))
+                self.assertEqual(batched.read_in_section(seq_id, 0, len(model[seq_id])), "".join(model[seq_id]))
+                self.assertEqual("".join(batched.iter_sequence(seq_id, 97)), "".join(model[seq_id]))
+            self.assertNotEqual(self.read_file(self.filenames[0]), self.read_file(self.filenames[1]))
+            batched.commit(journal=journal, merge_gap=30)
+            self.assertEqual(self.read_file(self.filenames[0]), self.read_file(self.filenames[1]))
+            self.assertFalse(os.path.exists(self.filenames[1] + ".journal"))
+            self.assertEqual(batched.read_in_section("seq2", 0, 1500), "".join(model["seq2"]))
+        direct.close()
+        batched.close()
+
+    def test_rollback(self):
+        """Test rollback and the context manager dropping edits on errors."""
+        original = self.read_file(self.filenames[1])
+        fasta_io = FASTA_IO(self.filenames[1])
+        fasta_io.begin_batch()
+        fasta_io.overwrite_section("seq1", 10, "NNNN")
+        self.assertEqual(fasta_io.read_in_section("seq1", 10, 14), "NNNN")
+        with self.assertRaises(Exception):
+            fasta_io.begin_batch()
+        fasta_io.rollback()
+        self.assertEqual(fasta_io.read_in_section("seq1", 10, 14), self.sequences["seq1"][10:14])
+        with self.assertRaises(ValueError):
+            with fasta_io.batch():
+                fasta_io.overwrite_section("seq1", 10, "NNNN")
+                raise ValueError()
+        self.assertEqual(self.read_file(self.filenames[1]), original)
+        with fasta_io.batch():
+            fasta_io.overwrite_section("seq1", 10, "NNNN")
+        self.assertEqual(fasta_io.read_in_section("seq1", 8, 16), self.sequences["seq1"][8:10] + "NNNN" + self.sequences["seq1"][14:16])
+        with self.assertRaises(Exception):
+            fasta_io.commit()
+        fasta_io.close()
+
+    def test_journal_recovery(self):
+        """Test replaying a complete journal and dropping a truncated one."""
+        original = self.read_file(self.filenames[1])
+        fasta_io = FASTA_IO(self.filenames[1])
+        fasta_io.begin_batch()
+        for seq_id, start, sequence in self.edits:
+            fasta_io.overwrite_section(seq_id, start, sequence)
+        expected = {seq_id: fasta_io.read_in_section(seq_id, 0, len(sequence)) for seq_id, sequence in self.sequences.items()}
+        fasta_io.__write_journal__(fasta_io.__pending_spans__(64, 1 << 22)) # crash after the journal was written
+        fasta_io.close()
+        journal = self.read_file(self.filenames[1] + ".journal")
+        self.assertEqual(self.read_file(self.filenames[1]), original)
+
+        with open(self.filenames[1] + ".journal", "wb") as f: # crash while writing the journal
+            f.write(journal[:-5])
+        FASTA_IO(self.filenames[1]).close()
+        self.assertFalse(os.path.exists(self.filenames[1] + ".journal"))
+        self.assertEqual(self.read_file(self.filenames[1]), original)
+
+        with open(self.filenames[1] + ".journal", "wb") as f:
+            f.write(journal)
+        fasta_io = FASTA_IO(self.filenames[1])
+        self.assertFalse(os.path.exists(self.filenames[1] + ".journal"))
+        for seq_id, sequence in expected.items():
+            self.assertEqual(fasta_io.read_in_section(seq_id, 0, len(sequence)), sequence)
+        fasta_io.close()
+
+    def write_long_file(self, length):
+        rng = random.Random(9)
+        sequence = "".join(rng.choice("ACGT") for _ in range(length))
+        with open(self.filenames[0], "w") as f:
+            f.write(">long\n")
+            for i in range(0, length, 60):
+                f.write(sequence[i:i + 60] + "\n")
+        make_fai(self.filenames[0])
+        return sequence
+
+    def test_interleaved_reads_and_edits(self):
+        """Test reading before every edit of a batch, the cost per pair must not grow with the batch."""
+        import time
+        sequence = self.write_long_file(400000)
+        fasta_io = FASTA_IO(self.filenames[0])
+        rng = random.Random(10)
+        timings = {}
+        for count in (500, 4000):
+            model = list(sequence)
+            fasta_io.begin_batch()
+            start_time = time.perf_counter()
+            for _ in range(count):
+                start = rng.randrange(1, len(sequence))
+                self.assertEqual(fasta_io.read_in_section("long", start, start + 1), model[start])
+                model[start] = model[start].lower()
+                fasta_io.overwrite_section("long", start, model[start])
+            timings[count] = time.perf_counter() - start_time
+            self.assertEqual(fasta_io.read_in_section("long", 0, len(sequence)), "".join(model))
+            fasta_io.rollback()
+        fasta_io.close()
+        self.assertLess(timings[4000], 24 * timings[500]) # linear is 8x, re-merging the whole batch per read is 64x
+
+    def test_long_batch_and_batch_masking(self):
+        """Test a batch of many unread edits and masking many overlapping intervals inside a batch."""
+        sequence = self.write_long_file(50000)
+        rng = random.Random(11)
+        edits = [(rng.randrange(1, 49900), "".join(rng.choice("ACGTN") for _ in range(rng.randrange(1, 30))))
+                 for _ in range(3000)]
+        intervals = []
+        for _ in range(2000):
+            start = rng.randrange(0, 49900)
+            intervals.append(("long", start, start + rng.randrange(1, 80)) if rng.random() < 0.5 else ("long", start + rng.randrange(1, 80), start))
+        model = list(sequence)
+        fasta_io = FASTA_IO(self.filenames[0])
+        with fasta_io.batch():
+            for start, edit in edits:
+                fasta_io.overwrite_section("long", start, edit)
+                model[start:start + len(edit)] = edit
+            fasta_io.soft_mask_regions(intervals)
+            for _, start, stop in intervals:
+                for i in range(min(start, stop), max(start, stop)):
+                    model[i] = model[i].lower()
+            self.assertEqual(fasta_io.read_in_section("long", 0, len(sequence)), "".join(model))
+        fasta_io.close()
+        self.assertEqual(FASTA_IO(self.filenames[0]).read_in_section("long", 0, len(sequence)), "".join(model))
+
+    @unittest.skipIf(os.name != "posix", "directories can not be fsynced")
+    def test_journal_fsyncs(self):
+        """Test the directory is fsynced after the journal is created and after it is removed."""
+        import stat
+        from unittest import mock
+        fsync = os.fsync
+        synced = []
+
+        def recording_fsync(fd):
+            synced.append("directory" if stat.S_ISDIR(os.fstat(fd).st_mode) else "file")
+            fsync(fd)
+
+        fasta_io = FASTA_IO(self.filenames[1])
+        with mock.patch("os.fsync", recording_fsync):
+            with fasta_io.batch():
+                fasta_io.overwrite_section("seq1", 10, "NNNN")
+        self.assertEqual(synced, ["file", "directory", "file", "directory"]) # journal, its entry, fasta, removal
+        self.assertEqual(fasta_io.read_in_section("seq1", 10, 14), "NNNN")
+        fasta_io.close()
+
+    @unittest.skipIf(fcntl is None, "no advisory file locks")
+    def test_journal_in_use(self):
+        """Test opening the file leaves a journal alone while a commit holds the lock."""
+        original = self.read_file(self.filenames[1])
+        fasta_io = FASTA_IO(self.filenames[1])
+        fasta_io.begin_batch()
+        for seq_id, start, sequence in self.edits:
+            fasta_io.overwrite_section(seq_id, start, sequence)
+        fasta_io.__write_journal__(fasta_io.__pending_spans__(64, 1 << 22))
+        journal = self.read_file(self.filenames[1] + ".journal")
+        fasta_io.__lock_file__() # a commit in progress
+        for data in (journal[:-5], journal):
+            with open(self.filenames[1] + ".journal", "wb") as f:
+                f.write(data)
+            FASTA_IO(self.filenames[1]).close()
+            self.assertEqual(self.read_file(self.filenames[1] + ".journal"), data)
+            self.assertEqual(self.read_file(self.filenames[1]), original)
+        fasta_io.__unlock_file__()
+        fasta_io.rollback()
+        FASTA_IO(self.filenames[1]).close()
+        self.assertFalse(os.path.exists(self.filenames[1] + ".journal"))
+        self.assertNotEqual(self.read_file(self.filenames[1]), original)
+        fasta_io.close()
+
+    def test_commit_while_others_open(self):
+        """Test journaled commits while another thread keeps opening the file."""
+        fasta_io = FASTA_IO(self.filenames[1])
+        model = {seq_id: list(sequence) for seq_id, sequence in self.sequences.items()}
+        done = threading.Event()
+        failures = []
+
+        def opener():
+            while not done.is_set():
+                try:
+                    FASTA_IO(self.filenames[1]).close()
+                except Exception as error:
+                    failures.append(error)
+
+        thread = threading.Thread(target=opener)
+        thread.start()
+        try:
+            for offset in range(0, len(self.edits), 25):
+                with fasta_io.batch():
+                    for seq_id, start, sequence in self.edits[offset:offset + 25]:
+                        fasta_io.overwrite_section(seq_id, start, sequence)
+                        model[seq_id][start:start + len(sequence)] = sequence
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(failures, [])
+        self.assertFalse(os.path.exists(self.filenames[1] + ".journal"))
+        reader = FASTA_IO(self.filenames[1])
+        for seq_id, sequence in model.items():
+            self.assertEqual(reader.read_in_section(seq_id, 0, len(sequence)), "".join(sequence))
+        reader.close()
+        fasta_io.close()
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestFastaIONumpy(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up a CRLF FASTA file with mixed case and N bases."""
+        cls.fasta_filename = "test_io_numpy.fasta"
+        cls.fai_filename = cls.fasta_filename + ".fai"
+        cls.sequence = "ACGTNacgtnRACCGGTTAA" * 10
+
+        with open(cls.fasta_filename, "w") as f:
+            f.write(">seq1\r\n")
+            for i in range(0, len(cls.sequence), 30):
+                f.write(cls.sequence[i:i + 30] + "\r\n")
+
+        make_fai(cls.fasta_filename)
+        cls.fasta_io = FASTA_IO(cls.fasta_filename)
+        cls.mmap_io = FASTA_IO(cls.fasta_filename, use_mmap=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files after all tests are done."""
+        cls.fasta_io.close()
+        cls.mmap_io.close()
+        if os.path.exists(cls.fasta_filename):
+            os.remove(cls.fasta_filename)
+        if os.path.exists(cls.fai_filename):
+            os.remove(cls.fai_filename)
+
+    def codes(self, sequence):
+        return numpy.array(["ACGT".find(base) if base in "ACGT" else 4 for base in sequence.upper()], dtype=numpy.uint8)
+
+    def test_read_in_section(self):
+        """Test ASCII and base code arrays, forward and reverse complement."""
+        for fasta_io in (self.fasta_io, self.mmap_io):
+            for start, stop in ((0, 0), (2, 20), (25, 95), (95, 25)):
+                expected = self.fasta_io.read_in_section("seq1", start, stop)
+                array = fasta_io.read_in_section("seq1", start, stop, 'numpy')
+                self.assertEqual(array.dtype, numpy.uint8)
+                self.assertEqual(array.tobytes(), expected.encode())
+                numpy.testing.assert_array_equal(fasta_io.read_in_section("seq1", start, stop, 'numpy_codes'),
+                                                 self.codes(expected))
+
+    def test_read_regions(self):
+        """Test the array formats of read_regions."""
+        regions = [("seq1", 0, 10), ("seq1", 50, 40), ("seq1", 5, 15)]
+        arrays = self.fasta_io.read_regions(regions, 'numpy_codes')
+        for array, region in zip(arrays, regions):
+            numpy.testing.assert_array_equal(array, self.codes(self.fasta_io.read_in_section(*region)))
+
+    def test_read_regions_into(self):
+        """Test filling a preallocated array and allocating one."""
+        regions = [("seq1", start, start + 16) for start in range(0, 180, 7)] + [("seq1", 60, 44)]
+        out = numpy.zeros((len(regions), 16), dtype=numpy.uint8)
+        self.assertIs(self.mmap_io.read_regions_into(regions, out, 'numpy_codes'), out)
+        for row, region in zip(out, regions):
+            numpy.testing.assert_array_equal(row, self.codes(self.fasta_io.read_in_section(*region)))
+        array = self.fasta_io.read_regions_into(regions)
+        self.assertEqual(array.shape, (len(regions), 16))
+        self.assertEqual(array[-1].tobytes(), self.fasta_io.read_in_section("seq1", 60, 44).encode())
+        with self.assertRaises(Exception):
+            self.fasta_io.read_regions_into([("seq1", 0, 10), ("seq1", 0, 11)])
+        with self.assertRaises(Exception):
+            self.fasta_io.read_regions_into(regions, numpy.zeros((len(regions), 15), dtype=numpy.uint8))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import sys
+import random
+import threading
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from FASTA_Pool import FASTA_Pool
+
+
+class TestFastaPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up twelve small references with the same sequence names."""
+        rng = random.Random(8)
+        cls.sequences = {}
+        cls.paths = {}
+        for number in range(12):
+            path = "test_pool_%d.fasta" % number
+            cls.paths["ref%d" % number] = path
+            with open(path, "w") as f:
+                for seq_id in ("chr1", "chr2"):
+                    sequence = "".join(rng.choice("ACGT") for _ in range(300))
+                    cls.sequences["ref%d" % number, seq_id] = sequence
+                    f.write(">%s\n" % seq_id)
+                    for i in range(0, len(sequence), 70):
+                        f.write(sequence[i:i + 70] + "\n")
+            make_fai(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files after all tests are done."""
+        for path in cls.paths.values():
+            for filename in (path, path + ".fai"):
+                if os.path.exists(filename):
+                    os.remove(filename)
+
+    def test_routing_and_limit(self):
+        """Test queries against every reference with at most three open."""
+        with FASTA_Pool(self.paths, max_open=3) as pool:
+            self.assertEqual(pool.get_reference_names(), list(self.paths))
+            rng = random.Random(9)
+            for _ in range(300):
+                reference = rng.choice(list(self.paths))
+                seq_id = rng.choice(["chr1", "chr2"])
+                start, stop = sorted(rng.sample(range(301), 2))
+                self.assertEqual(pool.read_in_section(reference, seq_id, start, stop),
+                                 self.sequences[reference, seq_id][start:stop])
+                stats = pool.get_pool_stats()
+                self.assertLessEqual(stats["open"], 3)
+                self.assertEqual(sum(reader.fasta_file_handle != '' for reader in pool.readers.values()), stats["open"])
+            self.assertEqual(stats["readers"], 12)
+            self.assertGreater(stats["releases"], 0)
+
+    def test_index_kept_after_release(self):
+        """Test if a released reader keeps its index and reopens its handle."""
+        pool = FASTA_Pool(self.paths, max_open=1)
+        self.assertEqual(pool.get_sequence_IDs("ref0"), ["chr1", "chr2"])
+        index = pool.readers["ref0"].SequenceIndex
+        pool.read_in_section("ref1", "chr1", 0, 10)
+        self.assertEqual(pool.readers["ref0"].fasta_file_handle, '')
+        self.assertEqual(pool.read_in_section("ref0", "chr2", 5, 0), pool.readers["ref0"].read_in_section("chr2", 5, 0))
+        self.assertIs(pool.readers["ref0"].SequenceIndex, index)
+        pool.close()
+
+    def test_read_regions(self):
+        """Test region batches across references in the given order."""
+        pool = FASTA_Pool(self.paths, max_open=2)
+        regions = [("ref%d" % (number % 5), "chr%d" % (number % 2 + 1), number, number + 20) for number in range(30)]
+        regions.append(("ref3", "chr1", 50, 40))
+        sections = pool.read_regions(regions)
+        for region, section in zip(regions[:-1], sections):
+            self.assertEqual(section, self.sequences[region[0], region[1]][region[2]:region[3]])
+        self.assertEqual(sections[-1], pool.read_in_section("ref3", "chr1", 50, 40))
+        with self.assertRaises(Exception):
+            pool.read_in_section("ref99", "chr1", 0, 1)
+        with self.assertRaises(Exception):
+            pool.add_reference("ref0", self.paths["ref0"])
+        pool.close()
+
+    def test_threads(self):
+        """Test concurrent queries with a limit below the number of threads."""
+        pool = FASTA_Pool(self.paths, max_open=2)
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(100):
+                    reference = rng.choice(list(self.paths))
+                    if pool.read_in_section(reference, "chr2", 10, 60) != self.sequences[reference, "chr2"][10:60]:
+                        errors.append(reference)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(pool.get_pool_stats()["open"], 2)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
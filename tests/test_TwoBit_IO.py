@@ -0,0 +1,119 @@
+import unittest
+import os
+import sys
+import struct
+import random
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from TwoBit_IO import TwoBit_IO, fasta_to_twobit
+
+
+class TestTwoBit(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a FASTA file with N runs, IUPAC codes and soft masked runs."""
+        self.fasta_filename = "test_twobit.fasta"
+        self.twobit_filename = "test_twobit.2bit"
+        rng = random.Random(4)
+        self.sequences = {}
+        with open(self.fasta_filename, "w") as f:
+            for number, length in enumerate((1, 5, 997, 4096)):
+                sequence = [rng.choice("ACGT") for _ in range(length)]
+                for _ in range(length // 50):
+                    start = rng.randrange(length)
+                    kind = rng.choice(["N", "n", "lower", "R"])
+                    for i in range(start, min(length, start + rng.randrange(1, 40))):
+                        sequence[i] = sequence[i].lower() if kind == "lower" else kind
+                sequence = ''.join(sequence)
+                self.sequences["seq%d" % number] = sequence
+                f.write(">seq%d\n" % number)
+                for i in range(0, length, 60):
+                    f.write(sequence[i:i + 60] + "\n")
+        make_fai(self.fasta_filename)
+
+    def tearDown(self):
+        """Clean up the created files."""
+        for filename in (self.fasta_filename, self.fasta_filename + ".fai", self.twobit_filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def expected(self, seq_id):
+        """IUPAC codes other than ACGT are stored as N."""
+        return self.sequences[seq_id].replace("R", "N").replace("r", "n")
+
+    def test_round_trip(self):
+        """Test every section against the FASTA, small chunks cross run boundaries."""
+        self.assertEqual(fasta_to_twobit(self.fasta_filename, chunk_size=16), self.twobit_filename)
+        twobit_io = TwoBit_IO(self.twobit_filename)
+        self.assertEqual(twobit_io.get_sequence_IDs(), ["seq0", "seq1", "seq2", "seq3"])
+        rng = random.Random(5)
+        for seq_id in self.sequences:
+            sequence = self.expected(seq_id)
+            self.assertEqual(twobit_io.read_in_section(seq_id, 0, len(sequence)), sequence)
+            for _ in range(200):
+                start = rng.randrange(len(sequence) + 1)
+                stop = rng.randrange(start, len(sequence) + 1)
+                self.assertEqual(twobit_io.read_in_section(seq_id, start, stop), sequence[start:stop])
+        twobit_io.close()
+
+    def test_matches_fasta_io(self):
+        """Test reverse complements and output formats against FASTA_IO."""
+        fasta_to_twobit(self.fasta_filename)
+        twobit_io = TwoBit_IO(self.twobit_filename)
+        fasta_io = FASTA_IO(self.fasta_filename)
+        for start, stop in ((0, 100), (100, 0), (37, 901), (901, 37)):
+            self.assertEqual(twobit_io.read_in_section("seq2", start, stop, 'bytes'),
+                             fasta_io.read_in_section("seq2", start, stop, 'bytes').translate(bytes.maketrans(b"RYry", b"NNnn")))
+        self.assertIsInstance(twobit_io.read_in_section("seq2", 0, 10, 'memoryview'), memoryview)
+        with self.assertRaises(Exception):
+            twobit_io.read_in_section("seq2", -1, 10)
+        with self.assertRaises(Exception):
+            twobit_io.read_in_section("seq2", 0, 998)
+        with self.assertRaises(Exception):
+            twobit_io.read_in_section("chrZ", 0, 1)
+        fasta_io.close()
+        twobit_io.close()
+
+    def test_many_sequences(self):
+        """Test an index spanning several read chunks is read without one large read."""
+        names = ["scaffold_%d_%s" % (number, "x" * (number % 200)) for number in range(3000)]
+        with open(self.fasta_filename, "w") as f:
+            for number, name in enumerate(names):
+                f.write(">%s\n%s\n" % (name, "ACGT"[number % 4] * (number % 7 + 1)))
+        os.remove(self.fasta_filename + ".fai")
+        fasta_to_twobit(self.fasta_filename)
+        reads = []
+
+        class RecordingTwoBit_IO(TwoBit_IO):
+            def __pread__(self, length, offset):
+                reads.append(length)
+                return TwoBit_IO.__pread__(self, length, offset)
+
+        twobit_io = RecordingTwoBit_IO(self.twobit_filename)
+        self.assertEqual(twobit_io.get_sequence_IDs(), names)
+        self.assertGreater(len(reads), 3)
+        self.assertLessEqual(max(reads), 1 << 16)
+        for number in (0, 1234, 2999):
+            self.assertEqual(twobit_io.read_in_section(names[number], 0, number % 7 + 1), "ACGT"[number % 4] * (number % 7 + 1))
+        twobit_io.close()
+
+    def test_file_layout(self):
+        """Test the UCSC .2bit layout byte by byte on a small file."""
+        with open(self.fasta_filename, "w") as f:
+            f.write(">chr\nACgtNNT\n")
+        os.remove(self.fasta_filename + ".fai")
+        fasta_to_twobit(self.fasta_filename)
+        with open(self.twobit_filename, "rb") as f:
+            data = f.read()
+        expected = struct.pack('<IIII', 0x1A412743, 0, 1, 0) + b"\x03chr" + struct.pack('<I', 24)
+        expected += struct.pack('<IIIIIIII', 7, 1, 4, 2, 1, 2, 2, 0)
+        expected += bytes([0b10011100, 0b00000000]) # ACGT, NNT and padding with T=0 C=1 A=2 G=3
+        self.assertEqual(data, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
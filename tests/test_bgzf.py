@@ -0,0 +1,110 @@
+import unittest
+import os
+import sys
+import gzip
+import random
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bgzf import bgzip, is_bgzf, is_gzip, make_gzi, read_gzi, BGZF_Reader
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+
+
+class TestBGZF(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a fasta file larger than one BGZF block and its bgzip copy."""
+        self.fasta_filename = "test_bgzf.fasta"
+        self.bgzf_filename = self.fasta_filename + ".gz"
+        rng = random.Random(0)
+        self.sequences = {"chr1": ''.join(rng.choice("ACGTNacgt") for _ in range(150000)),
+                          "chr2": ''.join(rng.choice("ACGT") for _ in range(70001))}
+        with open(self.fasta_filename, "w", newline='') as f:
+            f.write(">chr1 first\n")
+            sequence = self.sequences["chr1"]
+            f.write(''.join(sequence[i:i + 60] + "\n" for i in range(0, len(sequence), 60)))
+            f.write(">chr2\n")
+            sequence = self.sequences["chr2"]
+            f.write(''.join(sequence[i:i + 70] + "\r\n" for i in range(0, len(sequence), 70)))
+        bgzip(self.fasta_filename)
+
+    def tearDown(self):
+        """Clean up the created files."""
+        for filename in (self.fasta_filename, self.bgzf_filename):
+            for suffix in ('', '.fai', '.gzi'):
+                if os.path.exists(filename + suffix):
+                    os.remove(filename + suffix)
+
+    def test_bgzip_round_trip(self):
+        """Test if a bgzip file decompresses with gzip and is detected as BGZF."""
+        with open(self.fasta_filename, 'rb') as f, gzip.open(self.bgzf_filename, 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertTrue(is_bgzf(self.bgzf_filename))
+        self.assertTrue(is_gzip(self.bgzf_filename))
+        self.assertFalse(is_bgzf(self.fasta_filename))
+
+    def test_reader_random_access(self):
+        """Test positional reads of uncompressed data across block boundaries."""
+        with open(self.fasta_filename, 'rb') as f:
+            data = f.read()
+        Blocks = make_gzi(self.bgzf_filename)
+        self.assertGreater(len(Blocks), 2)
+        self.assertEqual(read_gzi(self.bgzf_filename + '.gzi'), Blocks)
+        with open(self.bgzf_filename, 'rb') as f:
+            reader = BGZF_Reader(f, Blocks, cache_blocks=2)
+            rng = random.Random(1)
+            for _ in range(200):
+                offset = rng.randrange(len(data) + 10)
+                length = rng.randrange(140000)
+                self.assertEqual(reader.pread(length, offset), data[offset:offset + length])
+
+    def test_make_fai_matches_uncompressed(self):
+        """Test if the index of the compressed file matches the plain one."""
+        make_fai(self.fasta_filename)
+        make_fai(self.bgzf_filename)
+        with open(self.fasta_filename + '.fai') as f, open(self.bgzf_filename + '.fai') as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertTrue(os.path.exists(self.bgzf_filename + '.gzi'))
+
+    def test_plain_gzip_rejected(self):
+        """Test if a gzip file without BGZF blocks is rejected."""
+        with open(self.fasta_filename, 'rb') as f, gzip.open(self.bgzf_filename, 'wb') as g:
+            g.write(f.read())
+        with self.assertRaises(Exception):
+            make_fai(self.bgzf_filename)
+
+    def test_fasta_io_reads(self):
+        """Test FASTA_IO reads from the compressed file, with and without a .gzi."""
+        make_fai(self.bgzf_filename)
+        for keep_gzi in (True, False):
+            if not keep_gzi:
+                os.remove(self.bgzf_filename + '.gzi')
+            fasta_io = FASTA_IO(self.bgzf_filename, cache_size=1 << 16, bgzf_cache_blocks=2)
+            rng = random.Random(2)
+            for _ in range(100):
+                SequenceID = rng.choice(["chr1", "chr2"])
+                sequence = self.sequences[SequenceID]
+                StartBase = rng.randrange(len(sequence))
+                StopBase = min(len(sequence), StartBase + rng.randrange(80000))
+                self.assertEqual(fasta_io.read_in_section(SequenceID, StartBase, StopBase),
+                                 sequence[StartBase:StopBase])
+            self.assertEqual(fasta_io.read_in_section("chr2", 10, 0, 'bytes'),
+                             self.sequences["chr2"][0:10][::-1].translate(str.maketrans("ACGT", "TGCA")).encode())
+            fasta_io.close()
+
+    def test_fasta_io_read_only(self):
+        """Test if writes to a compressed file are refused."""
+        make_fai(self.bgzf_filename)
+        fasta_io = FASTA_IO(self.bgzf_filename, use_mmap=True)
+        with self.assertRaises(Exception):
+            fasta_io.overwrite_section("chr1", 10, "ACGT")
+        with self.assertRaises(Exception):
+            fasta_io.soft_mask_regions([("chr1", 10, 20)])
+        self.assertEqual(fasta_io.read_in_section("chr1", 0, 10), self.sequences["chr1"][:10])
+        fasta_io.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
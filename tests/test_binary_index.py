@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from binary_index import make_binary_index, BinaryIndex
+
+
+class TestBinaryIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a FASTA file with many short contigs."""
+        self.fasta_filename = "test_binary_index.fasta"
+        self.fai_filename = self.fasta_filename + ".fai"
+        self.index_filename = self.fai_filename + ".bin"
+        self.sequences = {"contig%d" % number: "ACGT"[number % 4] * (number % 37 + 1) + "T" for number in range(2000)}
+        with open(self.fasta_filename, "w") as f:
+            for seq_id, sequence in self.sequences.items():
+                f.write(">%s description\n%s\n" % (seq_id, sequence))
+        make_fai(self.fasta_filename)
+
+    def tearDown(self):
+        """Clean up the created files."""
+        for filename in (self.fasta_filename, self.fai_filename, self.index_filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_lookup(self):
+        """Test every record and missing names against the text index."""
+        make_binary_index(self.fai_filename)
+        index = BinaryIndex(self.index_filename)
+        fasta_io = FASTA_IO(self.fasta_filename)
+        self.assertEqual(index.get_sequence_IDs(), fasta_io.get_sequence_IDs())
+        for seq_id in self.sequences:
+            self.assertEqual(index.get_record(seq_id), fasta_io.__get_record__(seq_id))
+        self.assertIsNone(index.get_record("contig2000"))
+        self.assertIsNone(index.get_record(""))
+        self.assertTrue(index.is_current(self.fai_filename))
+        index.close()
+        fasta_io.close()
+
+    def test_duplicate_names(self):
+        """Test if the first entry wins for duplicated names, as with the .fai."""
+        with open(self.fai_filename, "w") as f:
+            f.write("a\t10\t3\t60\t61\nb\t20\t30\t60\t61\na\t5\t5\t5\t6\n")
+        make_binary_index(self.fai_filename)
+        index = BinaryIndex(self.index_filename)
+        self.assertEqual(index.get_sequence_IDs(), ["a", "b", "a"])
+        self.assertEqual(index.get_record("a"), (10, 3, 60, 61))
+        index.close()
+
+    def test_fasta_io_binary_index(self):
+        """Test reads through the binary index and its rebuild after the .fai changes."""
+        fasta_io = FASTA_IO(self.fasta_filename, binary_index=True)
+        self.assertFalse(os.path.exists(self.index_filename)) # nothing is read on opening
+        self.assertEqual(fasta_io.read_in_section("contig1998", 0, 2), self.sequences["contig1998"])
+        self.assertTrue(os.path.exists(self.index_filename))
+        self.assertEqual(fasta_io.get_sequence_IDs(), list(self.sequences))
+        with self.assertRaises(Exception):
+            fasta_io.read_in_section("contig2000", 0, 1)
+        fasta_io.close()
+
+        with open(self.fasta_filename, "a") as f:
+            f.write(">extra\nGATTACA\n")
+        time.sleep(0.01)
+        make_fai(self.fasta_filename)
+        fasta_io = FASTA_IO(self.fasta_filename, binary_index=True)
+        self.assertEqual(fasta_io.read_in_section("extra", 0, 7), "GATTACA")
+        fasta_io.close()
+
+    def test_lazy_loading(self):
+        """Test if a broken index is only reported on first use."""
+        with open(self.fai_filename, "w") as f:
+            f.write("a\tnot a number\n")
+        fasta_io = FASTA_IO(self.fasta_filename)
+        with self.assertRaises(Exception):
+            fasta_io.get_sequence_IDs()
+        fasta_io.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
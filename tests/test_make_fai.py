@@ -54,6 +54,43 @@ class TestMakeFai(unittest.TestCase):
         self.assertEqual(parts2[1], "12")
         self.assertEqual(len(parts2), 5)
 
+    def test_make_fai_chunk_boundaries(self):
+        """Test the index does not depend on where the file is split into chunks."""
+        with open(self.fasta_filename, "w", newline="") as f:
+            f.write(">seq1 description\r\n")
+            f.write("ACGTACGT\r\n" * 5 + "ACG\r\n")
+            f.write(">seq2\n")
+            f.write("TCGATCGATCGA\n" * 3 + "TCGA")
+        expected = "seq1\t43\t19\t8\t10\nseq2\t40\t80\t12\t13"
+        for chunk_size in (1, 2, 7, 64, 1 << 20):
+            make_fai(self.fasta_filename, chunk_size=chunk_size)
+            with open(self.fai_filename, "r") as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_make_fai_inconsistent_lines(self):
+        """Test a short line in the middle of a sequence is rejected."""
+        with open(self.fasta_filename, "w") as f:
+            f.write(">seq1\n")
+            f.write("ACGTACGT\nACGT\nACGTACGT\n")
+        for chunk_size in (3, 1 << 20):
+            with self.assertRaises(Exception) as context:
+                make_fai(self.fasta_filename, chunk_size=chunk_size)
+            self.assertTrue("could not process Fasta File" in str(context.exception))
+
+    def test_make_fai_parallel_matches_serial(self):
+        """Test the parallel index is identical, with sequences straddling ranges."""
+        with open(self.fasta_filename, "w") as f:
+            for number in range(3):
+                f.write(">seq%d\n" % number)
+                f.write("ACGTACGTAC\n" * (40 + number) + "ACG\n")
+        make_fai(self.fasta_filename)
+        with open(self.fai_filename, "r") as f:
+            expected = f.read()
+        for workers in (2, 3, 7):
+            make_fai(self.fasta_filename, chunk_size=16, workers=workers)
+            with open(self.fai_filename, "r") as f:
+                self.assertEqual(f.read(), expected)
+
     def test_non_existent_fasta(self):
         """Test make_fai with a non-existent FASTA file."""
         with self.assertRaises(Exception) as context:
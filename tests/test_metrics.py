@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+import time
+import pickle
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a FASTA file with two sequences of 60 bases per line."""
+        self.fasta_filename = "test_metrics.fasta"
+        self.sequence = "ACGTTGCA" * 100
+        with open(self.fasta_filename, "w") as f:
+            for seq_id in ("chr1", "chr2"):
+                f.write(">%s\n" % seq_id)
+                for i in range(0, len(self.sequence), 60):
+                    f.write(self.sequence[i:i + 60] + "\n")
+
+    def tearDown(self):
+        """Clean up the created files."""
+        for filename in (self.fasta_filename, self.fasta_filename + ".fai"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_counters(self):
+        """Test call counts, I/O counters, histograms and the callback."""
+        events = []
+        metrics = Metrics(callback=lambda operation, seconds, nbytes: events.append((operation, nbytes)))
+        make_fai(self.fasta_filename, metrics=metrics)
+        fasta_io = FASTA_IO(self.fasta_filename, cache_size=1 << 16, cache_block_size=256, metrics=metrics)
+        fasta_io.read_in_section("chr1", 0, 100)
+        fasta_io.read_in_section("chr1", 100, 0)
+        fasta_io.read_regions([("chr2", 0, 10), ("chr2", 5, 30)])
+        fasta_io.overwrite_section("chr1", 59, "TTT")
+        fasta_io.soft_mask_regions([("chr2", 0, 10)])
+
+        snapshot = fasta_io.get_metrics()
+        operations = snapshot["operations"]
+        self.assertEqual(operations["make_fai"]["bytes"], os.path.getsize(self.fasta_filename))
+        self.assertEqual(operations["load_index"]["bytes"], 2)
+        self.assertEqual(operations["read_in_section"]["calls"], 2)
+        self.assertEqual(operations["read_in_section"]["bytes"], 200)
+        self.assertEqual(operations["reverse_complement"]["calls"], 1)
+        self.assertEqual(operations["read_regions"]["bytes"], 35)
+        self.assertEqual(operations["overwrite_section"]["bytes"], 3)
+        self.assertEqual(operations["mask_regions"]["bytes"], 10)
+        for operation in operations.values():
+            self.assertEqual(sum(operation["histogram"].values()), operation["calls"])
+            self.assertLessEqual(operation["max_seconds"], operation["total_seconds"])
+
+        io = snapshot["io"]
+        self.assertEqual(io["seeks"], 2) # the overwrite crosses a line end
+        self.assertEqual(io["flushes"], 2)
+        self.assertGreater(io["bytes_read"], os.path.getsize(self.fasta_filename))
+        self.assertEqual(snapshot["cache"]["misses"], 2) # one block of each sequence
+        self.assertEqual(events[-1], ("mask_regions", 10))
+        self.assertEqual(len(events), sum(operation["calls"] for operation in operations.values()))
+        self.assertLessEqual(metrics.percentile("read_in_section", 0.5), operations["read_in_section"]["max_seconds"])
+        self.assertIsNone(metrics.percentile("commit", 0.5))
+
+        clone = pickle.loads(pickle.dumps(fasta_io))
+        self.assertIsNone(clone.get_metrics())
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()["operations"], {})
+        fasta_io.close()
+
+    def test_overhead(self):
+        """Test the cost of reads with metrics off against metrics on."""
+        make_fai(self.fasta_filename)
+        timings = {}
+        for enabled in (False, True):
+            fasta_io = FASTA_IO(self.fasta_filename, metrics=enabled or None)
+            fasta_io.read_in_section("chr1", 0, 10)
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                for base in range(2000):
+                    fasta_io.read_in_section("chr1", base % 700, base % 700 + 50)
+                best = min(best, time.perf_counter() - start)
+            timings[enabled] = best
+            fasta_io.close()
+        self.assertIsNone(FASTA_IO(self.fasta_filename).get_metrics())
+        self.assertLess(timings[False], timings[True] * 1.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
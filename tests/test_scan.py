@@ -0,0 +1,110 @@
+import unittest
+import os
+import sys
+import random
+from collections import Counter
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from scan import make_tiles, scan, base_composition, n_gaps
+
+
+def kmer_map(SequenceID, StartBase, StopBase, sequence, k):
+    """k-mers starting inside the tile, the overlap completes those at its end."""
+    sequence = bytes(sequence)
+    return Counter(sequence[i:i + k] for i in range(min(StopBase - StartBase, len(sequence) - k + 1)))
+
+
+def counter_reduce(accumulator, result):
+    accumulator.update(result)
+    return accumulator
+
+
+class TestScan(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up sequences of different line widths with N runs and soft masked bases, and an empty one."""
+        cls.fasta_filename = "test_scan.fasta"
+        rng = random.Random(11)
+        cls.sequences = {}
+        with open(cls.fasta_filename, "w") as f:
+            for number, (length, width) in enumerate(((5000, 60), (1, 60), (0, 60), (777, 50), (3000, 80), (90, 60))):
+                sequence = [rng.choice("ACGTacgtR") for _ in range(length)]
+                for _ in range(length // 200 + bool(length)):
+                    start = rng.randrange(length)
+                    for i in range(start, min(length, start + rng.randrange(1, 150))):
+                        sequence[i] = rng.choice("Nn")
+                sequence = "".join(sequence)
+                cls.sequences["seq%d" % number] = sequence
+                f.write(">seq%d\n" % number)
+                for i in range(0, length, width):
+                    f.write(sequence[i:i + width] + "\n")
+        make_fai(cls.fasta_filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files."""
+        for filename in (cls.fasta_filename, cls.fasta_filename + ".fai", "test_scan.bed"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_tiles(self):
+        """Test if the tiles cover every sequence once and start on line starts."""
+        fasta_io = FASTA_IO(self.fasta_filename)
+        tasks = make_tiles(fasta_io, tile_size=500, overlap=7)
+        self.assertGreater(len(tasks), 10)
+        covered = {}
+        for tiles in tasks:
+            for seq_id, start, stop, read_stop in tiles:
+                self.assertEqual(start, covered.get(seq_id, 0))
+                self.assertEqual(read_stop, min(len(self.sequences[seq_id]), stop + 7))
+                self.assertEqual(start % fasta_io.__get_record__(seq_id)[2], 0)
+                covered[seq_id] = stop
+        self.assertEqual(covered, {seq_id: len(sequence) for seq_id, sequence in self.sequences.items() if sequence})
+        fasta_io.close()
+
+    def test_builtin_scans(self):
+        """Test base composition and N gaps against plain python, serial and in processes."""
+        expected_gaps = []
+        for seq_id, sequence in self.sequences.items():
+            for i, base in enumerate(sequence):
+                if base in "Nn":
+                    if expected_gaps and expected_gaps[-1][0] == seq_id and expected_gaps[-1][2] == i:
+                        expected_gaps[-1] = (seq_id, expected_gaps[-1][1], i + 1)
+                    else:
+                        expected_gaps.append((seq_id, i, i + 1))
+        for workers in (1, 2):
+            composition = base_composition(self.fasta_filename, workers=workers, tile_size=300)
+            self.assertEqual(list(composition), [seq_id for seq_id, sequence in self.sequences.items() if sequence])
+            for seq_id, sequence in self.sequences.items():
+                counts = composition.get(seq_id, dict.fromkeys(("A", "N", "other", "lowercase"), 0))
+                self.assertEqual(counts["A"], sequence.upper().count("A"))
+                self.assertEqual(counts["N"], sequence.upper().count("N"))
+                self.assertEqual(counts["other"], sequence.count("R"))
+                self.assertEqual(counts["lowercase"], sum(base.islower() for base in sequence))
+            self.assertEqual(n_gaps(self.fasta_filename, workers=workers, tile_size=300), expected_gaps)
+        gaps = n_gaps(self.fasta_filename, path_to_bed="test_scan.bed", min_length=20)
+        self.assertEqual(gaps, [gap for gap in expected_gaps if gap[2] - gap[1] >= 20])
+        with open("test_scan.bed") as f:
+            self.assertEqual(f.read().splitlines()[0], "%s\t%d\t%d" % gaps[0])
+
+    def test_overlap(self):
+        """Test if windows crossing tile edges are counted once with an overlap of k-1."""
+        expected = Counter()
+        for sequence in self.sequences.values():
+            expected.update(sequence[i:i + 5].encode() for i in range(len(sequence) - 4))
+        fasta_io = FASTA_IO(self.fasta_filename)
+        for workers in (1, 2):
+            counts = scan(fasta_io, kmer_map, counter_reduce, Counter(), workers=workers, tile_size=256, overlap=4, args=(5,))
+            self.assertEqual(counts, expected)
+        results = scan(fasta_io, kmer_map, tile_size=256, overlap=4, args=(5,), SequenceIDs=["seq1"])
+        self.assertEqual(results, [Counter()])
+        fasta_io.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
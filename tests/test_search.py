@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+import re
+import time
+import random
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from make_fai import make_fai
+from FASTA_IO import FASTA_IO
+from search import find_pattern, make_kmer_index, KmerIndex
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+IUPAC = {'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T', 'R': 'AG', 'Y': 'CT', 'N': 'ACGT', 'W': 'AT'}
+COMPLEMENT = str.maketrans('ACGTRYNW', 'TGCAYRNW')
+
+
+def expected_hits(sequences, pattern):
+    """Overlapping hits on both strands with a plain regular expression."""
+    hits = []
+    for strand, query in (('+', pattern), ('-', pattern.translate(COMPLEMENT)[::-1])):
+        expression = re.compile('(?=%s)' % ''.join('[%s]' % IUPAC[base] for base in query))
+        for seq_id, sequence in sequences.items():
+            for match in expression.finditer(sequence.upper()):
+                hits.append((seq_id, match.start(), match.start() + len(pattern), strand))
+    order = list(sequences)
+    return sorted(hits, key=lambda hit: (order.index(hit[0]), hit[1], hit[3]))
+
+
+class TestSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up sequences with planted sites, soft masked and N runs, and an empty one."""
+        cls.fasta_filename = "test_search.fasta"
+        rng = random.Random(21)
+        cls.sequences = {}
+        with open(cls.fasta_filename, "w") as f:
+            for number, (length, width) in enumerate(((6000, 60), (3, 60), (0, 60), (2500, 70), (900, 50))):
+                sequence = [rng.choice("ACGTacgtN") for _ in range(length)]
+                for _ in range(length // 300):
+                    start = rng.randrange(max(1, length - 12))
+                    sequence[start:start + 12] = rng.choice(["GAATTCGAATTC", "ccgtacgtttag", "CTAAACGTACGG"])
+                sequence = "".join(sequence)[:length]
+                cls.sequences["seq%d" % number] = sequence
+                f.write(">seq%d\n" % number)
+                for i in range(0, length, width):
+                    f.write(sequence[i:i + width] + "\n")
+        make_fai(cls.fasta_filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the created files."""
+        for filename in (cls.fasta_filename, cls.fasta_filename + ".fai", cls.fasta_filename + ".kmi", "test_search.bed"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_streaming(self):
+        """Test exact and degenerate patterns on both strands across tile edges."""
+        for pattern in ("GAATTC", "CCGTACGTTTAG", "ACGTRYNNG", "ACG", "TTWA"):
+            for workers in (1, 2):
+                hits = find_pattern(self.fasta_filename, pattern, workers=workers, tile_size=200)
+                self.assertEqual(hits, expected_hits(self.sequences, pattern))
+        hits = find_pattern(self.fasta_filename, "ccgtacgtttag", strand="-", path_to_bed="test_search.bed")
+        self.assertEqual(hits, [hit for hit in expected_hits(self.sequences, "CCGTACGTTTAG") if hit[3] == "-"])
+        fasta_io = FASTA_IO(self.fasta_filename)
+        with open("test_search.bed") as f:
+            for line, hit in zip(f, hits):
+                self.assertEqual(line.split("\t")[:4], [hit[0], str(hit[1]), str(hit[2]), "CCGTACGTTTAG"])
+        for region in fasta_io.read_regions_from_bed("test_search.bed"):
+            self.assertEqual(region.upper(), "CCGTACGTTTAG")
+        with self.assertRaises(Exception):
+            find_pattern(fasta_io, "ACGX")
+        with self.assertRaises(Exception):
+            find_pattern(fasta_io, "ACG", strand="x")
+        fasta_io.close()
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_kmer_index(self):
+        """Test if indexed searches match streaming ones and fall back for short patterns."""
+        path = make_kmer_index(self.fasta_filename, k=8, tile_size=300)
+        index = KmerIndex(path)
+        fasta_io = FASTA_IO(self.fasta_filename)
+        for pattern in ("GAATTCGAATTC", "CCGTACGTTTAG", "ACGTRYNNG", "ACGTACGT", "GAATT", "NNNNNNNNNN"):
+            self.assertEqual(find_pattern(fasta_io, pattern, index=index), expected_hits(self.sequences, pattern))
+        self.assertIsNotNone(index.find(fasta_io, [("ACGTACGT", "+")]))
+        self.assertIsNone(index.find(fasta_io, [("GAATT", "+")]))
+        index.close()
+
+        time.sleep(0.01)
+        fasta_io.soft_mask_region("seq0", 1, 10) # case only, the hits stay the same
+        index = KmerIndex(path)
+        with self.assertRaises(Exception):
+            find_pattern(fasta_io, "GAATTCGAATTC", index=index)
+        index.close()
+        fasta_io.close()
+
+
+if __name__ == '__main__':
+    unittest.main()